@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# benchmarks/datagen.py
+"""
+Генератор синтетических данных в форматах каталога data/.
+
+Создает users.json (N пользователей), portfolios.json (по M кошельков),
+свежий rates.json и K записей истории курсов в сегментах data/history.
+У всех пользователей пароль PASSWORD; хеши — быстрой схемой sha256,
+чтобы генерация и вход измеряли хранилище, а не KDF (его стоимость
+показывает benchmarks/password_kdf.py).
+
+    python benchmarks/datagen.py --users 10000 --wallets 4 --out /tmp/data
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from valutatrade_hub.core.models import Portfolio, User  # noqa: E402
+from valutatrade_hub.parser_service.fake_provider import (  # noqa: E402
+    DEFAULT_START_PRICES,
+    RandomWalkSource,
+)
+from valutatrade_hub.parser_service.history import SegmentedHistory  # noqa: E402
+
+PASSWORD = "bench-password"
+BASE_CURRENCY = "USD"
+# Валюты кошельков помимо базовой, в порядке добавления
+WALLET_CURRENCIES = ("BTC", "EUR", "ETH", "GBP", "SOL", "RUB")
+# Записей истории на одну метку времени (по числу пар)
+_PAIRS_PER_TICK = len(DEFAULT_START_PRICES)
+
+
+def username(user_id: int) -> str:
+    return f"user{user_id:07d}"
+
+
+def _write_json(path: str, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def generate_users(count: int, rng: random.Random) -> list:
+    users = []
+    salt = f"{rng.getrandbits(128):032x}"
+    template = User(user_id=0, username="", password=PASSWORD, salt=salt,
+                    hash_algorithm="sha256").to_dict()
+    for user_id in range(1, count + 1):
+        # Одна соль на весь набор: хеш вычисляется один раз, а записи
+        # остаются корректными для User.verify_password
+        users.append(dict(template, user_id=user_id, username=username(user_id)))
+    return users
+
+
+def generate_portfolios(count: int, wallets: int, rng: random.Random) -> list:
+    portfolios = []
+    extra = WALLET_CURRENCIES[:max(0, wallets - 1)]
+    for user_id in range(1, count + 1):
+        portfolio = Portfolio(user_id=user_id)
+        portfolio.get_or_create_wallet(BASE_CURRENCY).balance = \
+            round(rng.uniform(1_000, 100_000), 2)
+        for code in extra:
+            # Балансы порядка тысячи долларов в каждой валюте
+            portfolio.get_or_create_wallet(code).balance = \
+                rng.uniform(0, 1_000) / DEFAULT_START_PRICES[code]
+        portfolios.append(portfolio.to_dict())
+    return portfolios
+
+
+def generate_history(directory: str, records: int, seed: int,
+                     end: datetime) -> int:
+    """Пишет records записей истории, по минуте между метками времени."""
+    history = SegmentedHistory(directory)
+    source = RandomWalkSource(seed=seed)
+    ticks = -(-records // _PAIRS_PER_TICK)
+    batch, written = [], 0
+    for tick in range(ticks):
+        timestamp = (end - timedelta(minutes=ticks - tick)).isoformat()
+        for pair_key, rate in source.next_frame().items():
+            if written >= records:
+                break
+            from_curr, to_curr = pair_key.split("_")
+            batch.append({"id": f"{pair_key}_{timestamp}",
+                          "from_currency": from_curr, "to_currency": to_curr,
+                          "rate": rate, "timestamp": timestamp,
+                          "source": "Synthetic"})
+            written += 1
+        if len(batch) >= 10_000:
+            history.append(batch)
+            batch = []
+    if batch:
+        history.append(batch)
+    return written
+
+
+def generate(data_dir: str, users: int, wallets: int, history: int,
+             seed: int = 1) -> dict:
+    """Создает набор данных в data_dir; возвращает его параметры."""
+    if not 1 <= wallets <= len(WALLET_CURRENCIES) + 1:
+        raise ValueError(f"--wallets должно быть от 1 до "
+                         f"{len(WALLET_CURRENCIES) + 1}")
+    rng = random.Random(seed)
+    os.makedirs(data_dir, exist_ok=True)
+    now = datetime.now(timezone.utc)
+
+    _write_json(os.path.join(data_dir, "users.json"), generate_users(users, rng))
+    _write_json(os.path.join(data_dir, "portfolios.json"),
+                generate_portfolios(users, wallets, rng))
+    _write_json(os.path.join(data_dir, "rates.json"), {
+        "pairs": {f"{code}_{BASE_CURRENCY}": {"rate": rate,
+                                              "updated_at": now.isoformat(),
+                                              "source": "Synthetic"}
+                  for code, rate in DEFAULT_START_PRICES.items()},
+        "last_refresh": now.isoformat(),
+    })
+    written = generate_history(os.path.join(data_dir, "history"), history, seed,
+                               now)
+    return {"users": users, "wallets": wallets, "history": written, "seed": seed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--wallets", type=int, default=3,
+                        help="кошельков на пользователя, включая USD")
+    parser.add_argument("--history", type=int, default=10_000,
+                        help="записей истории курсов")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", required=True, help="каталог данных")
+    options = parser.parse_args()
+    try:
+        params = generate(options.out, options.users, options.wallets,
+                          options.history, options.seed)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"{options.out}: пользователей {params['users']}, кошельков "
+          f"{params['wallets']}, записей истории {params['history']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# benchmarks/password_kdf.py
+"""
+Задержка входа в зависимости от алгоритма и стоимости хеширования паролей.
+
+Для каждой конфигурации измеряется то, что делает login_user:
+загрузка пользователя (User.from_dict) и проверка пароля. Отдельной строкой
+показана стоимость самой загрузки, которая не должна зависеть от алгоритма.
+
+    python benchmarks/password_kdf.py
+    python benchmarks/password_kdf.py --runs 20 --json kdf.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from valutatrade_hub.core.models import User  # noqa: E402
+
+CONFIGS = [
+    ("sha256", {}),
+    ("pbkdf2_sha256", {"iterations": 100_000}),
+    ("pbkdf2_sha256", {"iterations": 300_000}),
+    ("pbkdf2_sha256", {"iterations": 600_000}),
+    ("scrypt", {"n": 2 ** 12, "r": 8, "p": 1}),
+    ("scrypt", {"n": 2 ** 14, "r": 8, "p": 1}),
+    ("scrypt", {"n": 2 ** 15, "r": 8, "p": 1}),
+]
+
+PASSWORD = "correct horse battery staple"
+
+
+def measure(func, runs: int) -> list:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def run(runs: int) -> dict:
+    results = []
+    for algorithm, params in CONFIGS:
+        user_data = User(user_id=1, username="bench", password=PASSWORD,
+                         hash_algorithm=algorithm, hash_params=params).to_dict()
+
+        def login():
+            User.from_dict(user_data).verify_password(PASSWORD)
+
+        samples = measure(login, runs)
+        results.append({
+            "algorithm": algorithm,
+            "params": params,
+            "median_ms": round(statistics.median(samples), 3),
+            "min_ms": round(min(samples), 3),
+        })
+
+    load_samples = measure(lambda: User.from_dict(user_data), max(runs, 1000))
+    return {
+        "benchmark": "password_kdf",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "runs": runs,
+        "from_dict_us": round(statistics.median(load_samples) * 1000, 2),
+        "login": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10,
+                        help="проверок пароля на конфигурацию (по умолчанию 10)")
+    parser.add_argument("--json", dest="json_path",
+                        help="сохранить отчет в JSON-файл")
+    options = parser.parse_args()
+
+    report = run(options.runs)
+    print(f"Python {report['python']}, User.from_dict: "
+          f"{report['from_dict_us']:.1f} мкс")
+    print(f"{'алгоритм':<15} {'параметры':<28} {'медиана':>10} {'мин':>10}")
+    for row in report["login"]:
+        params = ", ".join(f"{k}={v}" for k, v in row["params"].items()) or "-"
+        print(f"{row['algorithm']:<15} {params:<28} {row['median_ms']:>8.2f}ms "
+              f"{row['min_ms']:>8.2f}ms")
+
+    if options.json_path:
+        with open(options.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# benchmarks/rates_update.py
+"""
+Нагрузочный прогон RatesUpdater и истории курсов без сети.
+
+Курсы выдает локальный поставщик (valutatrade_hub.parser_service.fake_provider):
+в режиме stub настоящие клиенты CoinGecko и ExchangeRate-API обращаются
+к HTTP-заглушке в этом же процессе, в режиме replay — ReplayClient без HTTP.
+Данные пишутся во временный каталог; измеряются время одного обновления
+(опрос + rates.json + сегменты истории) и чтение накопленной истории.
+
+    python benchmarks/rates_update.py
+    python benchmarks/rates_update.py --updates 2000 --latency 0.05 --error-rate 0.1
+    python benchmarks/rates_update.py --mode replay --json update.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from valutatrade_hub.parser_service.api_clients import (  # noqa: E402
+    CoinGeckoClient,
+    ExchangeRateApiClient,
+)
+from valutatrade_hub.parser_service.fake_provider import (  # noqa: E402
+    FakeRatesServer,
+    RandomWalkSource,
+    RecordedSource,
+    ReplayClient,
+)
+from valutatrade_hub.parser_service.history_query import (  # noqa: E402
+    RateHistoryQuery,
+)
+from valutatrade_hub.parser_service.storage import RatesStorage  # noqa: E402
+from valutatrade_hub.parser_service.transport import HttpTransport  # noqa: E402
+from valutatrade_hub.parser_service.updater import RatesUpdater  # noqa: E402
+
+
+def percentile(samples: list, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run(options) -> dict:
+    workdir = tempfile.mkdtemp(prefix="trade-rates-bench-")
+    source = RecordedSource.from_file(options.replay_file) if options.replay_file \
+        else RandomWalkSource(seed=options.seed)
+    storage = RatesStorage(
+        cache_path=os.path.join(workdir, "rates.json"),
+        history_dir=os.path.join(workdir, "history"),
+        legacy_history_path=os.path.join(workdir, "exchange_rates.json"),
+        max_segment_bytes=options.segment_kb * 1024)
+    server = None
+    try:
+        if options.mode == "stub":
+            server = FakeRatesServer(source, latency=options.latency,
+                                     error_rate=options.error_rate,
+                                     seed=options.seed).start()
+            # Без задержек между повторами: измеряется код, а не backoff
+            transport = HttpTransport(backoff_base=0.001, backoff_max=0.001)
+            clients = [CoinGeckoClient(url=server.coingecko_url,
+                                       transport=transport),
+                       ExchangeRateApiClient(url=server.exchangerate_url,
+                                             api_key="offline",
+                                             transport=transport)]
+        else:
+            clients = [ReplayClient(source, latency=options.latency,
+                                    error_rate=options.error_rate,
+                                    seed=options.seed)]
+        updater = RatesUpdater(clients, storage)
+
+        samples, failed = [], 0
+        started = time.perf_counter()
+        for _ in range(options.updates):
+            update_started = time.perf_counter()
+            report = updater.run_update()
+            samples.append((time.perf_counter() - update_started) * 1000)
+            failed += sum(1 for r in report.values() if r["status"] != "ok")
+        elapsed = time.perf_counter() - started
+
+        segments = storage.history.segments()
+        query_started = time.perf_counter()
+        points = len(RateHistoryQuery(storage.history).series("BTC_USD"))
+        query_ms = (time.perf_counter() - query_started) * 1000
+    finally:
+        if server is not None:
+            server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "benchmark": "rates_update",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "mode": options.mode,
+        "updates": options.updates,
+        "latency_s": options.latency,
+        "error_rate": options.error_rate,
+        "updates_per_s": round(options.updates / elapsed, 1),
+        "update_median_ms": round(statistics.median(samples), 3),
+        "update_p95_ms": round(percentile(samples, 0.95), 3),
+        "failed_sources": failed,
+        "history_records": sum(s.count for s in segments),
+        "history_segments": len(segments),
+        "history_bytes": sum(s.size for s in segments),
+        "query_btc_points": points,
+        "query_btc_ms": round(query_ms, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mode", choices=("stub", "replay"), default="stub",
+                        help="stub — HTTP-заглушка, replay — без HTTP")
+    parser.add_argument("--updates", type=int, default=200,
+                        help="число обновлений (по умолчанию 200)")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="имитируемая задержка ответа источника, с")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="доля имитируемых сбоев источника")
+    parser.add_argument("--replay-file",
+                        help="записанные кадры курсов вместо случайного блуждания")
+    parser.add_argument("--segment-kb", type=int, default=256,
+                        help="размер сегмента истории, КиБ (по умолчанию 256)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", dest="json_path",
+                        help="сохранить отчет в JSON-файл")
+    options = parser.parse_args()
+
+    # Ошибки источников при --error-rate ожидаемы и не должны засорять вывод
+    logging.disable(logging.CRITICAL)
+    report = run(options)
+    print(f"Python {report['python']}, режим {report['mode']}, "
+          f"обновлений: {report['updates']}")
+    print(f"обновлений в секунду:   {report['updates_per_s']:>10.1f}")
+    print(f"обновление, медиана:    {report['update_median_ms']:>8.2f}ms")
+    print(f"обновление, p95:        {report['update_p95_ms']:>8.2f}ms")
+    print(f"неудачных опросов:      {report['failed_sources']:>10}")
+    print(f"история: {report['history_records']} записей, "
+          f"{report['history_segments']} сегм., "
+          f"{report['history_bytes'] / 1024:.0f} КиБ")
+    print(f"чтение BTC_USD:         {report['query_btc_ms']:>8.2f}ms "
+          f"({report['query_btc_points']} точек)")
+
+    if options.json_path:
+        with open(options.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# benchmarks/startup.py
+"""
+Бенчмарк времени запуска CLI по командам.
+
+Каждая команда запускается в отдельном процессе (как при обычном вызове
+`trade`) на копии data/ во временном каталоге. Для каждой команды
+измеряется медиана полного времени выполнения и время импортов
+(python -X importtime), а также фиксируется, какие тяжелые модули
+(numpy, requests, ...) были загружены.
+
+    python benchmarks/startup.py                      # таблица
+    python benchmarks/startup.py --json startup.json  # сохранить отчет
+    python benchmarks/startup.py --baseline startup.json
+        # сравнить с сохраненным отчетом; код 1 при регрессии
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(ROOT, "main.py")
+
+COMMANDS = [
+    ["--help"],
+    ["list-currencies"],
+    ["logout"],
+    ["show-portfolio"],
+    ["get-rate", "--from", "EUR", "--to", "USD"],
+    ["show-rates"],
+]
+
+# Модули, которые не должны загружаться командами, которым они не нужны
+HEAVY_MODULES = ("numpy", "requests", "urllib3", "dotenv", "sqlite3",
+                 "valutatrade_hub.parser_service")
+
+_IMPORT_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def prepare_workdir() -> str:
+    """Копирует данные и настройки во временный каталог."""
+    workdir = tempfile.mkdtemp(prefix="trade-startup-")
+    shutil.copy(os.path.join(ROOT, "pyproject.toml"), workdir)
+    shutil.copytree(os.path.join(ROOT, "data"), os.path.join(workdir, "data"),
+                    ignore=shutil.ignore_patterns("history", "*.db*", "*.lock",
+                                                  "*.sock", ".session"))
+    rates_path = os.path.join(workdir, "data", "rates.json")
+    if os.path.exists(rates_path):
+        # Свежие метки, чтобы команды с курсами не упирались в TTL
+        with open(rates_path, encoding="utf-8") as f:
+            rates = json.load(f)
+        now = datetime.now(timezone.utc).isoformat()
+        rates["last_refresh"] = now
+        for pair in rates.get("pairs", {}).values():
+            pair["updated_at"] = now
+        with open(rates_path, "w", encoding="utf-8") as f:
+            json.dump(rates, f)
+    return workdir
+
+
+def run_once(args, workdir: str, env: dict) -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, MAIN, *args], cwd=workdir, env=env,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                   check=False)
+    return time.perf_counter() - started
+
+
+def import_profile(args, workdir: str, env: dict) -> tuple[float, list]:
+    """Суммарное время импортов верхнего уровня (мс) и загруженные тяжелые модули."""
+    result = subprocess.run([sys.executable, "-X", "importtime", MAIN, *args],
+                            cwd=workdir, env=env, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, text=True, check=False)
+    total_us, loaded = 0, set()
+    for line in result.stderr.splitlines():
+        match = _IMPORT_RE.match(line)
+        if not match:
+            continue
+        cumulative, indent, module = int(match.group(2)), match.group(3), \
+            match.group(4)
+        if len(indent) == 1:
+            total_us += cumulative
+        for heavy in HEAVY_MODULES:
+            if module == heavy or module.startswith(heavy + "."):
+                loaded.add(heavy)
+    return total_us / 1000, sorted(loaded)
+
+
+def run(runs: int) -> dict:
+    workdir = prepare_workdir()
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    env.pop("EXCHANGERATE_API_KEY", None)
+    try:
+        commands = {}
+        for args in COMMANDS:
+            name = " ".join(args)
+            run_once(args, workdir, env)  # прогрев файлового кэша и .pyc
+            samples = [run_once(args, workdir, env) * 1000 for _ in range(runs)]
+            imports_ms, heavy = import_profile(args, workdir, env)
+            commands[name] = {
+                "median_ms": round(statistics.median(samples), 2),
+                "min_ms": round(min(samples), 2),
+                "max_ms": round(max(samples), 2),
+                "imports_ms": round(imports_ms, 2),
+                "heavy_modules": heavy,
+            }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "benchmark": "startup",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": runs,
+        "commands": commands,
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Список регрессий относительно baseline."""
+    problems = []
+    for name, current in report["commands"].items():
+        previous = baseline.get("commands", {}).get(name)
+        if previous is None:
+            continue
+        limit = previous["median_ms"] * (1 + tolerance)
+        if current["median_ms"] > limit:
+            problems.append(f"{name}: {current['median_ms']:.1f} ms > "
+                            f"{previous['median_ms']:.1f} ms "
+                            f"(+{tolerance:.0%} допуск)")
+        new_heavy = set(current["heavy_modules"]) - set(previous["heavy_modules"])
+        if new_heavy:
+            problems.append(f"{name}: новые тяжелые импорты "
+                            f"{', '.join(sorted(new_heavy))}")
+    return problems
+
+
+def print_table(report: dict):
+    print(f"Python {report['python']}, запусков на команду: {report['runs']}")
+    print(f"{'команда':<34} {'медиана':>9} {'мин':>9} {'импорты':>9}  "
+          f"тяжелые модули")
+    for name, row in report["commands"].items():
+        print(f"{name:<34} {row['median_ms']:>7.1f}ms {row['min_ms']:>7.1f}ms "
+              f"{row['imports_ms']:>7.1f}ms  {', '.join(row['heavy_modules']) or '-'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10,
+                        help="запусков каждой команды (по умолчанию 10)")
+    parser.add_argument("--json", dest="json_path",
+                        help="сохранить отчет в JSON-файл")
+    parser.add_argument("--baseline",
+                        help="JSON-отчет для сравнения; код 1 при регрессии")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="допустимый рост медианы относительно baseline")
+    options = parser.parse_args()
+
+    report = run(options.runs)
+    print_table(report)
+
+    if options.json_path:
+        with open(options.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if options.baseline:
+        with open(options.baseline, encoding="utf-8") as f:
+            problems = compare(report, json.load(f), options.tolerance)
+        for problem in problems:
+            print(f"РЕГРЕССИЯ: {problem}", file=sys.stderr)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# benchmarks/storage_encoding.py
+"""
+Сравнение кодировок файлов хранилища: json, compact и binary.
+
+Набор пользователей и портфелей строится benchmarks/datagen.py (соль и хеш
+пароля у каждого пользователя свои, как в настоящих данных). Для каждой
+кодировки измеряются размер файла, запись (кодирование + запись файла) и
+чтение (чтение файла + разбор) — так же, как это делают
+DatabaseManager._save_data и _load_data.
+
+    python benchmarks/storage_encoding.py
+    python benchmarks/storage_encoding.py --users 100000 --wallets 4 --json enc.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import datagen  # noqa: E402
+
+from valutatrade_hub.infra.snapshot_codec import ENCODINGS, decode, encode  # noqa: E402
+
+
+def build_dataset(users: int, wallets: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    users_data = datagen.generate_users(users, rng)
+    for user in users_data:
+        user["salt"] = f"{rng.getrandbits(128):032x}"
+        user["hashed_password"] = f"{rng.getrandbits(256):064x}"
+    now = datetime.now(timezone.utc).isoformat()
+    return {
+        "users": users_data,
+        "portfolios": datagen.generate_portfolios(users, wallets, rng),
+        "rates": {"pairs": {f"{code}_{datagen.BASE_CURRENCY}": {
+            "rate": rate, "updated_at": now, "source": "Synthetic"}
+            for code, rate in datagen.DEFAULT_START_PRICES.items()},
+            "last_refresh": now},
+    }
+
+
+def _median_ms(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(timings), 3)
+
+
+def measure(kind: str, data, encoding: str, path: str, repeat: int) -> dict:
+    def save():
+        with open(path, "wb") as f:
+            f.write(encode(data, kind, encoding))
+
+    def load():
+        with open(path, "rb") as f:
+            return decode(f.read())
+
+    save_ms = _median_ms(save, repeat)
+    load_ms = _median_ms(load, repeat)
+    if load() != data:
+        raise RuntimeError(f"{kind}/{encoding}: данные после чтения не совпадают")
+    return {"bytes": os.path.getsize(path), "save_ms": save_ms, "load_ms": load_ms}
+
+
+def run(options) -> dict:
+    dataset = build_dataset(options.users, options.wallets, options.seed)
+    workdir = tempfile.mkdtemp(prefix="trade-encoding-")
+    try:
+        results = {kind: {encoding: measure(kind, data, encoding,
+                                            os.path.join(workdir, kind),
+                                            options.repeat)
+                          for encoding in ENCODINGS}
+                   for kind, data in dataset.items()}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "benchmark": "storage_encoding",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "users": options.users,
+        "wallets": options.wallets,
+        "repeat": options.repeat,
+        "results": results,
+    }
+
+
+def print_table(report: dict):
+    print(f"Python {report['python']}, пользователей: {report['users']}, "
+          f"кошельков: {report['wallets']}; медиана из {report['repeat']}")
+    print(f"{'файл':<11} {'кодировка':<9} {'размер, КиБ':>12} {'запись, мс':>11} "
+          f"{'чтение, мс':>11} {'размер/json':>12}")
+    for kind, by_encoding in report["results"].items():
+        json_bytes = by_encoding["json"]["bytes"]
+        for encoding, row in by_encoding.items():
+            print(f"{kind:<11} {encoding:<9} {row['bytes'] / 1024:>12.1f} "
+                  f"{row['save_ms']:>11.2f} {row['load_ms']:>11.2f} "
+                  f"{row['bytes'] / json_bytes:>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=10_000,
+                        help="число пользователей и портфелей")
+    parser.add_argument("--wallets", type=int, default=3,
+                        help="кошельков на пользователя, включая USD")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="повторов каждого замера")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", dest="json_path",
+                        help="сохранить отчет в JSON-файл")
+    options = parser.parse_args()
+
+    report = run(options)
+    print_table(report)
+
+    if options.json_path:
+        with open(options.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
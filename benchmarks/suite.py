@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# benchmarks/suite.py
+"""
+Бенчмарк основных операций в зависимости от объема данных.
+
+Для каждого размера набор данных создается benchmarks/datagen.py во
+временном каталоге, а операции выполняются в отдельном процессе (с
+пустыми кэшами и индексами DatabaseManager) через usecases и CLI:
+register_user, login_user, buy_currency, sell_currency, get_exchange_rate,
+show-portfolio и RatesStorage.append_to_history. Отчет в JSON позволяет
+сравнивать версии: рост медианы относительно --baseline выше допуска
+считается регрессией.
+
+    python benchmarks/suite.py                                # 1k и 10k
+    python benchmarks/suite.py --sizes 1000,100000 --backend sqlite --json suite.json
+    python benchmarks/suite.py --baseline suite.json --tolerance 0.3
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import datagen  # noqa: E402
+
+OPERATIONS = ("register_user", "login_user", "buy_currency", "sell_currency",
+              "get_exchange_rate", "show-portfolio", "append_to_history")
+
+
+def _samples(func, count: int) -> dict:
+    """Первый вызов (холодный) и статистика последующих, в микросекундах."""
+    timings = []
+    for i in range(count + 1):
+        started = time.perf_counter()
+        func(i)
+        timings.append((time.perf_counter() - started) * 1_000_000)
+    first, rest = timings[0], sorted(timings[1:])
+    return {
+        "first_us": round(first, 1),
+        "median_us": round(statistics.median(rest), 1),
+        "p95_us": round(rest[min(len(rest) - 1, int(len(rest) * 0.95))], 1),
+        "mean_us": round(statistics.fmean(rest), 1),
+    }
+
+
+# Хранилище → настройки [tool.valutatrade]
+BACKENDS = {
+    "json": {"storage_backend": '"json"', "portfolio_journal": "false"},
+    "journal": {"storage_backend": '"json"', "portfolio_journal": "true"},
+    "sqlite": {"storage_backend": '"sqlite"', "portfolio_journal": "false"},
+}
+
+
+def worker(users: int, ops: int, seed: int) -> dict:
+    """Измерения в каталоге с данными (текущий каталог процесса)."""
+    from valutatrade_hub.cli.interface import cli
+    from valutatrade_hub.cli.server import run_command
+    from valutatrade_hub.core import usecases
+    from valutatrade_hub.infra.database import db_manager
+    from valutatrade_hub.infra.settings import settings
+    from valutatrade_hub.parser_service.config import parser_config
+    from valutatrade_hub.parser_service.storage import RatesStorage
+
+    if settings.get("storage_backend") == "sqlite":
+        db_manager.migrate_json_to_sqlite()
+
+    rng = random.Random(seed)
+    picks = [rng.randint(1, users) for _ in range(ops + 1)]
+    results = {}
+
+    results["register_user"] = _samples(
+        lambda i: usecases.register_user(f"bench_new_{i}", datagen.PASSWORD), ops)
+    results["login_user"] = _samples(
+        lambda i: usecases.login_user(datagen.username(picks[i]),
+                                      datagen.PASSWORD), ops)
+
+    traders = [usecases.login_user(datagen.username(uid), datagen.PASSWORD)
+               for uid in picks]
+    results["buy_currency"] = _samples(
+        lambda i: usecases.buy_currency(traders[i], "BTC", 0.0001), ops)
+    results["sell_currency"] = _samples(
+        lambda i: usecases.sell_currency(traders[i], "BTC", 0.0001), ops)
+
+    pairs = [("BTC", "EUR"), ("EUR", "USD"), ("ETH", "RUB"), ("USD", "SOL")]
+    results["get_exchange_rate"] = _samples(
+        lambda i: usecases.get_exchange_rate(*pairs[i % len(pairs)]), ops)
+
+    def show_portfolio(i):
+        db_manager.set_current_user(picks[i])
+        exit_code, _, err = run_command(cli, ["show-portfolio"])
+        if exit_code:
+            raise RuntimeError(f"show-portfolio завершилась с ошибкой: {err}")
+
+    results["show-portfolio"] = _samples(show_portfolio, ops)
+
+    storage = RatesStorage(
+        cache_path=parser_config.RATES_FILE_PATH,
+        history_dir=parser_config.HISTORY_DIR,
+        legacy_history_path=parser_config.HISTORY_FILE_PATH,
+        max_segment_bytes=parser_config.HISTORY_SEGMENT_MAX_BYTES)
+
+    def append_to_history(i):
+        timestamp = datetime.now(timezone.utc).isoformat()
+        storage.append_to_history([
+            {"id": f"{code}_USD_{timestamp}", "from_currency": code,
+             "to_currency": "USD", "rate": rate, "timestamp": timestamp,
+             "source": "Bench"}
+            for code, rate in datagen.DEFAULT_START_PRICES.items()])
+
+    results["append_to_history"] = _samples(append_to_history, ops)
+    return results
+
+
+def _write_settings(workdir: str, backend: str):
+    """Настройки проекта с данными в workdir/data и быстрым хешем паролей."""
+    with open(os.path.join(ROOT, "pyproject.toml"), encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    overrides = {"data_path": '"data"', "password_hash_algorithm": '"sha256"',
+                 "rates_provider": '"replay"', **BACKENDS[backend]}
+    section, result = None, []
+    for line in lines:
+        stripped = line.strip()
+        if stripped.startswith("["):
+            section = stripped
+        key = stripped.split("=", 1)[0].strip()
+        if section == "[tool.valutatrade]" and key in overrides:
+            line = f"{key} = {overrides.pop(key)}"
+        result.append(line)
+    if overrides:
+        if section != "[tool.valutatrade]":
+            result.append("[tool.valutatrade]")
+        result.extend(f"{key} = {value}" for key, value in overrides.items())
+    with open(os.path.join(workdir, "pyproject.toml"), "w", encoding="utf-8") as f:
+        f.write("\n".join(result) + "\n")
+
+
+def run_size(users: int, options) -> dict:
+    workdir = tempfile.mkdtemp(prefix="trade-suite-")
+    try:
+        started = time.perf_counter()
+        datagen.generate(os.path.join(workdir, "data"), users, options.wallets,
+                         options.history, options.seed)
+        generate_s = time.perf_counter() - started
+        _write_settings(workdir, options.backend)
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker",
+             "--users", str(users), "--ops", str(options.ops),
+             "--seed", str(options.seed)],
+            cwd=workdir, env=dict(os.environ, PYTHONPATH=ROOT),
+            capture_output=True, text=True, check=False)
+        if result.returncode != 0:
+            raise RuntimeError(f"Процесс замеров для {users} пользователей "
+                               f"завершился с ошибкой:\n{result.stderr}")
+        operations = json.loads(result.stdout.splitlines()[-1])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {"generate_s": round(generate_s, 2), "operations": operations}
+
+
+def run(options) -> dict:
+    sizes = {}
+    for users in options.sizes:
+        print(f"... {users} пользователей", file=sys.stderr)
+        sizes[str(users)] = run_size(users, options)
+    return {
+        "benchmark": "suite",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "backend": options.backend,
+        "wallets": options.wallets,
+        "history": options.history,
+        "ops": options.ops,
+        "sizes": sizes,
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Список регрессий медиан относительно baseline (по совпадающим размерам)."""
+    problems = []
+    for size, current in report["sizes"].items():
+        previous = baseline.get("sizes", {}).get(size)
+        if previous is None:
+            continue
+        for name, row in current["operations"].items():
+            old = previous["operations"].get(name)
+            if old is None:
+                continue
+            limit = old["median_us"] * (1 + tolerance)
+            if row["median_us"] > limit:
+                problems.append(f"{name} @ {size}: {row['median_us']:.0f} us > "
+                                f"{old['median_us']:.0f} us "
+                                f"(+{tolerance:.0%} допуск)")
+    return problems
+
+
+def print_table(report: dict):
+    sizes = list(report["sizes"])
+    print(f"Python {report['python']}, хранилище {report['backend']}, "
+          f"операций на замер: {report['ops']}; медиана, мкс")
+    print(f"{'операция':<20}" + "".join(f"{size:>12}" for size in sizes))
+    for name in OPERATIONS:
+        print(f"{name:<20}" + "".join(
+            f"{report['sizes'][size]['operations'][name]['median_us']:>12.1f}"
+            for size in sizes))
+
+
+def _sizes(value: str) -> list:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=_sizes, default=[1_000, 10_000],
+                        help="числа пользователей через запятую")
+    parser.add_argument("--wallets", type=int, default=3,
+                        help="кошельков на пользователя, включая USD")
+    parser.add_argument("--history", type=int, default=50_000,
+                        help="записей истории курсов в наборе")
+    parser.add_argument("--ops", type=int, default=100,
+                        help="вызовов каждой операции на размер")
+    parser.add_argument("--backend", choices=tuple(BACKENDS), default="json",
+                        help="json, json с журналом (journal) или sqlite")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", dest="json_path",
+                        help="сохранить отчет в JSON-файл")
+    parser.add_argument("--baseline",
+                        help="JSON-отчет для сравнения; код 1 при регрессии")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="допустимый рост медианы относительно baseline")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--users", type=int, help=argparse.SUPPRESS)
+    options = parser.parse_args()
+
+    if options.worker:
+        print(json.dumps(worker(options.users, options.ops, options.seed)))
+        return
+
+    report = run(options)
+    print_table(report)
+
+    if options.json_path:
+        with open(options.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if options.baseline:
+        with open(options.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("backend") != report["backend"]:
+            print(f"Отчет {options.baseline} снят для хранилища "
+                  f"{baseline.get('backend')}, а не {report['backend']}: "
+                  f"сравнение невозможно.", file=sys.stderr)
+            sys.exit(2)
+        problems = compare(report, baseline, options.tolerance)
+        for problem in problems:
+            print(f"РЕГРЕССИЯ: {problem}", file=sys.stderr)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
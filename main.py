@@ -1,9 +1,6 @@
 #!/usr/bin/env python3
 
-from valutatrade_hub.cli.interface import cli
-from valutatrade_hub.logging_config import setup_logging
-
-setup_logging()
+from valutatrade_hub.cli.client import main
 
 if __name__ == '__main__':
-    cli()
+    main()
@@ -0,0 +1,29 @@
+# tests/conftest.py
+import pytest
+import toml
+
+from valutatrade_hub.infra.database import DatabaseManager
+from valutatrade_hub.infra.settings import settings
+
+
+@pytest.fixture
+def make_db(tmp_path, monkeypatch):
+    """
+    Создает DatabaseManager с данными во временном каталоге.
+    Параметры [tool.valutatrade] передаются именованными аргументами.
+    """
+    monkeypatch.chdir(tmp_path)
+    original = DatabaseManager._instance
+
+    def factory(**options) -> DatabaseManager:
+        options.setdefault("data_path", str(tmp_path / "data"))
+        with open("pyproject.toml", "w", encoding="utf-8") as f:
+            toml.dump({"tool": {"valutatrade": options}}, f)
+        settings.reload()
+        DatabaseManager._instance = None
+        return DatabaseManager()
+
+    yield factory
+    DatabaseManager._instance = original
+    monkeypatch.undo()
+    settings.reload()
@@ -0,0 +1,31 @@
+# tests/test_history_query.py
+import json
+from datetime import datetime, timezone
+
+from valutatrade_hub.parser_service.history import SegmentedHistory
+from valutatrade_hub.parser_service.history_query import RateHistoryQuery
+
+
+def test_pair_matched_by_fields_not_id_format(tmp_path):
+    records = [
+        # Записи без id и в компактном JSON, как у сторонних писателей
+        {"from_currency": "BTC", "to_currency": "USD", "rate": 100.0,
+         "timestamp": "2025-01-01T10:00:00+00:00"},
+        {"from_currency": "ETH", "to_currency": "USD", "rate": 5.0,
+         "timestamp": "2025-01-01T10:30:00+00:00"},
+        {"id": "legacy-7", "from_currency": "BTC", "to_currency": "USD",
+         "rate": 110.0, "timestamp": "2025-01-01T11:00:00+00:00"},
+        # Коды пары встречаются в строке, но пара другая
+        {"from_currency": "USD", "to_currency": "BTC", "rate": 0.01,
+         "timestamp": "2025-01-01T11:30:00+00:00"},
+    ]
+    with open(tmp_path / "rates-2025-01-01-000.jsonl", "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    query = RateHistoryQuery(SegmentedHistory(str(tmp_path)))
+
+    assert query.range("btc_usd") == [
+        (datetime(2025, 1, 1, 10, tzinfo=timezone.utc), 100.0),
+        (datetime(2025, 1, 1, 11, tzinfo=timezone.utc), 110.0)]
+    assert [rate for _, rate in query.range("ETH_USD")] == [5.0]
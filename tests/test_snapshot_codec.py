@@ -0,0 +1,43 @@
+# tests/test_snapshot_codec.py
+import pytest
+
+from valutatrade_hub.infra.snapshot_codec import (
+    ENCODINGS,
+    SnapshotDecodeError,
+    decode,
+    encode,
+)
+
+USERS = [{"user_id": 1, "username": "alice", "salt": "s1", "hashed_password": "h1",
+          "registration_date": "2025-01-01T00:00:00", "hash_algorithm": "scrypt",
+          "hash_params": {"n": 16384}},
+         {"user_id": 2, "username": "bob", "salt": "s2", "hashed_password": "h2",
+          "registration_date": "2025-01-02T00:00:00"}]
+PORTFOLIOS = [{"user_id": 1, "version": 3, "wallets": {
+    "USD": {"currency_code": "USD", "balance": 9000.5},
+    "BTC": {"currency_code": "BTC", "balance": 0.01}}}]
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+@pytest.mark.parametrize("kind, data", [("users", USERS),
+                                        ("portfolios", PORTFOLIOS)])
+def test_round_trip(kind, data, encoding):
+    assert decode(encode(data, kind, encoding)) == data
+
+
+@pytest.mark.parametrize("cut", [8, 20, -1, -20])
+def test_truncated_binary_raises_decode_error(cut):
+    content = encode(USERS, "users", "binary")
+    with pytest.raises(SnapshotDecodeError):
+        decode(content[:cut])
+
+
+def test_truncated_binary_file_loads_as_empty(make_db):
+    db = make_db(storage_encoding="binary")
+    db.save_users(USERS)
+    with open(db.users_file, "rb") as f:
+        content = f.read()
+    with open(db.users_file, "wb") as f:
+        f.write(content[:-10])
+
+    assert db._load_data(db.users_file) == []
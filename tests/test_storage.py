@@ -0,0 +1,66 @@
+# tests/test_storage.py
+import pytest
+
+from valutatrade_hub.infra.sqlite_storage import SqliteStorage
+
+USER = {"user_id": 1, "username": "alice", "salt": "salt",
+        "hashed_password": "hash", "registration_date": "2025-01-01T00:00:00"}
+
+
+def test_migrate_applies_uncompacted_journal(make_db):
+    db = make_db(portfolio_journal=True)
+    db.add_user(dict(USER))
+    db.save_portfolios([{"user_id": 1, "wallets": {
+        "EUR": {"currency_code": "EUR", "balance": 176.0}}}])
+    db.apply_wallet_deltas({1: {"EUR": 24.0, "USD": 10.0}})
+    assert db._journal.pending_count() == 2
+
+    assert db.migrate_json_to_sqlite() == (1, 1)
+
+    storage = SqliteStorage(db.sqlite_file)
+    try:
+        wallets = storage.get_portfolio(1)["wallets"]
+    finally:
+        storage.close()
+    assert wallets["EUR"]["balance"] == 200.0
+    assert wallets["USD"]["balance"] == 10.0
+
+
+def test_new_journal_starts_with_snapshot_checkpoint(make_db):
+    db = make_db(portfolio_journal=True)
+    db.apply_wallet_deltas({1: {"USD": 100.0, "EUR": 5.0}})
+    db.compact_journal()
+    db._journal.remove()
+
+    db.apply_wallet_deltas({1: {"USD": -40.0}})
+
+    assert db._journal.first_seq() == 2
+    assert db._journal.last_seq() == 3
+    assert db._journal.pending_count() == 1
+    assert db.get_portfolio(1)["wallets"]["USD"]["balance"] == 60.0
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_wallet_columns_cache_follows_storage_changes(make_db, monkeypatch,
+                                                      backend):
+    db = make_db(storage_backend=backend)
+    db.add_user(dict(USER))
+    db.save_portfolios([{"user_id": 1, "wallets": {
+        "USD": {"currency_code": "USD", "balance": 50.0}}}])
+    db.load_wallet_columns()
+
+    # Другой процесс берет столбцы из файла кэша, не читая хранилище
+    other = make_db(storage_backend=backend)
+    with monkeypatch.context() as patch:
+        patch.setattr(other, "_portfolios", None)
+        if other._sqlite:
+            patch.setattr(other._sqlite, "load_wallet_columns", None)
+        user_ids, codes, balances = other.load_wallet_columns()
+    assert (user_ids.tolist(), codes.tolist(), balances.tolist()) == \
+        ([1], ["USD"], [50.0])
+
+    other.apply_wallet_deltas({1: {"USD": -20.0, "BTC": 0.5}})
+    user_ids, codes, balances = db.load_wallet_columns()
+    assert sorted(zip(codes.tolist(), balances.tolist())) == \
+        [("BTC", 0.5), ("USD", 30.0)]
+    assert db.get_usernames([1, 2]) == {1: "alice"}
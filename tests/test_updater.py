@@ -0,0 +1,73 @@
+# tests/test_updater.py
+import socket
+import threading
+import time
+
+import pytest
+
+from valutatrade_hub.core import conversion, usecases
+from valutatrade_hub.core.exceptions import ApiRequestError
+from valutatrade_hub.infra import rates_refresh
+from valutatrade_hub.parser_service.api_clients import BaseApiClient, CoinGeckoClient
+from valutatrade_hub.parser_service.storage import RatesStorage
+from valutatrade_hub.parser_service.transport import HttpTransport
+from valutatrade_hub.parser_service.updater import RatesUpdater
+
+
+def test_hung_source_does_not_outlive_deadline():
+    # Сервер принимает соединение, но никогда не отвечает
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    url = f"http://127.0.0.1:{server.getsockname()[1]}/api/v3/simple/price"
+    client = CoinGeckoClient(url=url, timeout=30, transport=HttpTransport())
+    updater = RatesUpdater([client], storage=None, deadline=0.5)
+    try:
+        started = time.monotonic()
+        report = updater.run_update()
+        assert report["CoinGecko"]["status"] == "timeout"
+
+        for thread in threading.enumerate():
+            if thread.name.startswith("rates-fetch"):
+                thread.join(timeout=5)
+                assert not thread.is_alive()
+        assert time.monotonic() - started < 2
+    finally:
+        server.close()
+
+
+class CryptoStubClient(BaseApiClient):
+    def fetch_rates(self, deadline: float = None):
+        return {"BTC_USD": 100.0}
+
+
+class FiatStubClient(BaseApiClient):
+    def fetch_rates(self, deadline: float = None):
+        raise ConnectionError("источник недоступен")
+
+
+def test_failing_source_rates_age_out(make_db, monkeypatch, tmp_path):
+    db = make_db(rates_ttl_seconds=300, rates_max_stale_seconds=900)
+    old = "2020-01-01T00:00:00+00:00"
+    storage = RatesStorage(cache_path=db.rates_file,
+                           history_dir=str(tmp_path / "history"))
+    storage.save_rates_cache({
+        "BTC_USD": {"rate": 90.0, "updated_at": old, "source": "CryptoStub"},
+        "EUR_USD": {"rate": 1.1667, "updated_at": old, "source": "FiatStub"}})
+
+    report = RatesUpdater([CryptoStubClient(), FiatStubClient()],
+                          storage).run_update()
+
+    assert report["FiatStub"]["status"] == "error"
+    cache = storage.load_rates_cache()
+    assert cache["sources"]["FiatStub"] == old
+    assert cache["sources"]["CryptoStub"] > old
+    assert cache["last_refresh"] == old
+
+    monkeypatch.setattr(usecases, "db_manager", db)
+    monkeypatch.setattr(conversion, "_matrix", None)
+    monkeypatch.setattr(rates_refresh, "request_background_refresh", lambda: False)
+    quote = usecases.get_rate_quote("BTC", "USD")
+    assert (quote.rate, quote.stale) == (100.0, False)
+    with pytest.raises(ApiRequestError, match="устарел"):
+        usecases.get_rate_quote("EUR", "USD")
@@ -0,0 +1,86 @@
+# tests/test_usecases.py
+from datetime import datetime, timezone
+
+import pytest
+
+from valutatrade_hub.core import usecases
+from valutatrade_hub.core.exceptions import ConcurrentModificationError
+
+
+def _conflicting(conflicts: int):
+    calls = []
+
+    def operation():
+        calls.append(1)
+        if len(calls) <= conflicts:
+            raise ConcurrentModificationError("портфель пользователя 1")
+        return "ok"
+    return operation, calls
+
+
+def test_commit_retries_until_operation_succeeds(make_db):
+    make_db(commit_retries=1, commit_retry_seconds=5)
+    operation, calls = _conflicting(conflicts=8)
+
+    assert usecases._with_commit_retries(operation) == "ok"
+    assert len(calls) == 9
+
+
+def test_commit_retries_exhausted_raise_domain_error(make_db):
+    make_db(commit_retries=2, commit_retry_seconds=0)
+    operation, calls = _conflicting(conflicts=100)
+
+    with pytest.raises(ConcurrentModificationError, match="попыток: 3"):
+        usecases._with_commit_retries(operation)
+    assert len(calls) == 3
+
+
+def test_register_hashes_password_once_across_conflicts(make_db, monkeypatch):
+    db = make_db(password_hash_algorithm="pbkdf2_sha256", pbkdf2_iterations=1000)
+    from valutatrade_hub.core import passwords
+    hash_calls = []
+    original_hash = passwords.hash_password
+    monkeypatch.setattr(passwords, "hash_password",
+                        lambda *args: hash_calls.append(1) or original_hash(*args))
+    original_add = db.add_user
+    conflicts = []
+
+    def add_user(user_data):
+        if len(conflicts) < 2:
+            conflicts.append(1)
+            raise ConcurrentModificationError(f"user_id {user_data['user_id']}")
+        original_add(user_data)
+    monkeypatch.setattr(db, "add_user", add_user)
+    monkeypatch.setattr(usecases, "db_manager", db)
+
+    user = usecases.register_user("alice", "secret12")
+
+    assert len(hash_calls) == 1
+    assert db.get_user(user.user_id)["username"] == "alice"
+    assert user.verify_password("secret12")
+
+
+def test_best_effort_batch_reports_user_without_portfolio(make_db, monkeypatch):
+    db = make_db(password_hash_algorithm="pbkdf2_sha256", pbkdf2_iterations=1000)
+    now = datetime.now(timezone.utc).isoformat()
+    db.save_rates({"pairs": {"BTC_USD": {"rate": 100.0, "updated_at": now,
+                                         "source": "Test"}},
+                   "last_refresh": now})
+    from valutatrade_hub.core import conversion
+    from valutatrade_hub.core.models import User
+    monkeypatch.setattr(conversion, "_matrix", None)
+    monkeypatch.setattr(usecases, "db_manager", db)
+    alice = usecases.register_user("alice", "secret12")
+    db.add_user(User(user_id=db.next_user_id(), username="bob",
+                     password="secret12").to_dict())
+
+    results = usecases.execute_orders(
+        [{"user": "alice", "side": "buy", "currency": "BTC", "amount": 2},
+         {"user": "bob", "side": "buy", "currency": "BTC", "amount": 1}],
+        mode="best-effort")
+
+    assert [r["status"] for r in results] == ["ok", "error"]
+    assert "bob" in results[1]["error"]
+    wallets = usecases.get_user_portfolio(alice).wallets
+    assert wallets["BTC"].balance == 2
+    assert wallets["USD"].balance == 9800
@@ -0,0 +1,87 @@
+# valutatrade_hub/cli/client.py
+import json
+import os
+import socket
+import sys
+from typing import List
+
+from ..infra.settings import settings
+
+# Команды, которые тонкий клиент пересылает резидентному серверу.
+FORWARDED_COMMANDS = frozenset({
+    "register", "login", "logout", "buy", "sell",
+    "show-portfolio", "get-rate", "show-rates", "list-currencies",
+    "leaderboard", "aum", "metrics", "history",
+})
+
+# Опции, которые команда запрашивает интерактивно, если они не переданы.
+# Такие вызовы выполняются локально: у сервера нет доступа к терминалу.
+_PROMPTED_OPTIONS = {
+    "register": ("--username", "--password"),
+    "login": ("--username", "--password"),
+}
+
+
+def get_socket_path() -> str:
+    """Путь к Unix-сокету сервера команд."""
+    return os.path.join(settings.get("data_path", "data"),
+                        settings.get("server_socket", "trade.sock"))
+
+
+def _can_forward(args: List[str]) -> bool:
+    if not args or args[0] not in FORWARDED_COMMANDS:
+        return False
+    for option in _PROMPTED_OPTIONS.get(args[0], ()):
+        if not any(arg == option or arg.startswith(option + "=")
+                   for arg in args[1:]):
+            return False
+    return True
+
+
+def forward(args: List[str], timeout: float = 60.0) -> int | None:
+    """
+    Пересылает команду запущенному серверу и печатает ее вывод.
+    :return: Код завершения или None, если сервер недоступен.
+    """
+    socket_path = get_socket_path()
+    if not os.path.exists(socket_path):
+        return None
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    conn.settimeout(timeout)
+    try:
+        try:
+            conn.connect(socket_path)
+        except OSError:
+            # Сокет остался от остановленного сервера
+            return None
+        # После отправки запроса локальный повтор недопустим: сервер мог
+        # уже выполнить сделку, поэтому сбой связи — это ошибка команды
+        try:
+            conn.sendall(json.dumps({"args": args}).encode("utf-8") + b"\n")
+            with conn.makefile("rb") as reader:
+                response = json.loads(reader.readline())
+        except (OSError, ValueError) as e:
+            sys.stderr.write(f"Ошибка связи с сервером trade: {e}\n")
+            return 1
+    finally:
+        conn.close()
+    sys.stdout.write(response["stdout"])
+    sys.stderr.write(response["stderr"])
+    return response["exit_code"]
+
+
+def main():
+    """
+    Точка входа trade: если запущен `trade serve`, команда выполняется
+    сервером, иначе — локально, как раньше.
+    """
+    args = sys.argv[1:]
+    if _can_forward(args):
+        exit_code = forward(args)
+        if exit_code is not None:
+            sys.exit(exit_code)
+
+    from ..logging_config import setup_logging
+    from .interface import cli
+    setup_logging()
+    cli()
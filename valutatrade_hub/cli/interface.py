@@ -1,24 +1,76 @@
+import os
+import signal
+
 import click
 
 from valutatrade_hub.core.exceptions import (
     ApiRequestError,
     BaseTradeError,
+    ConcurrentModificationError,
     CurrencyNotFoundError,
     InsufficientFundsError,
 )
 from valutatrade_hub.infra.database import db_manager
-from valutatrade_hub.parser_service.updater import get_default_updater
+from valutatrade_hub.infra.rates_snapshot import parse_timestamp
 
 from ..core import usecases
-from ..core.utils import RATES_FILE, load_data
+from ..core.orders import read_orders_file
+
+
+def _start_profiling(ctx: click.Context, output_path: str | None):
+    """
+    Запускает cProfile и таймеры фаз до выполнения команды; по ее
+    завершении сохраняет статистику .pstats и печатает таблицу фаз.
+    """
+    import cProfile
+
+    from ..infra import profiling
+    from ..infra.settings import settings
+
+    command = ctx.invoked_subcommand or "cli"
+    timer = profiling.start()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    # Конфигурация к этому моменту уже прочитана при импорте модулей;
+    # повторная загрузка показывает ее стоимость
+    with profiling.phase("settings"):
+        settings.reload()
+
+    def finish():
+        profiler.disable()
+        profiling.stop()
+        path = output_path or os.path.join(settings.get("log_path", "logs"),
+                                           f"profile-{command}.pstats")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        profiler.dump_stats(path)
+
+        total = timer.total
+        click.echo(f"\nПрофиль команды {command}: {total * 1000:.2f} мс "
+                   f"(под cProfile)", err=True)
+        click.echo(f"{'фаза':<15} {'вызовов':>8} {'мс':>10} {'%':>6}", err=True)
+        for name, calls, seconds in timer.rows():
+            share = seconds / total * 100 if total else 0.0
+            click.echo(f"{name:<15} {calls or '':>8} {seconds * 1000:>10.2f} "
+                       f"{share:>6.1f}", err=True)
+        click.echo(f"Статистика cProfile: {path} "
+                   f"(python -m pstats {path})", err=True)
+
+    ctx.call_on_close(finish)
 
 
 @click.group()
-def cli():
+@click.option('--profile', is_flag=True,
+              help="Выполнить команду под cProfile и вывести время по фазам.")
+@click.option('--profile-output', type=click.Path(dir_okay=False),
+              help="Файл статистики .pstats "
+                   "(по умолчанию logs/profile-<команда>.pstats).")
+@click.pass_context
+def cli(ctx, profile, profile_output):
     """
     Платформа для отслеживания и симуляции торговли валютами.
     """
-    pass
+    if profile:
+        _start_profiling(ctx, profile_output)
 
 
 @cli.command()
@@ -39,7 +91,7 @@ def register(username, password):
                    f"(id={user.user_id}).")
         click.echo("Вам начислен стартовый капитал 10000 USD.")
         click.echo(f"Войдите: trade login --username {user.username} --password ****")
-    except ValueError as e:
+    except (ValueError, ConcurrentModificationError) as e:
         click.echo(f"Ошибка: {e}", err=True)
 
 
@@ -67,7 +119,10 @@ def logout():
 @cli.command('show-portfolio')
 @click.option('--base', default='USD', help="Базовая валюта "
                                             "для отображения общей стоимости.")
-def show_portfolio(base):
+@click.option('--pnl-method', type=click.Choice(['average', 'fifo']),
+              default=None, help="Метод себестоимости для P&L "
+                                 "(по умолчанию pnl_method из настроек).")
+def show_portfolio(base, pnl_method):
     """Показать портфель текущего пользователя."""
     user = usecases.get_logged_in_user()
     if not user:
@@ -76,10 +131,10 @@ def show_portfolio(base):
 
     try:
         portfolio = usecases.get_user_portfolio(user)
-        rates = load_data(RATES_FILE)
+        rates = usecases.get_rates_matrix()
 
         base = base.upper()
-        if base != 'USD' and f"{base}_USD" not in rates:
+        if base not in rates:
             click.echo(f"Ошибка: Неизвестная базовая валюта '{base}'", err=True)
             return
 
@@ -89,7 +144,12 @@ def show_portfolio(base):
             click.echo("Ваш портфель пуст.")
             return
 
-        total_value = 0
+        pnl = usecases.get_portfolio_pnl(user, rates, pnl_method)
+        # P&L считается в валюте сделок и пересчитывается в валюту отображения
+        found = rates.get_rate(pnl['base_currency'], base)
+        pnl_factor = found[0] if found else None
+        totals = {"realized": 0.0, "unrealized": 0.0}
+
         for code, wallet in sorted(portfolio.wallets.items()):
             value_in_base = wallet.balance
             if code != base:
@@ -99,12 +159,29 @@ def show_portfolio(base):
                 except ValueError:
                     value_in_base = 0  # Не можем посчитать
 
-            total_value += value_in_base
-            click.echo(f"- {code}: {wallet.balance:<10.4f} → "
-                       f"{value_in_base:10.2f} {base}")
+            line = f"- {code}: {wallet.balance:<10.4f} → {value_in_base:10.2f} {base}"
+            position = pnl['wallets'].get(code)
+            if position and pnl_factor is not None:
+                columns = []
+                for key, label in (("unrealized", "нереализ."),
+                                   ("realized", "реализ.")):
+                    if position[key] is None:
+                        columns.append(f"{label} {'н/д':>10}")
+                        continue
+                    amount = position[key] * pnl_factor
+                    totals[key] += amount
+                    columns.append(f"{label} {amount:+10.2f}")
+                line += " | P&L: " + ", ".join(columns)
+            click.echo(line)
+
+        total_value = portfolio.get_total_value(base, rates)
 
         click.echo("---------------------------------")
         click.echo(f"ИТОГО: {total_value:13.2f} {base}")
+        if pnl['wallets'] and pnl_factor is not None:
+            click.echo(f"P&L ({pnl['method']}): нереализованный "
+                       f"{totals['unrealized']:+.2f} {base}, реализованный "
+                       f"{totals['realized']:+.2f} {base}")
 
     except Exception as e:
         click.echo(f"Ошибка: {e}", err=True)
@@ -130,7 +207,7 @@ def buy(currency, amount):
         click.echo(f"Оценочная стоимость: {result['cost']:.2f} "
                    f"{result['base_currency']}")
     except (InsufficientFundsError, CurrencyNotFoundError,
-            ApiRequestError, ValueError) as e:
+            ApiRequestError, ConcurrentModificationError, ValueError) as e:
         click.echo(f"Ошибка покупки: {e}", err=True)
         if isinstance(e, CurrencyNotFoundError):
             click.echo("Совет: используйте команду 'list-currencies' "
@@ -165,10 +242,84 @@ def sell(currency, amount):
                        f"Он создаётся при первой покупке.", err=True)
         else:
             click.echo(f"Ошибка продажи: {e}", err=True)
-    except (InsufficientFundsError, CurrencyNotFoundError, ApiRequestError) as e:
+    except (InsufficientFundsError, CurrencyNotFoundError, ApiRequestError,
+            ConcurrentModificationError) as e:
         click.echo(f"Ошибка продажи: {e}", err=True)
 
 
+@cli.command()
+@click.option('--limit', type=int, default=50, show_default=True,
+              help="Количество сделок на странице.")
+@click.option('--before', type=int, default=None,
+              help="Показать сделки с номером меньше указанного.")
+def history(limit, before):
+    """Показать историю сделок текущего пользователя."""
+    user = usecases.get_logged_in_user()
+    if not user:
+        click.echo("Ошибка: Сначала выполните login.", err=True)
+        return
+
+    try:
+        trades = usecases.get_trade_history(user, limit=limit, before=before)
+    except ValueError as e:
+        click.echo(f"Ошибка: {e}", err=True)
+        return
+
+    if not trades:
+        click.echo("Сделок нет.")
+        return
+
+    click.echo(f"{'#':>8}  {'Дата (UTC)':<19}  {'Сделка':<7} {'Валюта':<6} "
+               f"{'Количество':>14} {'Курс':>14} {'Сумма':>14}")
+    for trade in trades:
+        value = trade.get('cost', trade.get('revenue'))
+        side = "покупка" if trade['side'] == "buy" else "продажа"
+        date = trade['timestamp'][:19].replace('T', ' ')
+        click.echo(f"{trade['id']:>8}  {date:<19}  "
+                   f"{side:<7} {trade['currency']:<6} {trade['amount']:>14.4f} "
+                   f"{trade['rate']:>14.6f} {value:>10.2f} {trade['base_currency']}")
+    if len(trades) == limit:
+        click.echo(f"Следующая страница: trade history --limit {limit} "
+                   f"--before {trades[-1]['id']}")
+
+
+@cli.command()
+@click.option('--file', 'file_path', required=True,
+              type=click.Path(exists=True, dir_okay=False),
+              help="Файл заявок: CSV (user,side,currency,amount) или JSON Lines.")
+@click.option('--mode', type=click.Choice(['atomic', 'best-effort']),
+              default='atomic', show_default=True,
+              help="atomic — ничего не сохранять при любой ошибке; "
+                   "best-effort — сохранить успешные заявки.")
+@click.option('--quiet', is_flag=True,
+              help="Выводить только ошибки и итог.")
+def batch(file_path, mode, quiet):
+    """Исполнить пакет заявок на покупку и продажу из файла."""
+    try:
+        orders = read_orders_file(file_path)
+        results = usecases.execute_orders(orders, mode=mode)
+    except (OSError, ValueError, ApiRequestError, ConcurrentModificationError) as e:
+        click.echo(f"Ошибка пакетного исполнения: {e}", err=True)
+        return
+
+    counts = {"ok": 0, "error": 0, "rolled_back": 0}
+    for result in results:
+        counts[result['status']] += 1
+        if result['status'] == "error":
+            click.echo(f"#{result['index']}: ошибка — {result['error']}", err=True)
+        elif not quiet and result['status'] == "ok":
+            value = result.get('cost', result.get('revenue'))
+            click.echo(f"#{result['index']}: {result['user']} {result['side']} "
+                       f"{result['amount']:.4f} {result['currency']} по "
+                       f"{result['rate']:.6f} = {value:.2f} "
+                       f"{result['base_currency']}")
+
+    click.echo(f"Заявок: {len(results)}, исполнено: {counts['ok']}, "
+               f"с ошибкой: {counts['error']}, отменено: {counts['rolled_back']}.")
+    if counts['rolled_back']:
+        click.echo("Режим atomic: изменения не сохранены из-за ошибок.")
+
+
 @cli.command('get-rate')
 @click.option('--from', 'from_curr', required=True, help="Исходная валюта.")
 @click.option('--to', 'to_curr', required=True, help="Целевая валюта.")
@@ -178,9 +329,11 @@ def get_rate(from_curr, to_curr):
         if not from_curr.strip() or not to_curr.strip():
             raise ValueError("Коды валют не могут быть пустыми.")
 
-        rate, updated_at = usecases.get_exchange_rate(from_curr, to_curr)
-        click.echo(f"Курс: 1 {from_curr.upper()} = {rate:.6f} {to_curr.upper()} "
-                   f"(Данные на: {updated_at})")
+        quote = usecases.get_rate_quote(from_curr, to_curr)
+        click.echo(f"Курс: 1 {from_curr.upper()} = {quote.rate:.6f} "
+                   f"{to_curr.upper()} (Данные на: {quote.updated_at})")
+        if quote.stale:
+            click.echo("Внимание: кеш курсов устарел, обновление выполняется в фоне.")
     except (ValueError, CurrencyNotFoundError, ApiRequestError) as e:
         click.echo(f"Ошибка: {e}", err=True)
         if isinstance(e, CurrencyNotFoundError):
@@ -201,6 +354,98 @@ def list_currencies():
             continue
 
 
+@cli.command()
+@click.option('--top', default=10, show_default=True, type=int,
+              help="Сколько портфелей показать.")
+@click.option('--base', default='USD', help="Валюта оценки.")
+def leaderboard(top, base):
+    """Показать самые дорогие портфели всех пользователей."""
+    try:
+        leaders = usecases.get_leaderboard(top, base)
+    except (ValueError, ApiRequestError) as e:
+        click.echo(f"Ошибка: {e}", err=True)
+        return
+    if not leaders:
+        click.echo("Портфелей пока нет.")
+        return
+    click.echo(f"Топ-{len(leaders)} портфелей (база: {base.upper()}):")
+    for leader in leaders:
+        name = leader['username'] or f"id={leader['user_id']}"
+        click.echo(f"{leader['rank']:>3}. {name:<20} {leader['value']:15.2f}")
+
+
+@cli.command()
+@click.option('--by', 'group_by', type=click.Choice(['currency']),
+              help="Разбить итог по валютам.")
+@click.option('--base', default='USD', help="Валюта оценки.")
+def aum(group_by, base):
+    """Показать суммарные активы всех пользователей (AUM)."""
+    try:
+        report = usecases.get_aum(base)
+    except (ValueError, ApiRequestError) as e:
+        click.echo(f"Ошибка: {e}", err=True)
+        return
+    base = report['base_currency']
+    if group_by == 'currency':
+        rows = sorted(report['by_currency'].items(),
+                      key=lambda item: item[1][1], reverse=True)
+        for code, (balance, value) in rows:
+            click.echo(f"- {code:<5} {balance:18.4f} → {value:15.2f} {base}")
+        click.echo("---------------------------------")
+    click.echo(f"Пользователей: {report['users']}")
+    click.echo(f"ИТОГО: {report['total']:.2f} {base}")
+
+
+@cli.command('migrate-storage')
+def migrate_storage():
+    """Импортировать users.json и portfolios.json в базу SQLite."""
+    try:
+        users_count, portfolios_count = db_manager.migrate_json_to_sqlite()
+        click.echo(f"Импортировано в {db_manager.sqlite_file}: "
+                   f"пользователей — {users_count}, портфелей — {portfolios_count}.")
+        if db_manager.backend != "sqlite":
+            click.echo("Чтобы использовать базу, укажите storage_backend = "
+                       "\"sqlite\" в [tool.valutatrade].")
+    except Exception as e:
+        click.echo(f"Ошибка миграции: {e}", err=True)
+
+
+@cli.command('convert-storage')
+@click.option('--to', 'encoding', required=True,
+              type=click.Choice(['json', 'compact', 'binary']),
+              help="Кодировка: json (с отступами), compact или binary.")
+def convert_storage(encoding):
+    """Перезаписать users, portfolios и rates в другой кодировке."""
+    try:
+        results = db_manager.convert_storage(encoding)
+    except Exception as e:
+        click.echo(f"Ошибка конвертации: {e}", err=True)
+        return
+    if not results:
+        click.echo("Файлы данных не найдены.")
+        return
+    for path, old_size, new_size in results:
+        click.echo(f"{path}: {old_size} → {new_size} байт")
+    if db_manager.encoding != encoding:
+        click.echo(f"Чтобы сохранить кодировку при следующих записях, укажите "
+                   f"storage_encoding = \"{encoding}\" в [tool.valutatrade].")
+
+
+@cli.command('compact-journal')
+def compact_journal():
+    """Свернуть журнал изменений портфелей в снимок portfolios.json."""
+    if db_manager.backend != "json":
+        click.echo("Журнал используется только с storage_backend = \"json\".")
+        return
+    try:
+        portfolios_data = db_manager.compact_journal(
+            keep_journal=db_manager.journal_enabled)
+        click.echo(f"Журнал свернут в {db_manager.portfolios_file} "
+                   f"(портфелей: {len(portfolios_data)}).")
+    except Exception as e:
+        click.echo(f"Ошибка компактификации: {e}", err=True)
+
+
 @cli.command('update-rates')
 @click.option('--source',
               type=click.Choice(['coingecko', 'exchangerate'],
@@ -208,9 +453,17 @@ def list_currencies():
               help="Обновить данные только из указанного источника.")
 def update_rates(source):
     """Запустить немедленное обновление курсов валют."""
+    from valutatrade_hub.parser_service.updater import get_default_updater
+
     try:
         updater = get_default_updater()
-        updater.run_update(source_filter=source)
+        report = updater.run_update(source_filter=source)
+        for source_name, result in report.items():
+            if result['status'] == "ok":
+                click.echo(f"- {source_name}: получено курсов — {result['rates']} "
+                           f"за {result['duration']:.2f} с")
+            else:
+                click.echo(f"- {source_name}: ошибка ({result['error']})", err=True)
         click.echo("Обновление курсов завершено. Проверьте лог-файл для деталей.")
     except BaseTradeError as e:
         click.echo(f"Ошибка при обновлении: {e}", err=True)
@@ -218,6 +471,45 @@ def update_rates(source):
         click.echo(f"Непредвиденная ошибка: {e}", err=True)
 
 
+@cli.command('rates-daemon')
+@click.option('--stop', 'stop_daemon', is_flag=True,
+              help="Остановить запущенный демон.")
+def rates_daemon(stop_daemon):
+    """Обновлять курсы по расписанию (Ctrl+C — остановить)."""
+    from valutatrade_hub.infra.locking import PidFile
+    from valutatrade_hub.infra.rates_refresh import daemon_pid_path
+
+    pid_file = PidFile(daemon_pid_path())
+    if stop_daemon:
+        pid = pid_file.owner_pid()
+        if not pid:
+            click.echo("Демон обновления курсов не запущен.")
+            return
+        os.kill(pid, signal.SIGTERM)
+        click.echo(f"Демону обновления курсов (PID {pid}) отправлен сигнал "
+                   f"остановки.")
+        return
+
+    if not pid_file.acquire():
+        click.echo(f"Демон обновления курсов уже запущен "
+                   f"(PID {pid_file.owner_pid()}).", err=True)
+        return
+
+    from valutatrade_hub.parser_service.scheduler import RatesScheduler, run_daemon
+    from valutatrade_hub.parser_service.updater import get_default_updater
+
+    try:
+        scheduler = RatesScheduler(get_default_updater())
+        click.echo("Демон обновления курсов запущен:")
+        for schedule in scheduler.schedules:
+            click.echo(f"- {schedule.client.__class__.__name__}: каждые "
+                       f"{schedule.interval:.0f} с (±{schedule.jitter:.0%})")
+        run_daemon(scheduler)
+    finally:
+        pid_file.release()
+    click.echo("Демон обновления курсов остановлен.")
+
+
 @cli.command('show-rates')
 @click.option('--currency', help="Показать курс только для"
                                  " указанной валюты (например, BTC).")
@@ -228,31 +520,25 @@ def update_rates(source):
 def show_rates(currency, top, base):
     """Показать актуальные курсы из локального кеша."""
     try:
-        rates_data = db_manager.load_rates()
-        if not rates_data or not rates_data.get("pairs"):
+        rates = db_manager.get_rates_snapshot()
+        if not rates:
             click.echo("Локальный кеш курсов пуст. "
                        "Выполните 'trade update-rates'.", err=True)
             return
 
         click.echo(f"Курсы из кеша "
-                   f"(обновлено: {rates_data.get('last_refresh', 'N/A')})")
+                   f"(обновлено: {rates.last_refresh or 'N/A'})")
+        for source, refreshed in sorted(rates.sources.items()):
+            click.echo(f"  {source}: {refreshed}")
 
-        all_pairs = rates_data["pairs"]
+        base = base.upper()
         output_rates = []
 
-        for pair_key, data in all_pairs.items():
-            from_c, to_c = pair_key.split('_')
-
-            if to_c == base.upper():
-                rate = data['rate']
-
-            else:
-                continue
-
+        for from_c, rate in usecases.get_rates_matrix().rates_to(base).items():
             if currency and from_c != currency.upper():
                 continue
 
-            output_rates.append((pair_key, rate))
+            output_rates.append((f"{from_c}_{base}", rate))
 
         if top:
             output_rates.sort(key=lambda x: x[1], reverse=True)
@@ -271,5 +557,121 @@ def show_rates(currency, top, base):
         click.echo(f"Ошибка при чтении кеша: {e}", err=True)
 
 
+def _parse_cli_time(value: str | None, option: str):
+    if value is None:
+        return None
+    parsed = parse_timestamp(value)
+    if parsed is None:
+        raise click.BadParameter(f"ожидается дата в формате ISO 8601, "
+                                 f"получено '{value}'", param_hint=option)
+    return parsed
+
+
+@cli.command('rate-history')
+@click.option('--pair', required=True, help="Валютная пара, например BTC_USD.")
+@click.option('--from', 'from_ts', help="Начало периода (ISO 8601, UTC).")
+@click.option('--to', 'to_ts', help="Конец периода, не включая (ISO 8601, UTC).")
+@click.option('--interval', help="Интервал агрегации OHLC: 30s, 15m, 1h, 1d.")
+@click.option('--at', 'at_ts', help="Показать последний курс не позже момента.")
+@click.option('--limit', default=20, show_default=True,
+              help="Сколько последних строк вывести.")
+def rate_history(pair, from_ts, to_ts, interval, at_ts, limit):
+    """Показать историю курса пары из журнала парсера."""
+    from valutatrade_hub.parser_service.history_query import (
+        get_default_history_query,
+        parse_interval,
+    )
+
+    start = _parse_cli_time(from_ts, '--from')
+    end = _parse_cli_time(to_ts, '--to')
+    at = _parse_cli_time(at_ts, '--at')
+    pair = pair.upper()
+    try:
+        query = get_default_history_query()
+
+        if at:
+            found = query.latest_at(pair, at)
+            if not found:
+                click.echo(f"Нет курсов {pair} до {at.isoformat()}.")
+                return
+            click.echo(f"{pair} на {at.isoformat()}: {found[1]:.6f} "
+                       f"(записан {found[0].isoformat()})")
+            return
+
+        if interval:
+            bars = query.bars(pair, parse_interval(interval), start, end)
+            if not bars:
+                click.echo(f"История для {pair} за указанный период не найдена.")
+                return
+            click.echo(f"{pair}, интервал {interval} (баров: {len(bars)}):")
+            for bar in bars[-limit:]:
+                click.echo(f"- {bar.start:%Y-%m-%d %H:%M:%S}  O={bar.open:.6f} "
+                           f"H={bar.high:.6f} L={bar.low:.6f} C={bar.close:.6f} "
+                           f"avg={bar.mean:.6f} n={bar.count}")
+            return
+
+        points = query.range(pair, start, end)
+        if not points:
+            click.echo(f"История для {pair} за указанный период не найдена.")
+            return
+        click.echo(f"{pair} (записей: {len(points)}):")
+        for ts, rate in points[-limit:]:
+            click.echo(f"- {ts:%Y-%m-%d %H:%M:%S}: {rate:.6f}")
+
+    except ValueError as e:
+        click.echo(f"Ошибка: {e}", err=True)
+
+
+@cli.command()
+@click.option('--format', 'output_format',
+              type=click.Choice(['prometheus', 'summary'], case_sensitive=False),
+              default='prometheus', show_default=True,
+              help="Формат экспозиции Prometheus или сводка p50/p99.")
+@click.option('--reset', is_flag=True, help="Удалить накопленные метрики.")
+def metrics(output_format, reset):
+    """Показать метрики задержек операций, хранилища и источников курсов."""
+    from valutatrade_hub.infra.metrics import metrics as registry
+    from valutatrade_hub.infra.metrics import render_prometheus, summary_rows
+
+    if reset:
+        registry.reset()
+        click.echo("Метрики сброшены.")
+        return
+
+    state = registry.load()
+    if not state:
+        click.echo("Метрики еще не накоплены.")
+        if not registry.enabled:
+            click.echo("Сбор выключен: укажите metrics_enabled = true "
+                       "в [tool.valutatrade].")
+        return
+    if output_format == 'prometheus':
+        click.echo(render_prometheus(state), nl=False)
+        return
+
+    click.echo(f"{'метрика':<38} {'метки':<40} {'кол-во':>7} "
+               f"{'среднее':>10} {'p50':>10} {'p99':>10}")
+    for name, labels, count, mean, p50, p99 in summary_rows(state):
+        click.echo(f"{name:<38} {labels:<40} {count:>7} {mean * 1000:>8.3f}ms "
+                   f"{p50 * 1000:>8.3f}ms {p99 * 1000:>8.3f}ms")
+
+
+@cli.command()
+def serve():
+    """Запустить резидентный сервер команд (Ctrl+C — остановить)."""
+    from .client import get_socket_path
+    from .server import serve as run_server
+
+    socket_path = get_socket_path()
+    click.echo(f"Сервер trade слушает {socket_path}. "
+               f"Команды trade в этом каталоге будут выполняться им.")
+    try:
+        run_server(socket_path, cli)
+    except (RuntimeError, OSError) as e:
+        click.echo(f"Ошибка запуска сервера: {e}", err=True)
+        return
+    click.echo("Сервер остановлен.")
+
+
 if __name__ == '__main__':
     cli()
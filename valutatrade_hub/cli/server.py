@@ -0,0 +1,126 @@
+# valutatrade_hub/cli/server.py
+import io
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import threading
+from contextlib import redirect_stderr, redirect_stdout
+from typing import List, Tuple
+
+import click
+
+from .client import FORWARDED_COMMANDS
+
+
+def run_command(cli: click.Group, args: List[str]) -> Tuple[int, str, str]:
+    """
+    Выполняет команду CLI в текущем процессе, перехватывая ее вывод.
+    :return: Код завершения, stdout и stderr команды.
+    """
+    stdout, stderr = io.StringIO(), io.StringIO()
+    with redirect_stdout(stdout), redirect_stderr(stderr):
+        try:
+            result = cli.main(args=args, prog_name="trade", standalone_mode=False)
+            exit_code = result if isinstance(result, int) else 0
+        except click.ClickException as e:
+            e.show()
+            exit_code = e.exit_code
+        except click.exceptions.Abort:
+            click.echo("Aborted!", err=True)
+            exit_code = 1
+        except Exception as e:
+            # Непредвиденная ошибка одной команды не должна останавливать сервер
+            logging.exception(f"Server command {args[:1]} failed")
+            click.echo(f"Непредвиденная ошибка: {e}", err=True)
+            exit_code = 1
+    return exit_code, stdout.getvalue(), stderr.getvalue()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Обрабатывает одну строку-запрос JSON {"args": [...]}."""
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            args = json.loads(line)["args"]
+            if not args or args[0] not in FORWARDED_COMMANDS:
+                raise ValueError(f"команда не поддерживается сервером: {args[:1]}")
+        except (ValueError, KeyError, TypeError) as e:
+            response = {"exit_code": 2, "stdout": "", "stderr": f"Ошибка: {e}\n"}
+        else:
+            # Вывод команд перехватывается через sys.stdout, поэтому команды
+            # выполняются по одной; сами они занимают доли миллисекунды.
+            with self.server.command_lock:
+                exit_code, out, err = run_command(self.server.cli, args)
+            response = {"exit_code": exit_code, "stdout": out, "stderr": err}
+        self.wfile.write(json.dumps(response, ensure_ascii=False).encode("utf-8")
+                         + b"\n")
+
+
+class TradeServer(socketserver.ThreadingUnixStreamServer):
+    """
+    Резидентный сервер команд trade на Unix-сокете.
+
+    Процесс держит в памяти импортированные модули, настройки и индексы
+    DatabaseManager (пользователи, портфели, снимок курсов), поэтому
+    команда, пересланная тонким клиентом, не платит за запуск интерпретатора
+    и повторный разбор JSON. Индексы по-прежнему сверяются с отпечатками
+    файлов, так что изменения, сделанные другими процессами, видны сразу.
+    """
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, cli: click.Group):
+        self.socket_path = socket_path
+        self.cli = cli
+        self.command_lock = threading.Lock()
+        _remove_stale_socket(socket_path)
+        super().__init__(socket_path, _RequestHandler)
+        os.chmod(socket_path, 0o600)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+def _remove_stale_socket(socket_path: str):
+    """
+    Удаляет сокет, оставшийся от аварийно завершенного сервера.
+    :raises RuntimeError: Если сервер на этом сокете уже работает.
+    """
+    if not os.path.exists(socket_path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.remove(socket_path)
+        return
+    finally:
+        probe.close()
+    raise RuntimeError(f"Сервер уже запущен на {socket_path}")
+
+
+def serve(socket_path: str, cli: click.Group):
+    """Запускает сервер и обслуживает запросы до SIGINT/SIGTERM."""
+    server = TradeServer(socket_path, cli)
+
+    def stop(signum, frame):
+        # shutdown() ждет выхода из serve_forever, поэтому вызываем его
+        # из отдельного потока, а не из обработчика сигнала
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    logging.info(f"Trade server listening on {socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        logging.info("Trade server stopped")
@@ -0,0 +1,75 @@
+# valutatrade_hub/core/analytics.py
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .conversion import ConversionMatrix
+
+
+class PortfolioBook:
+    """
+    Колоночное представление всех портфелей для массовой оценки.
+
+    balances[u, c] — баланс пользователя user_ids[u] в валюте currencies[c].
+    Стоимость всех портфелей считается одним матрично-векторным умножением
+    на вектор курсов, без обхода кошельков в Python.
+    """
+
+    def __init__(self, user_ids: np.ndarray, currencies: List[str],
+                 balances: np.ndarray):
+        self.user_ids = user_ids
+        self.currencies = currencies
+        self.balances = balances
+
+    @classmethod
+    def from_columns(cls, user_column: np.ndarray, code_column: np.ndarray,
+                     balance_column: np.ndarray) -> 'PortfolioBook':
+        """Строит книгу из столбцов кошельков (user_id, код валюты, баланс)."""
+        if not len(user_column):
+            return cls(np.empty(0, dtype=np.int64), [], np.empty((0, 0)))
+        user_ids, user_pos = np.unique(user_column, return_inverse=True)
+        currencies, code_pos = np.unique(code_column, return_inverse=True)
+        balances = np.zeros((len(user_ids), len(currencies)))
+        # Пара (пользователь, валюта) в хранилище уникальна
+        balances[user_pos, code_pos] = balance_column
+        return cls(user_ids, currencies.tolist(), balances)
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def _rate_vector(self, matrix: ConversionMatrix, base_currency: str) -> np.ndarray:
+        # Валюты без выводимого курса не учитываются, как в get_total_value
+        return np.nan_to_num(matrix.rate_vector(base_currency, self.currencies),
+                             nan=0.0)
+
+    def values(self, matrix: ConversionMatrix, base_currency: str) -> np.ndarray:
+        """Стоимость каждого портфеля в базовой валюте (по порядку user_ids)."""
+        if not len(self):
+            return np.empty(0)
+        return self.balances @ self._rate_vector(matrix, base_currency)
+
+    def top(self, matrix: ConversionMatrix, base_currency: str,
+            count: int) -> List[Tuple[int, float]]:
+        """N самых дорогих портфелей: [(user_id, стоимость)] по убыванию."""
+        values = self.values(matrix, base_currency)
+        count = min(count, len(values))
+        if count <= 0:
+            return []
+        # argpartition отбирает N лучших за O(n), сортируются только они
+        candidates = np.argpartition(-values, count - 1)[:count]
+        ordered = candidates[np.lexsort((self.user_ids[candidates],
+                                         -values[candidates]))]
+        return [(int(self.user_ids[i]), float(values[i])) for i in ordered]
+
+    def aum_by_currency(self, matrix: ConversionMatrix,
+                        base_currency: str) -> Dict[str, Tuple[float, float]]:
+        """
+        Активы под управлением по валютам.
+        :return: {код: (суммарный баланс, стоимость в базовой валюте)}.
+        """
+        if not len(self):
+            return {}
+        totals = self.balances.sum(axis=0)
+        values = totals * self._rate_vector(matrix, base_currency)
+        return {code: (float(total), float(value))
+                for code, total, value in zip(self.currencies, totals, values)}
@@ -0,0 +1,152 @@
+# valutatrade_hub/core/conversion.py
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from ..infra.rates_snapshot import RatesSnapshot
+
+
+class ConversionMatrix:
+    """
+    Плотная матрица курсов «любая валюта → любая валюта».
+
+    Элемент rates[i, j] — сколько единиц валюты j стоит одна единица валюты i.
+    Прямые пары и обратные к ним берутся из кэша; недостающие элементы
+    заполняются триангуляцией через промежуточные валюты (в первую очередь
+    через базовую), причем выбирается путь с наименьшим числом переходов.
+    Рядом хранится матрица времени обновления: для производного курса это
+    время самого старого из использованных курсов.
+    """
+
+    def __init__(self, snapshot: RatesSnapshot, base_currency: str = "USD"):
+        self.version = snapshot.version
+        self.base_currency = base_currency.upper()
+
+        codes = {self.base_currency}
+        for pair_key in snapshot.pairs:
+            codes.update(pair_key.split('_'))
+        self.currencies: List[str] = sorted(codes)
+        self.index: Dict[str, int] = {code: i
+                                      for i, code in enumerate(self.currencies)}
+
+        size = len(self.currencies)
+        self.rates = np.full((size, size), np.nan)
+        self.timestamps = np.full((size, size), np.nan)
+        np.fill_diagonal(self.rates, 1.0)
+        np.fill_diagonal(self.timestamps, np.inf)
+
+        for pair_key, pair in snapshot.pairs.items():
+            from_c, to_c = pair_key.split('_')
+            i, j = self.index[from_c], self.index[to_c]
+            ts = pair.updated_at_dt.timestamp() if pair.updated_at_dt else np.nan
+            self.rates[i, j] = pair.rate
+            self.timestamps[i, j] = ts
+            if pair.rate != 0 and np.isnan(self.rates[j, i]):
+                self.rates[j, i] = 1 / pair.rate
+                self.timestamps[j, i] = ts
+
+        self._triangulate()
+
+    def _triangulate(self):
+        """Заполняет пропуски через промежуточные валюты, раунд за раундом."""
+        base_index = self.index[self.base_currency]
+        order = [base_index] + [k for k in range(len(self.currencies))
+                                if k != base_index]
+        while True:
+            missing = np.isnan(self.rates)
+            if not missing.any():
+                break
+            # Каждый раунд использует только пути, известные к его началу,
+            # поэтому курсы находятся через минимальное число переходов.
+            known_rates = self.rates.copy()
+            known_ts = self.timestamps.copy()
+            for k in order:
+                candidate = np.outer(known_rates[:, k], known_rates[k, :])
+                fill = np.isnan(self.rates) & ~np.isnan(candidate)
+                if fill.any():
+                    legs_ts = np.fmin.outer(known_ts[:, k], known_ts[k, :])
+                    self.rates[fill] = candidate[fill]
+                    self.timestamps[fill] = legs_ts[fill]
+            if np.array_equal(np.isnan(self.rates), missing):
+                break
+
+    def __contains__(self, currency: str) -> bool:
+        return currency.upper() in self.index
+
+    def get_rate(self, from_currency: str,
+                 to_currency: str) -> Tuple[float, str] | None:
+        """
+        Курс одной единицы from_currency в to_currency.
+        :return: (курс, время обновления) или None, если курс не выводится.
+        """
+        i = self.index.get(from_currency.upper())
+        j = self.index.get(to_currency.upper())
+        if i is None or j is None:
+            return None
+        rate = self.rates[i, j]
+        if np.isnan(rate):
+            return None
+        return float(rate), self._format_timestamp(self.timestamps[i, j])
+
+    def rates_to(self, to_currency: str) -> Dict[str, float]:
+        """Курсы всех известных валют к to_currency."""
+        j = self.index.get(to_currency.upper())
+        if j is None:
+            return {}
+        column = self.rates[:, j]
+        return {code: float(column[i]) for i, code in enumerate(self.currencies)
+                if i != j and not np.isnan(column[i])}
+
+    def rate_vector(self, to_currency: str, currencies: List[str]) -> np.ndarray:
+        """
+        Курсы перечисленных валют к to_currency одним вектором
+        (в порядке currencies); для невыводимых курсов — NaN.
+        """
+        vector = np.full(len(currencies), np.nan)
+        j = self.index.get(to_currency.upper())
+        if j is None:
+            return vector
+        positions = [self.index.get(code) for code in currencies]
+        known = np.array([i is not None for i in positions], dtype=bool)
+        if known.any():
+            rows = np.array([i for i in positions if i is not None], dtype=np.intp)
+            vector[known] = self.rates[rows, j]
+        return vector
+
+    def updated_at(self, to_currency: str, currencies: List[str]) -> str | None:
+        """
+        Время обновления самого старого из курсов currencies → to_currency.
+        Невыводимые курсы и сама to_currency не учитываются.
+        :return: ISO-метка, 'N/A' (время неизвестно) или None, если ни один
+            курс не используется.
+        """
+        j = self.index.get(to_currency.upper())
+        if j is None:
+            return None
+        rows = [self.index[code] for code in currencies
+                if self.index.get(code, j) != j]
+        rows = [i for i in rows if not np.isnan(self.rates[i, j])]
+        if not rows:
+            return None
+        # NaN (неизвестное время) поглощает минимум, и курс считается просроченным
+        return self._format_timestamp(self.timestamps[rows, j].min())
+
+    @staticmethod
+    def _format_timestamp(ts: float) -> str:
+        if np.isnan(ts) or np.isinf(ts):
+            return 'N/A'
+        return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+
+
+_matrix: ConversionMatrix | None = None
+
+
+def get_conversion_matrix(snapshot: RatesSnapshot,
+                          base_currency: str = "USD") -> ConversionMatrix:
+    """Возвращает матрицу для снимка, перестраивая ее только при смене версии."""
+    global _matrix
+    if _matrix is None or _matrix.version != snapshot.version \
+            or _matrix.base_currency != base_currency.upper():
+        _matrix = ConversionMatrix(snapshot, base_currency)
+    return _matrix
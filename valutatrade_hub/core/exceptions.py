@@ -27,3 +27,11 @@ class ApiRequestError(BaseTradeError):
     def __init__(self, reason: str):
         self.reason = reason
         super().__init__(f"Ошибка при обращении к внешнему API: {reason}")
+
+class ConcurrentModificationError(BaseTradeError):
+    """Вызывается, когда данные изменены другим процессом
+    между чтением и записью."""
+    def __init__(self, what: str):
+        self.what = what
+        super().__init__(f"Конфликт одновременного изменения: {what}. "
+                         f"Повторите операцию.")
@@ -1,8 +1,8 @@
-import hashlib
 import os
 from datetime import datetime
 from typing import Dict
 
+from valutatrade_hub.core import passwords
 from valutatrade_hub.core.exceptions import InsufficientFundsError
 
 
@@ -10,10 +10,15 @@ class User:
     """Пользователь системы."""
 
     def __init__(self, user_id: int, username: str, password: str, salt: str = None,
-                 registration_date: datetime = None):
+                 registration_date: datetime = None, hash_algorithm: str = None,
+                 hash_params: Dict = None):
         self._user_id = user_id
         self._username = username
         self._salt = salt or os.urandom(16).hex()
+        if hash_algorithm is None:
+            hash_algorithm, hash_params = passwords.current_policy()
+        self._hash_algorithm = hash_algorithm
+        self._hash_params = hash_params or {}
         self._hashed_password = self._hash_password(password, self._salt)
         self._registration_date = registration_date or datetime.now()
 
@@ -41,18 +46,39 @@ class User:
     def registration_date(self) -> datetime:
         return self._registration_date
 
-    def _hash_password(self, password: str, salt: str) -> str:
-        """Хеширование пароля с солью."""
+    @property
+    def hash_algorithm(self) -> str:
+        return self._hash_algorithm
+
+    def _hash_password(self, password: str, salt: str, algorithm: str = None,
+                       params: Dict = None) -> str:
+        """Хеширование пароля с солью (по умолчанию — алгоритмом пользователя)."""
         if len(password) < 4:
             raise ValueError('Пароль должен быть не короче 4 символов ')
-        return hashlib.sha256((password + salt).encode('utf-8')).hexdigest()
+        if algorithm is None:
+            algorithm, params = self._hash_algorithm, self._hash_params
+        return passwords.hash_password(password, salt, algorithm, params)
 
     def change_password(self, new_password: str):
-        self._hashed_password = self._hash_password(new_password, self._salt)
+        self.rehash_password(new_password)
         print("Пароль успешно изменен.")
 
     def verify_password(self, password: str) -> bool:
-        return self._hashed_password == self._hash_password(password, self._salt)
+        return passwords.constant_time_equals(
+            self._hash_password(password, self._salt), self._hashed_password)
+
+    def needs_rehash(self) -> bool:
+        """True, если хеш получен не по текущей политике хеширования."""
+        return (self._hash_algorithm, self._hash_params) \
+            != passwords.current_policy()
+
+    def rehash_password(self, password: str):
+        """Хеширует пароль с новой солью по текущей политике хеширования."""
+        algorithm, params = passwords.current_policy()
+        salt = os.urandom(16).hex()
+        self._hashed_password = self._hash_password(password, salt, algorithm,
+                                                    params)
+        self._salt, self._hash_algorithm, self._hash_params = salt, algorithm, params
 
     def to_dict(self) -> dict:
         """Сериализация объекта в словарь."""
@@ -61,20 +87,25 @@ class User:
             "username": self._username,
             "salt": self._salt,
             "registration_date": self._registration_date.isoformat(),
-            "hashed_password": self._hashed_password
+            "hashed_password": self._hashed_password,
+            "hash_algorithm": self._hash_algorithm,
+            "hash_params": self._hash_params
         }
 
     @classmethod
     def from_dict(cls, data: Dict) -> 'User':
-        """Десериализация объекта из словаря."""
-
-        user = cls(
-            user_id=data['user_id'],
-            username=data['username'],
-            password="dummy_password_on_load"
-        )
-        user._hashed_password = data['hashed_password']
+        """
+        Десериализация объекта из словаря.
+        Объект собирается в обход __init__: пароль при загрузке не хешируется.
+        Записи без hash_algorithm созданы исходной схемой sha256.
+        """
+        user = cls.__new__(cls)
+        user._user_id = data['user_id']
+        user._username = data['username']
         user._salt = data['salt']
+        user._hashed_password = data['hashed_password']
+        user._hash_algorithm = data.get('hash_algorithm', passwords.LEGACY_ALGORITHM)
+        user._hash_params = data.get('hash_params') or {}
         user._registration_date = datetime.fromisoformat(data['registration_date'])
         return user
 
@@ -137,14 +168,21 @@ class Wallet:
 class Portfolio:
     """Управление всеми кошельками одного пользователя."""
 
-    def __init__(self, user_id: int, wallets: Dict[str, Wallet] = None):
+    def __init__(self, user_id: int, wallets: Dict[str, Wallet] = None,
+                 version: int = 0):
         self._user_id = user_id
         self._wallets = wallets if wallets else {}
+        self._version = version
 
     @property
     def user_id(self) -> int:
         return self._user_id
 
+    @property
+    def version(self) -> int:
+        """Версия портфеля в хранилище на момент чтения."""
+        return self._version
+
     @property
     def wallets(self) -> Dict[str, Wallet]:
         """Возвращает копию словаря кошельков."""
@@ -172,8 +210,16 @@ class Portfolio:
             self._wallets[code] = Wallet(currency_code=code)
         return self._wallets[code]
 
-    def get_total_value(self, base_currency: str, exchange_rates: Dict) -> float:
-        """Возвращает общую стоимость всех валют в базовой валюте."""
+    def get_total_value(self, base_currency: str, exchange_rates) -> float:
+        """
+        Возвращает общую стоимость всех валют в базовой валюте.
+        :param exchange_rates: Снимок курсов (объект с методом get_rate,
+            например RatesSnapshot) или словарь пар {"<FROM>_<TO>": {"rate": ...}}.
+        """
+        if hasattr(exchange_rates, 'get_rate'):
+            return self._get_total_value_from_snapshot(base_currency,
+                                                       exchange_rates)
+
         if not exchange_rates:
             exchange_rates = {
                 "EUR_USD": {
@@ -222,10 +268,28 @@ class Portfolio:
 
         return total_value
 
+    def _get_total_value_from_snapshot(self, base_currency: str, rates) -> float:
+        total_value = 0.0
+        base_currency = base_currency.upper()
+
+        for code, wallet in self._wallets.items():
+            if code == base_currency:
+                total_value += wallet.balance
+                continue
+            found = rates.get_rate(code, base_currency)
+            if found is None:
+                print(f"Предупреждение: курс для {code}_{base_currency} не найден, "
+                      f"валюта не учитывается в общей сумме.")
+                continue
+            total_value += wallet.balance * found[0]
+
+        return total_value
+
     def to_dict(self) -> Dict:
         """Сериализация объекта в словарь."""
         return {
             "user_id": self._user_id,
+            "version": self._version,
             "wallets": {code: wallet.to_dict()
                         for code, wallet in self._wallets.items()}
         }
@@ -235,4 +299,5 @@ class Portfolio:
         """Десериализация объекта из словаря."""
         wallets = {code: Wallet.from_dict(w_data) for code, w_data
                    in data.get('wallets', {}).items()}
-        return cls(user_id=data['user_id'], wallets=wallets)
+        return cls(user_id=data['user_id'], wallets=wallets,
+                   version=data.get('version', 0))
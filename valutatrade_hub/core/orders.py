@@ -0,0 +1,62 @@
+# valutatrade_hub/core/orders.py
+import csv
+import json
+import os
+from dataclasses import dataclass
+from typing import List
+
+ORDER_SIDES = ("buy", "sell")
+
+
+@dataclass
+class Order:
+    """Заявка на покупку или продажу валюты от имени пользователя."""
+    username: str
+    side: str
+    currency: str
+    amount: float
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Order':
+        """
+        Создает заявку из словаря с ключами user, side, currency, amount.
+        :raises ValueError: Если поля отсутствуют или некорректны.
+        """
+        try:
+            username = str(data.get('user') or data['username']).strip()
+            side = str(data['side']).strip().lower()
+            currency = str(data['currency']).strip().upper()
+            amount = float(data['amount'])
+        except KeyError as e:
+            raise ValueError(f"в заявке отсутствует поле {e}")
+        except (TypeError, ValueError):
+            raise ValueError(f"некорректное количество '{data.get('amount')}'")
+        if side not in ORDER_SIDES:
+            raise ValueError(f"неизвестное направление '{side}' "
+                             f"(ожидается buy или sell)")
+        return cls(username=username, side=side, currency=currency, amount=amount)
+
+
+def read_orders_file(path: str) -> List[dict]:
+    """
+    Читает заявки из CSV (заголовок user,side,currency,amount)
+    или JSON Lines (по одному объекту на строку).
+    Возвращает сырые словари: разбор и проверка выполняются при исполнении,
+    чтобы ошибка в одной строке попадала в отчет, а не прерывала чтение.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if extension == '.csv':
+            return [dict(row) for row in csv.DictReader(f)]
+        if extension in ('.jsonl', '.ndjson'):
+            rows = []
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    rows.append(json.loads(line))
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"строка {line_number}: некорректный JSON ({e})")
+            return rows
+    raise ValueError(f"Неподдерживаемый формат файла заявок '{extension}' "
+                     f"(ожидается .csv или .jsonl)")
@@ -0,0 +1,101 @@
+# valutatrade_hub/core/passwords.py
+import hashlib
+import hmac
+from abc import ABC, abstractmethod
+from typing import Dict, Tuple
+
+from valutatrade_hub.infra.profiling import timed
+from valutatrade_hub.infra.settings import settings
+
+
+class PasswordHasher(ABC):
+    """Алгоритм хеширования паролей с параметрами стоимости."""
+    name: str = ""
+
+    @abstractmethod
+    def default_params(self) -> Dict:
+        """Параметры стоимости из настроек (или значения по умолчанию)."""
+        pass
+
+    @abstractmethod
+    def hash(self, password: str, salt: str, params: Dict) -> str:
+        """Возвращает хеш пароля в шестнадцатеричном виде."""
+        pass
+
+
+class Sha256Hasher(PasswordHasher):
+    """Исходная схема sha256(пароль + соль); оставлена для старых записей."""
+    name = "sha256"
+
+    def default_params(self) -> Dict:
+        return {}
+
+    def hash(self, password: str, salt: str, params: Dict) -> str:
+        return hashlib.sha256((password + salt).encode('utf-8')).hexdigest()
+
+
+class Pbkdf2Hasher(PasswordHasher):
+    """PBKDF2-HMAC-SHA256 (hashlib.pbkdf2_hmac)."""
+    name = "pbkdf2_sha256"
+
+    def default_params(self) -> Dict:
+        return {"iterations": settings.get("pbkdf2_iterations", 600_000)}
+
+    def hash(self, password: str, salt: str, params: Dict) -> str:
+        return hashlib.pbkdf2_hmac("sha256", password.encode('utf-8'),
+                                   salt.encode('utf-8'),
+                                   params["iterations"]).hex()
+
+
+class ScryptHasher(PasswordHasher):
+    """scrypt (hashlib.scrypt) с параметрами n, r, p."""
+    name = "scrypt"
+
+    def default_params(self) -> Dict:
+        return {"n": settings.get("scrypt_n", 2 ** 14),
+                "r": settings.get("scrypt_r", 8),
+                "p": settings.get("scrypt_p", 1)}
+
+    def hash(self, password: str, salt: str, params: Dict) -> str:
+        n, r, p = params["n"], params["r"], params["p"]
+        # Необходимая память — 128 * n * r байт; OpenSSL по умолчанию
+        # ограничивает ее 32 МиБ, поэтому лимит задается с запасом
+        return hashlib.scrypt(password.encode('utf-8'), salt=salt.encode('utf-8'),
+                              n=n, r=r, p=p, maxmem=256 * n * r + 1024 * 1024,
+                              dklen=32).hex()
+
+
+HASHERS: Dict[str, PasswordHasher] = {
+    hasher.name: hasher for hasher in (Sha256Hasher(), Pbkdf2Hasher(),
+                                       ScryptHasher())
+}
+
+LEGACY_ALGORITHM = Sha256Hasher.name
+
+
+def get_hasher(algorithm: str) -> PasswordHasher:
+    """
+    Возвращает алгоритм по имени.
+    :raises ValueError: Если алгоритм неизвестен.
+    """
+    try:
+        return HASHERS[algorithm]
+    except KeyError:
+        raise ValueError(f"Неизвестный алгоритм хеширования паролей "
+                         f"'{algorithm}'. Доступны: {', '.join(HASHERS)}")
+
+
+def current_policy() -> Tuple[str, Dict]:
+    """Алгоритм и параметры для новых хешей (password_hash_algorithm)."""
+    hasher = get_hasher(settings.get("password_hash_algorithm", "scrypt"))
+    return hasher.name, hasher.default_params()
+
+
+@timed("hashing")
+def hash_password(password: str, salt: str, algorithm: str, params: Dict) -> str:
+    return get_hasher(algorithm).hash(password, salt, params)
+
+
+def constant_time_equals(computed_hash: str, expected_hash: str) -> bool:
+    """Сравнивает хеши за постоянное время."""
+    return hmac.compare_digest(computed_hash, expected_hash)
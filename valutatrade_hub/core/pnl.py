@@ -0,0 +1,133 @@
+# valutatrade_hub/core/pnl.py
+from typing import Dict, List
+
+PNL_METHODS = ("average", "fifo")
+
+# Остатки меньше этого считаются нулевыми (погрешность float при продажах)
+_EPSILON = 1e-12
+
+
+class WalletCostBasis:
+    """
+    Себестоимость позиции в одной валюте сразу по двум методам.
+
+    average — средняя себестоимость: продажа списывает долю общей
+    себестоимости, пропорциональную проданному количеству.
+    fifo — партии покупок [количество, цена за единицу] списываются
+    в порядке покупки.
+    Учитываются только сделки из журнала: если продается больше, чем
+    куплено через журнал (баланс появился раньше), для избытка
+    себестоимость неизвестна и реализованный P&L по нему не считается.
+    """
+    __slots__ = ("quantity", "average_cost", "average_realized", "lots",
+                 "fifo_realized")
+
+    def __init__(self, quantity: float = 0.0, average_cost: float = 0.0,
+                 average_realized: float = 0.0, lots: List[List[float]] = None,
+                 fifo_realized: float = 0.0):
+        self.quantity = quantity
+        self.average_cost = average_cost
+        self.average_realized = average_realized
+        self.lots = lots if lots is not None else []
+        self.fifo_realized = fifo_realized
+
+    def buy(self, amount: float, cost: float):
+        self.quantity += amount
+        self.average_cost += cost
+        self.lots.append([amount, cost / amount])
+
+    def sell(self, amount: float, revenue: float):
+        matched = min(amount, self.quantity)
+        if matched <= _EPSILON:
+            return
+        price = revenue / amount
+
+        removed = self.average_cost * matched / self.quantity
+        self.average_cost -= removed
+        self.average_realized += matched * price - removed
+
+        remaining = matched
+        while remaining > _EPSILON and self.lots:
+            lot = self.lots[0]
+            taken = min(lot[0], remaining)
+            self.fifo_realized += taken * (price - lot[1])
+            lot[0] -= taken
+            remaining -= taken
+            if lot[0] <= _EPSILON:
+                self.lots.pop(0)
+
+        self.quantity -= matched
+        if self.quantity <= _EPSILON:
+            self.quantity, self.average_cost, self.lots = 0.0, 0.0, []
+
+    def cost_basis(self, method: str) -> float:
+        if method == "fifo":
+            return sum(quantity * price for quantity, price in self.lots)
+        return self.average_cost
+
+    def realized(self, method: str) -> float:
+        return self.fifo_realized if method == "fifo" else self.average_realized
+
+    def unrealized(self, method: str, price: float) -> float:
+        """Нереализованный P&L позиции по рыночной цене price."""
+        return self.quantity * price - self.cost_basis(method)
+
+    def to_dict(self) -> Dict:
+        return {"quantity": self.quantity, "average_cost": self.average_cost,
+                "average_realized": self.average_realized, "lots": self.lots,
+                "fifo_realized": self.fifo_realized}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'WalletCostBasis':
+        return cls(data["quantity"], data["average_cost"],
+                   data["average_realized"], [list(lot) for lot in data["lots"]],
+                   data["fifo_realized"])
+
+
+class PnlState:
+    """
+    Состояние расчета P&L пользователя после сделки trade_id.
+
+    Состояние обновляется инкрементально: apply() учитывает одну сделку
+    журнала, уже учтенные сделки (id не больше trade_id) пропускаются.
+    Суммы хранятся в базовой валюте сделок (default_base_currency).
+    Сериализованное состояние служит снимком: пересчет продолжается с
+    последнего снимка, а не со всей истории сделок.
+    """
+
+    def __init__(self, user_id: int, trade_id: int = 0,
+                 wallets: Dict[str, WalletCostBasis] = None,
+                 base_currency: str | None = None):
+        self.user_id = user_id
+        self.trade_id = trade_id
+        self.wallets = wallets if wallets is not None else {}
+        self.base_currency = base_currency
+        # Сделки, учтенные после последнего сохраненного снимка
+        self.unsaved = 0
+
+    def apply(self, trade: Dict):
+        if trade["id"] <= self.trade_id:
+            return
+        wallet = self.wallets.get(trade["currency"])
+        if wallet is None:
+            wallet = self.wallets[trade["currency"]] = WalletCostBasis()
+        if trade["side"] == "buy":
+            wallet.buy(trade["amount"], trade["cost"])
+        else:
+            wallet.sell(trade["amount"], trade["revenue"])
+        self.base_currency = self.base_currency or trade["base_currency"]
+        self.trade_id = trade["id"]
+        self.unsaved += 1
+
+    def to_dict(self) -> Dict:
+        return {"user_id": self.user_id, "trade_id": self.trade_id,
+                "base_currency": self.base_currency,
+                "wallets": {code: wallet.to_dict()
+                            for code, wallet in self.wallets.items()}}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'PnlState':
+        return cls(data["user_id"], data["trade_id"],
+                   {code: WalletCostBasis.from_dict(w_data)
+                    for code, w_data in data["wallets"].items()},
+                   data.get("base_currency"))
@@ -1,48 +1,192 @@
 # valutatrade_hub/core/usecases.py
-from datetime import datetime, timedelta, timezone
-from typing import Tuple
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Callable, Dict, List, Tuple, TypeVar
 
 from ..decorators import log_action
 from ..infra.database import db_manager
+from ..infra.metrics import metrics
+from ..infra.profiling import phase
+from ..infra.rates_snapshot import RateQuote, RatesSnapshot
 from ..infra.settings import settings
 from .currencies import Currency, get_currency
-from .exceptions import ApiRequestError
+from .exceptions import ApiRequestError, BaseTradeError, ConcurrentModificationError
 from .models import Portfolio, User
+from .orders import Order
+from .pnl import PNL_METHODS, PnlState
+
+if TYPE_CHECKING:
+    from .conversion import ConversionMatrix
+
+T = TypeVar("T")
+
+RATE_LOOKUP_SECONDS = metrics.histogram(
+    "valutatrade_rate_lookup_seconds",
+    "Длительность получения курса пары из кэша (get_exchange_rate)")
+
+# Наибольшая пауза между повторами конфликтующей записи, секунды
+_MAX_COMMIT_BACKOFF = 0.2
+
+# Состояния P&L, уже восстановленные процессом (используются `trade serve`)
+_pnl_states: Dict[int, PnlState] = {}
+
+
+def _with_commit_retries(operation: Callable[[], T]) -> T:
+    """
+    Выполняет операцию «прочитать — проверить — записать», повторяя ее,
+    если запись отклонена из-за изменения данных другим процессом.
+    Повторы идут, пока не истечет бюджет commit_retry_seconds, но не меньше
+    commit_retries раз; пауза перед повтором растет экспоненциально со
+    случайным джиттером и не превышает _MAX_COMMIT_BACKOFF.
+    :raises ConcurrentModificationError: Если бюджет повторов исчерпан.
+    """
+    retries = settings.get("commit_retries", 5)
+    deadline = time.monotonic() + settings.get("commit_retry_seconds", 3.0)
+    attempt = 0
+    while True:
+        try:
+            return operation()
+        except ConcurrentModificationError as e:
+            attempt += 1
+            if attempt > retries and time.monotonic() >= deadline:
+                raise ConcurrentModificationError(
+                    f"{e.what}, попыток: {attempt}") from e
+            time.sleep(random.uniform(
+                0, min(_MAX_COMMIT_BACKOFF, 0.005 * (2 ** attempt))))
+
+
+def _record_trades(executed: List[Dict]):
+    """
+    Записывает исполненные сделки в журнал сделок и добавляет trade_id
+    в их результаты. Балансы к этому моменту уже сохранены, поэтому сбой
+    записи журнала не отменяет сделку, а только попадает в лог.
+    :param executed: Результаты сделок с ключами user_id, side, currency,
+        amount, rate, cost или revenue и base_currency.
+    """
+    timestamp = datetime.now(timezone.utc).isoformat()
+    trades = []
+    for result in executed:
+        value_key = "cost" if result["side"] == "buy" else "revenue"
+        trades.append({"user_id": result["user_id"], "side": result["side"],
+                       "currency": result["currency"], "amount": result["amount"],
+                       "rate": result["rate"], value_key: result[value_key],
+                       "base_currency": result["base_currency"],
+                       "timestamp": timestamp})
+    try:
+        records = db_manager.append_trades(trades)
+        # Себестоимость обновляется сразу, чтобы снимки P&L не отставали
+        for user_id in {trade["user_id"] for trade in trades}:
+            get_pnl_state(user_id)
+    except OSError as e:
+        logging.error(f"Trade ledger write failed: {e}")
+        return
+    for result, record in zip(executed, records):
+        result["trade_id"] = record["id"]
+
+
+def get_trade_history(user: User, limit: int = 50,
+                      before: int = None) -> List[Dict]:
+    """
+    Страница сделок пользователя от новых к старым.
+    :param before: Показать сделки с id меньше указанного.
+    """
+    if limit <= 0:
+        raise ValueError("'limit' должен быть положительным числом")
+    return db_manager.get_trades(user.user_id, limit, before)
+
+
+def get_pnl_state(user_id: int) -> PnlState:
+    """
+    Актуальное состояние P&L пользователя.
+    Состояние берется из памяти процесса или из последнего снимка, после
+    чего учитываются только более поздние сделки журнала. Если таких
+    сделок набралось pnl_snapshot_every, сохраняется новый снимок.
+    """
+    state = _pnl_states.get(user_id)
+    if state is None:
+        snapshot = db_manager.load_pnl_snapshot(user_id)
+        with phase("deserialize"):
+            state = PnlState.from_dict(snapshot) if snapshot else PnlState(user_id)
+        _pnl_states[user_id] = state
+    for trade in db_manager.get_trades_after(user_id, state.trade_id):
+        state.apply(trade)
+    if state.unsaved >= settings.get("pnl_snapshot_every", 20):
+        db_manager.save_pnl_snapshot(user_id, state.to_dict())
+        state.unsaved = 0
+    return state
+
+
+def get_portfolio_pnl(user: User, matrix: 'ConversionMatrix',
+                      method: str = None) -> Dict:
+    """
+    P&L позиций пользователя по сделкам журнала.
+    :param method: "average" или "fifo" (по умолчанию pnl_method).
+    :return: {"method", "base_currency", "wallets": {код: {"quantity",
+        "cost_basis", "realized", "unrealized"}}}; суммы в базовой валюте
+        сделок, unrealized — None, если курс валюты неизвестен.
+    """
+    method = (method or settings.get("pnl_method", "average")).lower()
+    if method not in PNL_METHODS:
+        raise ValueError(f"Неизвестный метод расчета P&L '{method}'")
+    state = get_pnl_state(user.user_id)
+    base_currency = state.base_currency or settings.get("default_base_currency",
+                                                        "USD")
+    wallets = {}
+    for code, basis in state.wallets.items():
+        found = matrix.get_rate(code, base_currency)
+        wallets[code] = {
+            "quantity": basis.quantity,
+            "cost_basis": basis.cost_basis(method),
+            "realized": basis.realized(method),
+            "unrealized": basis.unrealized(method, found[0]) if found else None,
+        }
+    return {"method": method, "base_currency": base_currency, "wallets": wallets}
+
 
 @log_action("REGISTER")
 def register_user(username: str, password: str) -> User:
-    users_data = db_manager.load_users()
-
-    if any(u['username'] == username for u in users_data):
+    if db_manager.find_user_by_username(username):
         raise ValueError(f"Имя пользователя '{username}' уже занято")
 
-    new_user_id = max([u['user_id'] for u in users_data] + [0]) + 1
-    new_user = User(user_id=new_user_id, username=username, password=password)
-    users_data.append(new_user.to_dict())
-    db_manager.save_users(users_data)
+    # Пароль хешируется один раз: при конфликте повторяется только выбор id
+    user_data = User(user_id=0, username=username, password=password).to_dict()
+
+    def add_user() -> User:
+        user_data['user_id'] = db_manager.next_user_id()
+        db_manager.add_user(dict(user_data))
+        return User.from_dict(user_data)
+
+    new_user = _with_commit_retries(add_user)
+    new_user_id = new_user.user_id
 
-    portfolios_data = db_manager.load_portfolios()
     new_portfolio = Portfolio(user_id=new_user_id)
     usd_wallet = new_portfolio.get_or_create_wallet("USD")
     usd_wallet.balance = 10000.0
-    portfolios_data.append(new_portfolio.to_dict())
-    db_manager.save_portfolios(portfolios_data)
+    db_manager.save_portfolio(new_portfolio.to_dict())
 
     return new_user
 
 
 @log_action("LOGIN")
 def login_user(username: str, password: str) -> User:
-    users_data = db_manager.load_users()
-    user_data = next((u for u in users_data if u['username'] == username), None)
+    user_data = db_manager.find_user_by_username(username)
 
     if not user_data:
         raise ValueError(f"Пользователь '{username}' не найден")
 
-    user = User.from_dict(user_data)
+    with phase("deserialize"):
+        user = User.from_dict(user_data)
     if not user.verify_password(password):
         raise ValueError("Неверный пароль")
 
+    if user.needs_rehash():
+        # Пароль известен только в момент входа: переводим хеш
+        # на текущий алгоритм и параметры стоимости
+        user.rehash_password(password)
+        db_manager.update_user(user.to_dict())
+
     db_manager.set_current_user(user.user_id)
     return user
 
@@ -52,68 +196,109 @@ def get_logged_in_user() -> User | None:
     if user_id is None:
         return None
 
-    users_data = db_manager.load_users()
-    user_data = next((u for u in users_data
-                      if u['user_id'] == user_id), None)
-
-    return User.from_dict(user_data) if user_data else None
+    user_data = db_manager.get_user(user_id)
+    if not user_data:
+        return None
+    with phase("deserialize"):
+        return User.from_dict(user_data)
 
 
 def logout():
     db_manager.logout_user()
 
 def get_user_portfolio(user: User) -> Portfolio:
-    portfolios_data = db_manager.load_portfolios()
-    portfolio_data = next((p for p in portfolios_data
-                           if p['user_id'] == user.user_id), None)
+    portfolio_data = db_manager.get_portfolio(user.user_id)
     if not portfolio_data:
         raise FileNotFoundError(f"Портфель для пользователя {user.username} не найден.")
-    return Portfolio.from_dict(portfolio_data)
-
-
-def save_user_portfolio(portfolio: Portfolio):
-    portfolios_data = db_manager.load_portfolios()
-    portfolios_data = [p for p in portfolios_data if p['user_id'] != portfolio.user_id]
-    portfolios_data.append(portfolio.to_dict())
-    db_manager.save_portfolios(portfolios_data)
+    with phase("deserialize"):
+        return Portfolio.from_dict(portfolio_data)
 
 
 def get_currency_info(code: str) -> Currency:
     return get_currency(code)
 
 
-def get_exchange_rate(from_currency: str, to_currency: str) -> Tuple[float, str]:
-    rates_data = db_manager.load_rates()
+def _conversion_matrix(rates: RatesSnapshot) -> 'ConversionMatrix':
+    # NumPy нужен только командам, работающим с курсами, поэтому модуль
+    # матрицы импортируется при первом обращении, а не при запуске CLI
+    from .conversion import get_conversion_matrix
+    return get_conversion_matrix(rates, settings.get("default_base_currency",
+                                                     "USD"))
+
+
+def get_rates_matrix() -> 'ConversionMatrix':
+    """Матрица кросс-курсов для текущего снимка кэша курсов."""
+    return _conversion_matrix(db_manager.get_rates_snapshot())
+
+
+def _check_servable(rates: RatesSnapshot, updated_at: str = None) -> bool:
+    """
+    Проверяет курс по окнам свежести.
+    Курс не старше rates_ttl_seconds — свежий. До rates_max_stale_seconds он
+    устаревший, но пригодный: курс выдается сразу, а обновление
+    запускается в фоне, не задерживая вызывающего. Более старый курс
+    считается просроченным. Возраст считается по времени обновления
+    использованной пары: источники обновляются независимо, и курсы
+    отказавшего источника устаревают, даже если другой источник свеж.
+    :param updated_at: Время обновления использованного курса; без него
+        проверяется самый старый источник (last_refresh).
+    :return: True, если курс устарел.
+    :raises ApiRequestError: Если курс просрочен.
+    """
     ttl = settings.get("rates_ttl_seconds", 300)
+    if not rates.is_expired(ttl, updated_at):
+        return False
 
-    last_refresh_str = rates_data.get("last_refresh", "2025-11-16T20:10:00")
-    last_refresh_dt = datetime.fromisoformat(last_refresh_str)
+    # Устаревший кэш в любом случае нужно обновить; сетевой запрос
+    # выполняется в отдельном процессе
+    from ..infra.rates_refresh import request_background_refresh
+    request_background_refresh()
 
-    if (datetime.now(timezone.utc) - last_refresh_dt) > timedelta(seconds=ttl):
-        raise ApiRequestError(f"Кеш курсов устарел (старше {ttl} секунд). "
+    max_stale = settings.get("rates_max_stale_seconds", 900)
+    if rates.is_expired(max_stale, updated_at):
+        raise ApiRequestError(f"Кеш курсов устарел (старше {max_stale} секунд). "
                               f"Запустите сервис парсинга.")
-
-    from_currency, to_currency = from_currency.upper(), to_currency.upper()
-
+    return True
+
+
+def get_rate_quote(from_currency: str, to_currency: str) -> RateQuote:
+    """
+    Курс пары из кэша с признаком устаревания.
+    :raises ApiRequestError: Если курс пары просрочен.
+    :raises ValueError: Если курс пары не удалось найти.
+    """
+    started = time.perf_counter()
+    result = "error"
+    try:
+        rates = db_manager.get_rates_snapshot()
+        rate, updated_at = _lookup_rate(rates, from_currency.upper(),
+                                        to_currency.upper())
+        stale = _check_servable(rates, updated_at)
+        result = "stale" if stale else "fresh"
+        return RateQuote(rate, updated_at, stale)
+    finally:
+        RATE_LOOKUP_SECONDS.observe(time.perf_counter() - started, result=result)
+
+
+def _lookup_rate(rates: RatesSnapshot, from_currency: str,
+                 to_currency: str) -> Tuple[float, str]:
     if from_currency == to_currency:
-        return 1.0, rates_data.get('last_refresh', 'N/A')
-
-    rate_key = f'{from_currency}_{to_currency}'
-    if rate_key in rates_data['pairs']:
-        rate_info = rates_data['pairs'][rate_key]
-        return rate_info['rate'], rate_info['updated_at']
+        return 1.0, rates.last_refresh or 'N/A'
 
-    reverse_rate_key = f"{to_currency}_{from_currency}"
-    if reverse_rate_key in rates_data['pairs']:
-        rate_info = rates_data['pairs'][reverse_rate_key]
-        if rate_info['rate'] == 0:
-            raise ValueError("Нулевой курс, деление невозможно.")
-        return 1 / rate_info['rate'], rate_info['updated_at']
+    matrix = _conversion_matrix(rates)
+    found = matrix.get_rate(from_currency, to_currency)
+    if found is not None:
+        return found
 
-    raise ValueError(f"Не удалось найти прямой или обратный курс для "
+    raise ValueError(f"Не удалось найти курс для "
                      f"{from_currency}→{to_currency}")
 
 
+def get_exchange_rate(from_currency: str, to_currency: str) -> Tuple[float, str]:
+    quote = get_rate_quote(from_currency, to_currency)
+    return quote.rate, quote.updated_at
+
+
 @log_action("BUY", verbose=True)
 def buy_currency(user: User, currency: str, amount: float):
     if amount <= 0:
@@ -126,24 +311,33 @@ def buy_currency(user: User, currency: str, amount: float):
         raise ValueError(f"Нельзя купить базовую валюту "
                          f"'{base_currency}' саму за себя.")
 
-    portfolio = get_user_portfolio(user)
-    rate, _ = get_exchange_rate(currency, base_currency)
-    cost = amount * rate
+    def attempt() -> Dict:
+        portfolio = get_user_portfolio(user)
+        rate, _ = get_exchange_rate(currency, base_currency)
+        cost = amount * rate
 
-    base_wallet = portfolio.get_or_create_wallet(base_currency)
-    target_wallet = portfolio.get_or_create_wallet(currency)
-    old_target_balance = target_wallet.balance
+        base_wallet = portfolio.get_or_create_wallet(base_currency)
+        target_wallet = portfolio.get_or_create_wallet(currency)
+        old_target_balance = target_wallet.balance
 
-    base_wallet.withdraw(cost)
-    target_wallet.deposit(amount)
+        base_wallet.withdraw(cost)
+        target_wallet.deposit(amount)
 
-    save_user_portfolio(portfolio)
+        db_manager.apply_wallet_deltas(
+            {user.user_id: {base_currency: -cost, currency.upper(): amount}},
+            expected_versions={user.user_id: portfolio.version})
 
-    return {
-        "amount": amount, "currency": currency.upper(), "rate": rate,
-        "cost": cost, "base_currency": base_currency, "old_balance": old_target_balance,
-        "new_balance": target_wallet.balance, "user": user
-    }
+        return {
+            "amount": amount, "currency": currency.upper(), "rate": rate,
+            "cost": cost, "base_currency": base_currency,
+            "old_balance": old_target_balance,
+            "new_balance": target_wallet.balance, "user": user,
+            "user_id": user.user_id, "side": "buy"
+        }
+
+    result = _with_commit_retries(attempt)
+    _record_trades([result])
+    return result
 
 
 @log_action("SELL", verbose=True)
@@ -157,22 +351,194 @@ def sell_currency(user: User, currency: str, amount: float):
     if currency.upper() == base_currency:
         raise ValueError(f"Нельзя продать базовую валюту '{base_currency}'.")
 
-    portfolio = get_user_portfolio(user)
-    target_wallet = portfolio.get_wallet(currency)
-    old_target_balance = target_wallet.balance
-
-    rate, _ = get_exchange_rate(currency, base_currency)
-    revenue = amount * rate
-
-    target_wallet.withdraw(amount)
-    base_wallet = portfolio.get_or_create_wallet(base_currency)
-    base_wallet.deposit(revenue)
+    def attempt() -> Dict:
+        portfolio = get_user_portfolio(user)
+        target_wallet = portfolio.get_wallet(currency)
+        old_target_balance = target_wallet.balance
+
+        rate, _ = get_exchange_rate(currency, base_currency)
+        revenue = amount * rate
+
+        target_wallet.withdraw(amount)
+        base_wallet = portfolio.get_or_create_wallet(base_currency)
+        base_wallet.deposit(revenue)
+
+        db_manager.apply_wallet_deltas(
+            {user.user_id: {currency.upper(): -amount, base_currency: revenue}},
+            expected_versions={user.user_id: portfolio.version})
+
+        return {
+            "amount": amount, "currency": currency.upper(), "rate": rate,
+            "revenue": revenue, "base_currency": base_currency,
+            "old_balance": old_target_balance,
+            "new_balance": target_wallet.balance, "user": user,
+            "user_id": user.user_id, "side": "sell"
+        }
+
+    result = _with_commit_retries(attempt)
+    _record_trades([result])
+    return result
+
+
+@log_action("BATCH")
+def execute_orders(orders: List[Dict], mode: str = "atomic") -> List[Dict]:
+    """
+    Исполняет пакет заявок за один цикл чтения и одну запись.
+
+    Все заявки оцениваются по одному снимку курсов и применяются к портфелям
+    в памяти; изменения балансов сохраняются одной операцией
+    db_manager.apply_wallet_deltas.
+    :param orders: Словари с ключами user, side, currency, amount.
+    :param mode: "atomic" — при любой ошибке ничего не сохраняется;
+        "best-effort" — сохраняются все успешно исполненные заявки.
+    :return: Результат по каждой заявке: status ("ok", "error" или
+        "rolled_back"), параметры сделки или текст ошибки.
+    """
+    if mode not in ("atomic", "best-effort"):
+        raise ValueError(f"Неизвестный режим пакетного исполнения '{mode}'")
 
-    save_user_portfolio(portfolio)
-
-    return {
-        "amount": amount, "currency": currency.upper(), "rate": rate,
-        "revenue": revenue, "base_currency": base_currency,
-        "old_balance": old_target_balance,
-        "new_balance": target_wallet.balance, "user": user
-    }
+    base_currency = settings.get("default_base_currency", "USD")
+    rates = db_manager.get_rates_snapshot()
+
+    def attempt() -> List[Dict]:
+        results, changes, versions = _evaluate_orders(orders, base_currency, rates)
+        failed = any(r["status"] == "error" for r in results)
+        if mode == "atomic" and failed:
+            for result in results:
+                if result["status"] == "ok":
+                    result["status"] = "rolled_back"
+            return results
+
+        if changes:
+            db_manager.apply_wallet_deltas(
+                changes, expected_versions={user_id: versions[user_id]
+                                            for user_id in changes})
+        return results
+
+    # При конфликте версий пакет заново оценивается по свежим балансам
+    results = _with_commit_retries(attempt)
+    executed = [result for result in results if result["status"] == "ok"]
+    if executed:
+        _record_trades(executed)
+    return results
+
+
+def _evaluate_orders(orders: List[Dict], base_currency: str,
+                     rates: RatesSnapshot) -> Tuple[List[Dict], Dict, Dict]:
+    """
+    Проверяет заявки и применяет их к портфелям в памяти.
+    Заявка с просроченным курсом своей валюты получает ошибку.
+    :return: Результаты по заявкам, накопленные дельты балансов
+        {user_id: {код: изменение}} и прочитанные версии портфелей.
+    """
+    matrix = _conversion_matrix(rates)
+    users: Dict[str, User] = {}
+    portfolios: Dict[int, Portfolio] = {}
+    changes: Dict[int, Dict[str, float]] = {}
+    results = []
+
+    for index, raw_order in enumerate(orders, start=1):
+        result = {"index": index}
+        try:
+            order = Order.from_dict(raw_order)
+            result.update(user=order.username, side=order.side,
+                          currency=order.currency, amount=order.amount)
+            if order.amount <= 0:
+                raise ValueError("'amount' должен быть положительным числом")
+            get_currency(order.currency)
+            if order.currency == base_currency:
+                raise ValueError(f"Базовую валюту '{base_currency}' нельзя "
+                                 f"покупать или продавать за саму себя.")
+
+            user = users.get(order.username)
+            if user is None:
+                user_data = db_manager.find_user_by_username(order.username)
+                if not user_data:
+                    raise ValueError(f"Пользователь '{order.username}' не найден")
+                user = users[order.username] = User.from_dict(user_data)
+            portfolio = portfolios.get(user.user_id)
+            if portfolio is None:
+                portfolio = portfolios[user.user_id] = get_user_portfolio(user)
+
+            found = matrix.get_rate(order.currency, base_currency)
+            if found is None:
+                raise ValueError(f"Не удалось найти курс для "
+                                 f"{order.currency}→{base_currency}")
+            _check_servable(rates, found[1])
+            rate = found[0]
+            value = order.amount * rate
+
+            if order.side == "buy":
+                debit_code, debit, credit_code, credit = \
+                    base_currency, value, order.currency, order.amount
+                portfolio.get_or_create_wallet(debit_code).withdraw(debit)
+            else:
+                debit_code, debit, credit_code, credit = \
+                    order.currency, order.amount, base_currency, value
+                portfolio.get_wallet(debit_code).withdraw(debit)
+
+            credit_wallet = portfolio.get_or_create_wallet(credit_code)
+            credit_wallet.balance = credit_wallet.balance + credit
+
+            user_changes = changes.setdefault(user.user_id, {})
+            user_changes[debit_code] = user_changes.get(debit_code, 0.0) - debit
+            user_changes[credit_code] = user_changes.get(credit_code, 0.0) + credit
+
+            result.update(status="ok", user_id=user.user_id, rate=rate,
+                          base_currency=base_currency,
+                          **{"cost" if order.side == "buy" else "revenue": value})
+        except (BaseTradeError, ValueError, FileNotFoundError) as e:
+            # FileNotFoundError — у пользователя нет портфеля
+            result.update(status="error", error=str(e))
+        results.append(result)
+
+    versions = {user_id: portfolio.version
+                for user_id, portfolio in portfolios.items()}
+    return results, changes, versions
+
+
+def _load_portfolio_book(base_currency: str):
+    """Книга всех портфелей и матрица курсов с проверкой базовой валюты."""
+    from .analytics import PortfolioBook
+
+    rates = db_manager.get_rates_snapshot()
+    matrix = _conversion_matrix(rates)
+    if base_currency not in matrix:
+        raise ValueError(f"Неизвестная базовая валюта '{base_currency}'")
+    book = PortfolioBook.from_columns(*db_manager.load_wallet_columns())
+    # Оценка использует курсы всех валют книги: проверяется самый старый
+    _check_servable(rates, matrix.updated_at(base_currency, book.currencies))
+    return book, matrix
+
+
+def get_leaderboard(top: int, base_currency: str = None) -> List[Dict]:
+    """
+    Самые дорогие портфели в базовой валюте.
+    :return: [{"rank", "user_id", "username", "value"}] по убыванию стоимости.
+    """
+    if top <= 0:
+        raise ValueError("'top' должен быть положительным числом")
+    base_currency = (base_currency or settings.get("default_base_currency",
+                                                   "USD")).upper()
+    book, matrix = _load_portfolio_book(base_currency)
+    ranked = book.top(matrix, base_currency, top)
+    # Имена только лидеров: без чтения и индексации всех пользователей
+    usernames = db_manager.get_usernames([user_id for user_id, _ in ranked])
+    return [{"rank": rank, "user_id": user_id,
+             "username": usernames.get(user_id), "value": value}
+            for rank, (user_id, value) in enumerate(ranked, start=1)]
+
+
+def get_aum(base_currency: str = None) -> Dict:
+    """
+    Суммарные активы всех пользователей.
+    :return: {"base_currency", "users", "total",
+        "by_currency": {код: (баланс, стоимость)}}.
+    """
+    base_currency = (base_currency or settings.get("default_base_currency",
+                                                   "USD")).upper()
+    book, matrix = _load_portfolio_book(base_currency)
+    by_currency = book.aum_by_currency(matrix, base_currency)
+    return {"base_currency": base_currency, "users": len(book),
+            "total": sum(value for _, value in by_currency.values()),
+            "by_currency": by_currency}
@@ -1,57 +1,101 @@
 # valutatrade_hub/decorators.py
+import inspect
 import logging
+import random
+import time
 from functools import wraps
 from typing import Any, Callable
 
+from .infra.metrics import metrics
+from .infra.profiling import phase
+from .infra.settings import settings
+from .logging_config import ActionEvent
+
+ACTION_SECONDS = metrics.histogram(
+    "valutatrade_action_duration_seconds",
+    "Длительность операций, отмеченных log_action")
+ACTION_ERRORS = metrics.counter(
+    "valutatrade_action_errors_total",
+    "Операции log_action, завершившиеся исключением")
+
+
+def _argument_getter(func: Callable, name: str) -> Callable:
+    """
+    Функция, извлекающая аргумент name из (args, kwargs) вызова func.
+    Позиция аргумента определяется один раз при декорировании.
+    """
+    parameters = list(inspect.signature(func).parameters)
+    position = parameters.index(name) if name in parameters else None
+
+    def get(args: tuple, kwargs: dict) -> Any:
+        if name in kwargs:
+            return kwargs[name]
+        if position is not None and position < len(args):
+            return args[position]
+        return None
+
+    return get
+
 
 def log_action(action_name: str, verbose: bool = False) -> Callable:
     """
     Декоратор для логирования выполнения ключевых операций.
-    Логирует начало, результат (успех/ошибка) и основные параметры.
+    На каждый вызов пишется одна запись ActionEvent с результатом
+    (успех/ошибка), основными параметрами и длительностью. Успешные
+    вызовы можно прореживать: log_success_sample_rate — доля
+    сохраняемых записей; ошибки логируются всегда. Длительность каждого
+    вызова попадает в метрику valutatrade_action_duration_seconds.
     """
 
     def decorator(func: Callable) -> Callable:
-        @wraps(func)
-        def wrapper(*args, **kwargs) -> Any:
-            user = kwargs.get('user')
-            username = user.username if user else 'Guest'
-
-            # Собираем основные аргументы для лога
-            log_params = {
-                'username': username,
-                'currency': kwargs.get('currency', 'N/A'),
-                'amount': kwargs.get('amount', 'N/A')
+        get_user = _argument_getter(func, 'user')
+        get_username = _argument_getter(func, 'username')
+        get_currency = _argument_getter(func, 'currency')
+        get_amount = _argument_getter(func, 'amount')
+
+        def event(args: tuple, kwargs: dict, duration: float) -> dict:
+            user = get_user(args, kwargs)
+            return {
+                "action": action_name,
+                "user": user.username if user else get_username(args, kwargs),
+                "currency": get_currency(args, kwargs),
+                "amount": get_amount(args, kwargs),
+                "duration_ms": duration * 1000,
             }
-            log_str = ' '.join(f"{k}='{v}'" for k, v in log_params.items()
-                               if v != 'N/A')
 
+        @wraps(func)
+        def wrapper(*args, **kwargs) -> Any:
+            started = time.perf_counter()
             try:
-                # Логируем вызов
-                logging.info(f"START {action_name} {log_str}")
-
                 result = func(*args, **kwargs)
-
-                # Формируем сообщение об успехе
-                success_log = f"{action_name} {log_str} result=OK"
-                if verbose and isinstance(result, dict):
-                    # Добавляем доп. инфо для verbose режима
-                    rate = result.get('rate', 0)
-                    success_log += (f" rate={rate:.2f} "
-                                    f"base='{result.get('base_currency', 'N/A')}'")
-
-                logging.info(f"FINISH {success_log}")
-                return result
-
             except Exception as e:
-                # Логируем ошибку
-                error_type = type(e).__name__
-                logging.error(
-                    f"FINISH {action_name} {log_str} result=ERROR "
-                    f"error_type='{error_type}' error_message='{e}'"
-                )
+                duration = time.perf_counter() - started
+                ACTION_SECONDS.observe(duration, action=action_name, result="ERROR")
+                fields = event(args, kwargs, duration)
+                fields.update(result="ERROR", error_type=type(e).__name__,
+                              error_message=str(e))
+                ACTION_ERRORS.inc(action=action_name, error_type=type(e).__name__)
+                with phase("logging"):
+                    logging.error(ActionEvent(fields))
                 # Пробрасываем исключение дальше
                 raise
 
+            duration = time.perf_counter() - started
+            # Метрики учитывают все вызовы, в том числе не попавшие в выборку лога
+            ACTION_SECONDS.observe(duration, action=action_name, result="OK")
+            sample_rate = settings.get("log_success_sample_rate", 1.0)
+            if sample_rate < 1.0 and random.random() >= sample_rate:
+                return result
+            fields = event(args, kwargs, duration)
+            fields["result"] = "OK"
+            if verbose and isinstance(result, dict):
+                # Добавляем доп. инфо для verbose режима
+                fields["rate"] = result.get('rate', 0)
+                fields["base_currency"] = result.get('base_currency')
+            with phase("logging"):
+                logging.info(ActionEvent(fields))
+            return result
+
         return wrapper
 
     return decorator
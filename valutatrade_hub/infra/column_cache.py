@@ -0,0 +1,93 @@
+# valutatrade_hub/infra/column_cache.py
+import os
+import threading
+import zipfile
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+
+from .indexes import FileStamp
+
+Columns = Dict[str, np.ndarray]
+WALLET_COLUMNS = ("user_id", "currency_code", "balance")
+
+
+def _stamp_array(stamps: Sequence[FileStamp]) -> np.ndarray:
+    """Отпечатки файлов одним массивом; отсутствующий файл — (-1, -1, -1)."""
+    return np.array([value for stamp in stamps
+                     for value in (stamp or (-1, -1, -1))], dtype=np.int64)
+
+
+def wallet_columns(portfolios_data: List[Dict]) -> Columns:
+    """Столбцы кошельков (WALLET_COLUMNS) по записям портфелей."""
+    wallets = [portfolio.get('wallets', {}) for portfolio in portfolios_data]
+    user_ids = np.array([portfolio['user_id'] for portfolio in portfolios_data],
+                        dtype=np.int64)
+    return {"user_id": np.repeat(user_ids, [len(w) for w in wallets]),
+            "currency_code": np.array([code for w in wallets for code in w],
+                                      dtype=str),
+            "balance": np.array([w_data.get('balance', 0.0) for w in wallets
+                                 for w_data in w.values()], dtype=np.float64)}
+
+
+def username_columns(users_data: List[Dict]) -> Columns:
+    """Столбцы user_id и username по записям пользователей."""
+    return {"user_id": np.array([user['user_id'] for user in users_data],
+                                dtype=np.int64),
+            "username": np.array([user['username'] for user in users_data],
+                                 dtype=str)}
+
+
+class ColumnCache:
+    """
+    Столбцы NumPy, построенные по файлам хранилища, с отпечатками источников.
+
+    Столбцы держатся в памяти процесса и в файле .npz рядом с данными,
+    поэтому отдельный запуск CLI не разбирает заново весь portfolios.json
+    или таблицу кошельков. Кэш действителен, пока отпечатки (inode, mtime,
+    размер) исходных файлов совпадают с сохраненными вместе со столбцами.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._columns: Columns | None = None
+        self._stamp: np.ndarray | None = None
+
+    def get(self, stamps: Sequence[FileStamp],
+            build: Callable[[], Columns]) -> Columns:
+        """
+        Возвращает столбцы для текущих отпечатков источников.
+        :param stamps: Отпечатки файлов, снятые до чтения данных: если файл
+            изменится во время build, следующий вызов просто перестроит кэш.
+        :param build: Строит столбцы по хранилищу при промахе кэша.
+        """
+        stamp = _stamp_array(stamps)
+        if self._columns is not None and np.array_equal(self._stamp, stamp):
+            return self._columns
+        columns = self._read(stamp)
+        if columns is None:
+            columns = build()
+            self._write(stamp, columns)
+        self._columns, self._stamp = columns, stamp
+        return columns
+
+    def _read(self, stamp: np.ndarray) -> Columns | None:
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                if not np.array_equal(data['stamp'], stamp):
+                    return None
+                return {name: data[name] for name in data.files if name != 'stamp'}
+        except (OSError, KeyError, ValueError, EOFError, zipfile.BadZipFile):
+            return None
+
+    def _write(self, stamp: np.ndarray, columns: Columns):
+        # Кэш необязателен: если каталог недоступен для записи, столбцы
+        # просто строятся заново при каждом запуске
+        temp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                np.savez(f, stamp=stamp, **columns)
+            os.replace(temp_path, self.path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
@@ -1,15 +1,54 @@
 # valutatrade_hub/infra/database.py
 import json
 import os
-from typing import Any, Dict, List
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
 
+from ..core.exceptions import ConcurrentModificationError
+from .indexes import PortfolioIndex, UserIndex, file_stamp
+from .journal import PortfolioJournal
+from .ledger import TradeLedger
+from .locking import FileLock
+from .metrics import metrics
+from .profiling import phase
+from .rates_snapshot import RatesSnapshot
 from .settings import settings
+from .snapshot_codec import ENCODINGS, SnapshotDecodeError, decode, encode
+
+if TYPE_CHECKING:
+    import numpy as np
+
+STORAGE_SECONDS = metrics.histogram(
+    "valutatrade_storage_seconds",
+    "Длительность чтения и записи JSON-файлов хранилища")
 
 
 class DatabaseManager:
     """
-    Singleton для управления доступом к файловому хранилищу (JSON).
+    Singleton для управления доступом к хранилищу данных.
     Абстрагирует логику чтения и записи, используя пути из SettingsLoader.
+    Пользователи и портфели хранятся в JSON-файлах (storage_backend = "json")
+    или в базе SQLite (storage_backend = "sqlite"); курсы всегда лежат в JSON.
+    В JSON-режиме с portfolio_journal = true изменения балансов дописываются
+    в журнал, а portfolios.json служит снимком и обновляется при компактификации.
+
+    Кодировка файлов users, portfolios и rates задается storage_encoding:
+    json (с отступами), compact (JSON без пробелов) или binary (двоичный
+    снимок snapshot_codec). При чтении формат определяется по содержимому,
+    поэтому смена кодировки не требует конвертации: файл перезаписывается
+    в новой кодировке при следующей записи (или командой convert-storage).
+
+    В JSON-режиме прочитанные данные держатся в памяти вместе с хеш-индексами
+    (UserIndex, PortfolioIndex). Индекс сбрасывается, если отпечаток файла
+    (inode, mtime, размер) изменился извне, и обновляется при собственной записи.
+
+    Сделки при любом бэкенде записываются в append-only журнал TradeLedger
+    (каталог ledger_dir) с поиндексными файлами пользователей.
+
+    Несколько процессов могут работать с одними файлами одновременно:
+    запись идет под межпроцессной блокировкой (fcntl) на файлах *.lock,
+    а каждый портфель несет версию, по которой apply_wallet_deltas
+    обнаруживает изменения, сделанные между чтением и записью.
     """
     _instance = None
 
@@ -17,6 +56,7 @@ class DatabaseManager:
         if cls._instance is None:
             cls._instance = super(DatabaseManager, cls).__new__(cls)
             cls._instance._init_paths()
+            cls._instance._init_backend()
         return cls._instance
 
     def _init_paths(self):
@@ -31,39 +71,497 @@ class DatabaseManager:
         self.rates_file = os.path.join(data_path,
                                        settings.get("rates_file",
                                                     "rates.json"))
+        self.sqlite_file = os.path.join(data_path,
+                                        settings.get("sqlite_file",
+                                                     "valutatrade.db"))
+        self.journal_file = os.path.join(data_path,
+                                         settings.get("journal_file",
+                                                      "portfolios.journal"))
+        self.ledger_dir = os.path.join(data_path,
+                                       settings.get("ledger_dir", "ledger"))
         self.session_file = os.path.join(data_path, ".session")
         os.makedirs(data_path, exist_ok=True)
 
+    def _init_backend(self):
+        """Выбирает бэкенд хранения пользователей и портфелей."""
+        self.backend = settings.get("storage_backend", "json").lower()
+        if self.backend not in ("json", "sqlite"):
+            raise ValueError(f"Неизвестный storage_backend: '{self.backend}'")
+        self._sqlite = None
+        if self.backend == "sqlite":
+            from .sqlite_storage import SqliteStorage
+            self._sqlite = SqliteStorage(self.sqlite_file)
+        self.encoding = settings.get("storage_encoding", "json").lower()
+        if self.encoding not in ENCODINGS:
+            raise ValueError(f"Неизвестный storage_encoding: '{self.encoding}'")
+        self._file_kinds = {self.users_file: "users",
+                            self.portfolios_file: "portfolios",
+                            self.rates_file: "rates"}
+        self.journal_enabled = (self.backend == "json"
+                                and settings.get("portfolio_journal", False))
+        self.journal_compact_threshold = settings.get("journal_compact_threshold",
+                                                      1000)
+        self._journal = PortfolioJournal(self.journal_file)
+        self._ledger = TradeLedger(self.ledger_dir)
+        self._users_lock = FileLock(f"{self.users_file}.lock")
+        self._portfolios_lock = FileLock(f"{self.portfolios_file}.lock")
+        self._user_index = None
+        self._user_index_stamp = None
+        self._portfolio_index = None
+        self._wallet_columns = None
+        self._username_columns = None
+        self._snapshot_stamp = None
+        self._journal_stamp = None
+        self._journal_offset = 0
+        self._rates_snapshot = None
+        self._rates_stamp = None
+        self._rates_version = 0
+
     def _load_data(self, file_path: str) -> Any:
         if not os.path.exists(file_path):
             return [] if 'users' in file_path or 'portfolios' in file_path else {}
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
+            with STORAGE_SECONDS.time(operation="load",
+                                      file=os.path.basename(file_path)):
+                with phase("storage read"):
+                    with open(file_path, 'rb') as f:
+                        content = f.read()
+                with phase("deserialize"):
+                    return decode(content)
+        except (json.JSONDecodeError, SnapshotDecodeError, FileNotFoundError):
             return [] if 'users' in file_path or 'portfolios' in file_path else {}
 
-    def _save_data(self, file_path: str, data: Any):
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+    def _save_data(self, file_path: str, data: Any, encoding: str = None):
+        """
+        Атомарно заменяет файл: читатели без блокировки видят либо старое,
+        либо новое содержимое, но никогда не частично записанное.
+        :param encoding: Кодировка записи (по умолчанию storage_encoding).
+        """
+        temp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with STORAGE_SECONDS.time(operation="save",
+                                      file=os.path.basename(file_path)), \
+                    phase("storage write"):
+                content = encode(data, self._file_kinds.get(file_path),
+                                 encoding or self.encoding)
+                with open(temp_path, 'wb') as f:
+                    f.write(content)
+                os.replace(temp_path, file_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    # --- Индексы JSON-режима ---
+
+    def _users(self) -> UserIndex:
+        """Возвращает индекс пользователей, перечитывая файл при изменении."""
+        stamp = file_stamp(self.users_file)
+        if self._user_index is None or stamp != self._user_index_stamp:
+            users_data = self._load_data(self.users_file)
+            with phase("deserialize"):
+                self._user_index = UserIndex(users_data)
+            self._user_index_stamp = stamp
+        return self._user_index
+
+    def _write_users(self, users_data: List[Dict]):
+        self._user_index = None
+        with phase("storage write"):
+            self._save_data(self.users_file, users_data)
+            self._user_index = UserIndex(users_data)
+            self._user_index_stamp = file_stamp(self.users_file)
+
+    def _portfolios(self) -> PortfolioIndex:
+        """
+        Возвращает индекс портфелей, синхронизированный с файлами на диске.
+        Если снимок не менялся, а журнал только дописывался, читается лишь
+        новый хвост журнала; иначе снимок и журнал перечитываются целиком
+        под разделяемой блокировкой, чтобы не попасть между записью снимка
+        и сбросом журнала при компактификации.
+        """
+        snapshot_stamp = file_stamp(self.portfolios_file)
+        journal_stamp = file_stamp(self.journal_file)
+        index = self._portfolio_index
+        if index is not None and snapshot_stamp == self._snapshot_stamp:
+            if journal_stamp == self._journal_stamp:
+                return index
+            if self.journal_enabled and journal_stamp is not None \
+                    and self._journal_stamp is not None \
+                    and journal_stamp[0] == self._journal_stamp[0] \
+                    and journal_stamp[2] >= self._journal_offset:
+                with phase("storage read"):
+                    records, self._journal_offset = self._journal.read(
+                        self._journal_offset)
+                index.apply_records(records)
+                self._journal_stamp = journal_stamp
+                return index
+
+        if not self.journal_enabled and journal_stamp is not None:
+            # Журнальный режим выключен: сворачиваем остаток журнала
+            self.compact_journal(keep_journal=False)
+            return self._portfolio_index
+
+        with self._portfolios_lock.hold(shared=True):
+            snapshot_stamp = file_stamp(self.portfolios_file)
+            journal_stamp = file_stamp(self.journal_file)
+            portfolios_data = self._load_data(self.portfolios_file)
+            with phase("deserialize"):
+                index = PortfolioIndex(portfolios_data)
+            offset = 0
+            if self.journal_enabled:
+                with phase("storage read"):
+                    records, offset = self._journal.read()
+                index.apply_records(records)
+            self._set_portfolio_index(index, snapshot_stamp, journal_stamp, offset)
+        return index
+
+    def _set_portfolio_index(self, index: PortfolioIndex, snapshot_stamp,
+                             journal_stamp, journal_offset: int):
+        self._portfolio_index = index
+        self._snapshot_stamp = snapshot_stamp
+        self._journal_stamp = journal_stamp
+        self._journal_offset = journal_offset
+
+    def _write_portfolios(self, portfolios_data: List[Dict]):
+        """Записывает снимок портфелей; вызывается под блокировкой."""
+        self._portfolio_index = None
+        with phase("storage write"):
+            self._save_data(self.portfolios_file, portfolios_data)
+            self._set_portfolio_index(PortfolioIndex(portfolios_data),
+                                      file_stamp(self.portfolios_file),
+                                      file_stamp(self.journal_file),
+                                      self._journal_offset)
+
+    @staticmethod
+    def _check_versions(index: PortfolioIndex, expected_versions: Dict[int, int]):
+        for user_id, expected in (expected_versions or {}).items():
+            if index.version(user_id) != expected:
+                raise ConcurrentModificationError(f"портфель пользователя {user_id}")
+
+    # --- Полная загрузка и запись ---
 
     def load_users(self) -> List[Dict]:
-        return self._load_data(self.users_file)
+        if self._sqlite:
+            return self._sqlite.load_users()
+        return list(self._users().users)
 
     def save_users(self, users_data: List[Dict]):
-        self._save_data(self.users_file, users_data)
+        if self._sqlite:
+            self._sqlite.save_users(users_data)
+            return
+        with self._users_lock.hold():
+            self._write_users(list(users_data))
 
     def load_portfolios(self) -> List[Dict]:
-        return self._load_data(self.portfolios_file)
+        if self._sqlite:
+            return self._sqlite.load_portfolios()
+        return list(self._portfolios().portfolios)
+
+    def load_wallet_columns(self) -> Tuple['np.ndarray', 'np.ndarray', 'np.ndarray']:
+        """
+        Все кошельки по столбцам NumPy: user_id, код валюты, баланс.
+        Столбцы кэшируются в файле .npz (ColumnCache) по отпечаткам
+        portfolios.json и журнала или файлов базы SQLite; при промахе
+        SQLite читает их одним запросом, JSON-режим — из индекса портфелей.
+        """
+        from .column_cache import WALLET_COLUMNS, ColumnCache, wallet_columns
+
+        if self._wallet_columns is None:
+            source = self.sqlite_file if self._sqlite else self.portfolios_file
+            self._wallet_columns = ColumnCache(f"{source}.wallets.npz")
+        if self._sqlite:
+            wal_stamp = file_stamp(f"{self.sqlite_file}-wal")
+            # Пустой WAL создается заново при каждом подключении и данных
+            # не содержит: его отпечаток не должен сбрасывать кэш
+            stamps = (file_stamp(self.sqlite_file),
+                      wal_stamp if wal_stamp and wal_stamp[2] else None)
+            columns = self._wallet_columns.get(stamps,
+                                               self._sqlite.load_wallet_columns)
+        else:
+            stamps = (file_stamp(self.portfolios_file),
+                      file_stamp(self.journal_file))
+            columns = self._wallet_columns.get(
+                stamps, lambda: wallet_columns(self._portfolios().portfolios))
+        return tuple(columns[name] for name in WALLET_COLUMNS)
 
     def save_portfolios(self, portfolios_data: List[Dict]):
-        self._save_data(self.portfolios_file, portfolios_data)
+        if self._sqlite:
+            self._sqlite.save_portfolios(portfolios_data)
+            return
+        portfolios_data = list(portfolios_data)
+        with self._portfolios_lock.hold():
+            if self.journal_enabled:
+                # Полная запись снимка поглощает все записи журнала
+                last_seq = self._journal.last_seq()
+                for portfolio_data in portfolios_data:
+                    portfolio_data['journal_seq'] = last_seq
+                self._write_portfolios(portfolios_data)
+                self._reset_journal(last_seq)
+                return
+            self._write_portfolios(portfolios_data)
+
+    def _reset_journal(self, checkpoint_seq: int):
+        self._journal.reset(checkpoint_seq)
+        journal_stamp = file_stamp(self.journal_file)
+        self._journal_stamp = journal_stamp
+        self._journal_offset = journal_stamp[2]
+
+    def compact_journal(self, keep_journal: bool = True) -> List[Dict]:
+        """
+        Сворачивает журнал в новый снимок portfolios.json.
+        Снимок записывается атомарно до сброса журнала; повторное применение
+        записей после сбоя исключено благодаря journal_seq в каждом портфеле.
+        :return: Актуальное состояние портфелей.
+        """
+        with self._portfolios_lock.hold():
+            portfolios_data = self._journal.replay(
+                self._load_data(self.portfolios_file))
+            last_seq = self._journal.last_seq()
+            if keep_journal:
+                self._write_portfolios(portfolios_data)
+                self._reset_journal(last_seq)
+            else:
+                for portfolio_data in portfolios_data:
+                    portfolio_data.pop('journal_seq', None)
+                self._write_portfolios(portfolios_data)
+                self._journal.remove()
+                self._journal_stamp = None
+                self._journal_offset = 0
+        return portfolios_data
+
+    # --- Построчный доступ к пользователям ---
+
+    def get_user(self, user_id: int) -> Dict | None:
+        if self._sqlite:
+            return self._sqlite.get_user(user_id)
+        return self._users().by_id.get(user_id)
+
+    def get_usernames(self, user_ids: List[int]) -> Dict[int, str]:
+        """
+        Имена пользователей по списку user_id без построения UserIndex.
+        В JSON-режиме столбцы user_id/username кэшируются в файле .npz
+        по отпечатку users.json; неизвестные user_id в ответ не попадают.
+        """
+        if self._sqlite:
+            return self._sqlite.get_usernames(user_ids)
+        stamp = file_stamp(self.users_file)
+        if self._user_index is not None and stamp == self._user_index_stamp:
+            by_id = self._user_index.by_id
+            return {user_id: by_id[user_id]['username']
+                    for user_id in user_ids if user_id in by_id}
+
+        import numpy as np
+
+        from .column_cache import ColumnCache, username_columns
+        if self._username_columns is None:
+            self._username_columns = ColumnCache(f"{self.users_file}.names.npz")
+        columns = self._username_columns.get(
+            (stamp,), lambda: username_columns(self._load_data(self.users_file)))
+        found = np.isin(columns['user_id'], user_ids)
+        return dict(zip(columns['user_id'][found].tolist(),
+                        columns['username'][found].tolist()))
+
+    def find_user_by_username(self, username: str) -> Dict | None:
+        if self._sqlite:
+            return self._sqlite.find_user_by_username(username)
+        return self._users().by_username.get(username)
+
+    def next_user_id(self) -> int:
+        if self._sqlite:
+            return self._sqlite.next_user_id()
+        return self._users().next_id
+
+    def add_user(self, user_data: Dict):
+        """
+        Добавляет пользователя; имя должно быть уникальным.
+        :raises ValueError: Если имя уже занято.
+        :raises ConcurrentModificationError: Если user_id успел занять
+            другой процесс.
+        """
+        if self._sqlite:
+            self._sqlite.add_user(user_data)
+            return
+        with self._users_lock.hold():
+            index = self._users()
+            if user_data['username'] in index.by_username:
+                raise ValueError(f"Имя пользователя '{user_data['username']}' "
+                                 f"уже занято")
+            if user_data['user_id'] in index.by_id:
+                raise ConcurrentModificationError(
+                    f"user_id {user_data['user_id']} уже занят")
+            self._write_users(index.users + [user_data])
+
+    def update_user(self, user_data: Dict):
+        if self._sqlite:
+            self._sqlite.update_user(user_data)
+            return
+        with self._users_lock.hold():
+            self._write_users([user_data if u['user_id'] == user_data['user_id']
+                               else u for u in self._users().users])
+
+    # --- Построчный доступ к портфелям ---
+
+    def get_portfolio(self, user_id: int) -> Dict | None:
+        if self._sqlite:
+            return self._sqlite.get_portfolio(user_id)
+        return self._portfolios().by_user_id.get(user_id)
+
+    def save_portfolio(self, portfolio_data: Dict):
+        """Заменяет портфель целиком, увеличивая его версию."""
+        if self._sqlite:
+            self._sqlite.save_portfolio(portfolio_data)
+            return
+        user_id = portfolio_data['user_id']
+        with self._portfolios_lock.hold():
+            if self.journal_enabled:
+                current = self.get_portfolio(user_id) or {}
+                current_wallets = current.get('wallets', {})
+                deltas = {}
+                for code, w_data in portfolio_data.get('wallets', {}).items():
+                    old_balance = current_wallets.get(code, {}).get('balance')
+                    if old_balance is None or w_data['balance'] != old_balance:
+                        deltas[code] = w_data['balance'] - (old_balance or 0.0)
+                self.apply_wallet_deltas({user_id: deltas})
+                return
+            index = self._portfolios()
+            portfolio_data = dict(portfolio_data,
+                                  version=index.version(user_id) + 1)
+            portfolios_data = [p for p in index.portfolios
+                               if p['user_id'] != user_id]
+            portfolios_data.append(portfolio_data)
+            self._write_portfolios(portfolios_data)
+
+    def apply_wallet_deltas(self, changes: Dict[int, Dict[str, float]],
+                            expected_versions: Dict[int, int] = None):
+        """
+        Изменяет балансы кошельков на указанные величины и увеличивает
+        версии затронутых портфелей.
+        :param changes: {user_id: {currency_code: изменение баланса}}.
+        :param expected_versions: {user_id: версия}, прочитанная вызывающим
+            кодом; если портфель с тех пор изменился, запись не выполняется.
+        :raises ConcurrentModificationError: Если версия портфеля не совпала.
+        В JSON-режиме проверка и запись выполняются под исключительной
+        блокировкой файла; в журнальном режиме дельты дописываются в журнал,
+        а индекс догоняет его чтением только нового хвоста.
+        """
+        if self._sqlite:
+            self._sqlite.apply_wallet_deltas(changes, expected_versions)
+            return
+        with self._portfolios_lock.hold():
+            index = self._portfolios()
+            self._check_versions(index, expected_versions)
+            versions = {user_id: index.version(user_id) + 1 for user_id in changes}
+            if self.journal_enabled:
+                # Новый журнал продолжает нумерацию с journal_seq снимка
+                checkpoint_seq = 0 if self._journal.exists() else max(
+                    (p.get('journal_seq', 0) for p in index.portfolios), default=0)
+                with phase("storage write"):
+                    records, self._journal_offset = self._journal.append(
+                        changes, versions, checkpoint_seq)
+                index.apply_records(records)
+                self._journal_stamp = file_stamp(self.journal_file)
+                if records and records[-1]['seq'] - self._journal.first_seq() \
+                        >= self.journal_compact_threshold:
+                    self.compact_journal()
+                return
+            self._portfolio_index = None
+            index.apply_deltas(changes, versions)
+            self._write_portfolios(index.portfolios)
+
+    def migrate_json_to_sqlite(self) -> tuple[int, int]:
+        """
+        Импортирует users.json и portfolios.json в базу SQLite.
+        Записи журнала, еще не свернутые в снимок, применяются к портфелям
+        так же, как при чтении. Существующее содержимое базы заменяется.
+        :return: Количество импортированных пользователей и портфелей.
+        """
+        from .sqlite_storage import SqliteStorage
+
+        users_data = self._load_data(self.users_file)
+        with self._portfolios_lock.hold(shared=True):
+            portfolios_data = self._journal.replay(
+                self._load_data(self.portfolios_file))
+        storage = self._sqlite or SqliteStorage(self.sqlite_file)
+        try:
+            storage.import_data(users_data, portfolios_data)
+        finally:
+            if storage is not self._sqlite:
+                storage.close()
+        return len(users_data), len(portfolios_data)
+
+    # --- Журнал сделок ---
+
+    def append_trades(self, trades: List[Dict]) -> List[Dict]:
+        """
+        Записывает исполненные сделки в журнал.
+        :return: Сделки с присвоенными id.
+        """
+        return self._ledger.append(trades)
+
+    def get_trades(self, user_id: int, limit: int = 50,
+                   before: int = None) -> List[Dict]:
+        """Страница сделок пользователя от новых к старым (id < before)."""
+        return self._ledger.user_trades(user_id, limit, before)
+
+    def count_trades(self, user_id: int) -> int:
+        return self._ledger.count(user_id)
+
+    def get_trades_after(self, user_id: int, trade_id: int) -> List[Dict]:
+        """Сделки пользователя с id больше trade_id, от старых к новым."""
+        return self._ledger.user_trades_after(user_id, trade_id)
+
+    def load_pnl_snapshot(self, user_id: int) -> Dict | None:
+        return self._ledger.load_snapshot(user_id)
+
+    def save_pnl_snapshot(self, user_id: int, snapshot: Dict):
+        self._ledger.save_snapshot(user_id, snapshot)
+
+    def convert_storage(self, encoding: str) -> List[Tuple[str, int, int]]:
+        """
+        Перезаписывает users, portfolios и rates в кодировке encoding.
+        Файлы переписываются под блокировками записи; отсутствующие пропускаются.
+        :return: (путь, размер до, размер после) по каждому файлу.
+        :raises ValueError: Если кодировка неизвестна.
+        """
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Неизвестная кодировка хранилища '{encoding}'. "
+                             f"Доступны: {', '.join(ENCODINGS)}")
+        results = []
+        for path, lock in ((self.users_file, self._users_lock),
+                           (self.portfolios_file, self._portfolios_lock),
+                           (self.rates_file, FileLock(f"{self.rates_file}.lock"))):
+            if not os.path.exists(path):
+                continue
+            with lock.hold():
+                old_size = os.path.getsize(path)
+                self._save_data(path, self._load_data(path), encoding)
+                results.append((path, old_size, os.path.getsize(path)))
+        # Отпечатки файлов изменились: индексы и снимок курсов перечитаются
+        return results
 
     def load_rates(self) -> Dict:
         return self._load_data(self.rates_file)
 
     def save_rates(self, rates_data: Dict):
         self._save_data(self.rates_file, rates_data)
+        self._set_rates_snapshot(rates_data)
+
+    def get_rates_snapshot(self) -> RatesSnapshot:
+        """
+        Общий для процесса снимок курсов.
+        rates.json перечитывается, только если изменился его отпечаток
+        (inode, mtime, размер); иначе возвращается тот же объект.
+        """
+        stamp = file_stamp(self.rates_file)
+        if self._rates_snapshot is None or stamp != self._rates_stamp:
+            self._set_rates_snapshot(self._load_data(self.rates_file), stamp)
+        return self._rates_snapshot
+
+    def _set_rates_snapshot(self, rates_data: Dict, stamp=None):
+        self._rates_version += 1
+        with phase("deserialize"):
+            self._rates_snapshot = RatesSnapshot(rates_data, self._rates_version)
+        self._rates_stamp = stamp or file_stamp(self.rates_file)
 
     def get_current_user_id(self) -> int | None:
         if not os.path.exists(self.session_file):
@@ -0,0 +1,70 @@
+# valutatrade_hub/infra/indexes.py
+import os
+from typing import Dict, List, Tuple
+
+from .journal import apply_records
+
+FileStamp = Tuple[int, int, int] | None
+
+
+def file_stamp(path: str) -> FileStamp:
+    """Отпечаток файла (inode, mtime, размер) для проверки актуальности кэша."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+class UserIndex:
+    """Хеш-индексы пользователей: username → запись, user_id → запись."""
+
+    def __init__(self, users_data: List[Dict]):
+        self.users = users_data
+        self.by_username: Dict[str, Dict] = {}
+        self.by_id: Dict[int, Dict] = {}
+        self.next_id = 1
+        for user_data in users_data:
+            self._index(user_data)
+
+    def _index(self, user_data: Dict):
+        self.by_username[user_data['username']] = user_data
+        self.by_id[user_data['user_id']] = user_data
+        self.next_id = max(self.next_id, user_data['user_id'] + 1)
+
+    def add(self, user_data: Dict):
+        self.users.append(user_data)
+        self._index(user_data)
+
+
+class PortfolioIndex:
+    """Хеш-индекс портфелей: user_id → запись."""
+
+    def __init__(self, portfolios_data: List[Dict]):
+        self.portfolios = portfolios_data
+        self.by_user_id: Dict[int, Dict] = {p['user_id']: p
+                                            for p in portfolios_data}
+
+    def version(self, user_id: int) -> int:
+        """Текущая версия портфеля (0, если портфеля еще нет)."""
+        return self.by_user_id.get(user_id, {}).get('version', 0)
+
+    def apply_deltas(self, changes: Dict[int, Dict[str, float]],
+                     versions: Dict[int, int] = None):
+        """Применяет дельты балансов и новые версии к проиндексированным записям."""
+        for user_id, deltas in changes.items():
+            portfolio = self.by_user_id.get(user_id)
+            if portfolio is None:
+                portfolio = {"user_id": user_id, "wallets": {}}
+                self.portfolios.append(portfolio)
+                self.by_user_id[user_id] = portfolio
+            for code, delta in deltas.items():
+                wallet = portfolio['wallets'].setdefault(
+                    code, {"currency_code": code, "balance": 0.0})
+                wallet['balance'] += delta
+            if versions and user_id in versions:
+                portfolio['version'] = versions[user_id]
+
+    def apply_records(self, records: List[Dict]):
+        """Применяет записи журнала портфелей."""
+        apply_records(self.portfolios, self.by_user_id, records)
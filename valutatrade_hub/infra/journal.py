@@ -0,0 +1,160 @@
+# valutatrade_hub/infra/journal.py
+import json
+import os
+from typing import Dict, List, Tuple
+
+
+def apply_records(portfolios_data: List[Dict], by_user: Dict[int, Dict],
+                  records: List[Dict]):
+    """
+    Применяет записи журнала к портфелям (на месте).
+    Записи с seq не больше journal_seq портфеля уже учтены в снимке.
+    """
+    for record in records:
+        user_id = record['user_id']
+        portfolio = by_user.get(user_id)
+        if portfolio is None:
+            portfolio = {"user_id": user_id, "wallets": {}}
+            by_user[user_id] = portfolio
+            portfolios_data.append(portfolio)
+        if record['seq'] <= portfolio.get('journal_seq', 0):
+            continue
+        code = record['currency']
+        wallet = portfolio['wallets'].setdefault(
+            code, {"currency_code": code, "balance": 0.0})
+        wallet['balance'] += record['delta']
+        portfolio['journal_seq'] = record['seq']
+        if 'version' in record:
+            portfolio['version'] = record['version']
+
+
+class PortfolioJournal:
+    """
+    Append-only журнал изменений балансов кошельков (JSON Lines).
+
+    Каждая запись — дельта одного кошелька:
+    {"seq": 42, "user_id": 1, "currency": "BTC", "delta": 0.05, "version": 7},
+    где version — версия портфеля после изменения.
+    Первая строка файла — контрольная точка {"seq": N} с номером последней
+    записи, уже свернутой в снимок portfolios.json. Номера seq растут
+    монотонно и не сбрасываются при компактификации.
+    Запись в журнал выполняется под блокировкой DatabaseManager.
+    """
+
+    _TAIL_CHUNK = 4096
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def append(self, changes: Dict[int, Dict[str, float]],
+               versions: Dict[int, int] = None,
+               checkpoint_seq: int = 0) -> Tuple[List[Dict], int]:
+        """
+        Дописывает дельты в конец журнала одной операцией записи.
+        :param versions: Новые версии портфелей {user_id: версия}.
+        :param checkpoint_seq: Номер последней записи, уже учтенной в снимке;
+            записывается контрольной точкой, если журнал создается заново.
+        :return: Записанные записи и размер журнала после записи.
+        """
+        checkpoint_seq = max(self.last_seq(), checkpoint_seq)
+        seq = checkpoint_seq
+        records = []
+        for user_id, deltas in changes.items():
+            for currency, delta in deltas.items():
+                seq += 1
+                record = {"seq": seq, "user_id": user_id,
+                          "currency": currency, "delta": delta}
+                if versions and user_id in versions:
+                    record["version"] = versions[user_id]
+                records.append(record)
+        with open(self.path, 'ab+') as f:
+            size = f.seek(0, os.SEEK_END)
+            if not records:
+                return records, size
+            payload = ''.join(json.dumps(r) + '\n' for r in records).encode('utf-8')
+            if not size:
+                payload = (json.dumps({"seq": checkpoint_seq}) + '\n'
+                           ).encode('utf-8') + payload
+            else:
+                f.seek(size - 1)
+                if f.read(1) != b'\n':
+                    # Хвост недописанной строки после сбоя не должен
+                    # склеиться с первой новой записью
+                    payload = b'\n' + payload
+            f.write(payload)
+            return records, size + len(payload)
+
+    def read(self, offset: int = 0) -> Tuple[List[Dict], int]:
+        """
+        Читает записи, начиная с байтового смещения offset.
+        Учитываются только завершенные строки, поэтому возвращаемое смещение
+        всегда указывает на начало следующей (возможно, еще не дописанной) строки.
+        :return: Записи и смещение конца прочитанной части.
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            return [], 0
+        end = chunk.rfind(b'\n') + 1
+        records = []
+        for line in chunk[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                # Недописанная строка после аварийного завершения
+                continue
+            if 'user_id' in record:
+                records.append(record)
+        return records, offset + end
+
+    def replay(self, portfolios_data: List[Dict]) -> List[Dict]:
+        """Применяет все записи журнала к снимку портфелей."""
+        apply_records(portfolios_data, {p['user_id']: p for p in portfolios_data},
+                      self.read()[0])
+        return portfolios_data
+
+    def first_seq(self) -> int:
+        """Номер контрольной точки (последней свернутой записи)."""
+        if not self.exists():
+            return 0
+        with open(self.path, 'r', encoding='utf-8') as f:
+            try:
+                return json.loads(f.readline()).get('seq', 0)
+            except json.JSONDecodeError:
+                return 0
+
+    def last_seq(self) -> int:
+        """Номер последней записи; читает только хвост файла."""
+        if not self.exists():
+            return 0
+        with open(self.path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - self._TAIL_CHUNK))
+            lines = f.read().splitlines()
+        for line in reversed(lines):
+            try:
+                return json.loads(line)['seq']
+            except (json.JSONDecodeError, KeyError, UnicodeDecodeError):
+                continue
+        return 0
+
+    def pending_count(self) -> int:
+        """Количество записей, еще не свернутых в снимок."""
+        return self.last_seq() - self.first_seq()
+
+    def reset(self, checkpoint_seq: int):
+        """Атомарно заменяет журнал контрольной точкой checkpoint_seq."""
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({"seq": checkpoint_seq}) + '\n')
+        os.replace(temp_path, self.path)
+
+    def remove(self):
+        if self.exists():
+            os.remove(self.path)
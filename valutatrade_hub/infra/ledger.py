@@ -0,0 +1,259 @@
+# valutatrade_hub/infra/ledger.py
+import json
+import os
+import struct
+from typing import Dict, List
+
+from .locking import FileLock
+from .profiling import timed
+
+# Запись индекса пользователя: id сделки, смещение и длина строки в журнале
+_ENTRY = struct.Struct("<QQI")
+
+
+class TradeLedger:
+    """
+    Append-only журнал сделок (JSON Lines) с поиндексными файлами пользователей.
+
+    Каждая строка trades.jsonl — одна сделка:
+    {"id": 17, "user_id": 3, "side": "buy", "currency": "BTC", "amount": 0.01,
+     "rate": 93847.0, "cost": 938.47, "base_currency": "USD",
+     "timestamp": "..."} (для продажи вместо cost — revenue).
+    Номера id растут монотонно по всему журналу.
+
+    Для каждого пользователя в index/<user_id>.idx хранятся записи
+    фиксированной ширины (id, смещение, длина) в порядке возрастания id.
+    Страница истории находится двоичным поиском по индексу пользователя и
+    читается точечными чтениями нужных строк, поэтому ее стоимость не
+    зависит от размера общего журнала. В index/position записан размер
+    журнала, уже учтенный индексами: если процесс упал между записью в
+    журнал и в индексы (или каталог index удален), следующая запись
+    сначала доиндексирует хвост.
+
+    В pnl/<user_id>.json хранятся снимки состояния расчета P&L
+    пользователя с номером последней учтенной сделки.
+    """
+
+    _TAIL_CHUNK = 4096
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, "trades.jsonl")
+        self.index_dir = os.path.join(directory, "index")
+        self._position_path = os.path.join(self.index_dir, "position")
+        self.snapshot_dir = os.path.join(directory, "pnl")
+        self._lock = FileLock(f"{self.path}.lock")
+
+    def _index_path(self, user_id: int) -> str:
+        return os.path.join(self.index_dir, f"{user_id}.idx")
+
+    # --- Запись ---
+
+    @timed("storage write")
+    def append(self, trades: List[Dict]) -> List[Dict]:
+        """
+        Дописывает сделки одной операцией записи и обновляет индексы.
+        :param trades: Сделки без id.
+        :return: Сделки с присвоенными id.
+        """
+        if not trades:
+            return []
+        os.makedirs(self.index_dir, exist_ok=True)
+        with self._lock.hold():
+            size = self._catch_up()
+            next_id = self.last_id() + 1
+            records, lines = [], []
+            for number, trade in enumerate(trades):
+                record = {"id": next_id + number, **trade}
+                records.append(record)
+                lines.append((json.dumps(record, ensure_ascii=False) + "\n")
+                             .encode("utf-8"))
+            with open(self.path, 'ab') as f:
+                f.write(b"".join(lines))
+            entries: Dict[int, List[bytes]] = {}
+            offset = size
+            for record, line in zip(records, lines):
+                entries.setdefault(record["user_id"], []).append(
+                    _ENTRY.pack(record["id"], offset, len(line)))
+                offset += len(line)
+            for user_id, packed in entries.items():
+                with open(self._index_path(user_id), 'ab') as f:
+                    f.write(b"".join(packed))
+            self._write_position(offset)
+        return records
+
+    def _read_position(self) -> int:
+        try:
+            with open(self._position_path, 'r', encoding='utf-8') as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _write_position(self, position: int):
+        temp_path = f"{self._position_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(str(position))
+        os.replace(temp_path, self._position_path)
+
+    def _catch_up(self) -> int:
+        """
+        Доиндексирует записи журнала после index/position и обрезает
+        недописанную последнюю строку. Вызывается под блокировкой.
+        :return: Размер журнала, с которого продолжается запись.
+        """
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            size = 0
+        position = self._read_position()
+        if position == size:
+            return size
+        position = min(position, size)
+        with open(self.path, 'rb+') as f:
+            f.seek(position)
+            chunk = f.read()
+            end = chunk.rfind(b"\n") + 1
+            if end < len(chunk):
+                # Хвост недописанной строки после сбоя
+                f.truncate(position + end)
+        offset = position
+        for line in chunk[:end].splitlines(keepends=True):
+            try:
+                record = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                offset += len(line)
+                continue
+            last = self._last_entry(record["user_id"])
+            if last is None or last[0] < record["id"]:
+                with open(self._index_path(record["user_id"]), 'ab') as f:
+                    f.write(_ENTRY.pack(record["id"], offset, len(line)))
+            offset += len(line)
+        self._write_position(offset)
+        return offset
+
+    # --- Чтение ---
+
+    def last_id(self) -> int:
+        """Номер последней сделки; читает только хвост журнала."""
+        try:
+            with open(self.path, 'rb') as f:
+                size = f.seek(0, os.SEEK_END)
+                f.seek(max(0, size - self._TAIL_CHUNK))
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return 0
+        for line in reversed(lines):
+            try:
+                return json.loads(line)['id']
+            except (json.JSONDecodeError, KeyError, UnicodeDecodeError):
+                continue
+        return 0
+
+    def _last_entry(self, user_id: int) -> tuple | None:
+        """
+        Последняя запись индекса пользователя; недописанная после сбоя
+        запись отрезается. Вызывается под блокировкой.
+        """
+        try:
+            with open(self._index_path(user_id), 'rb+') as f:
+                size = f.seek(0, os.SEEK_END)
+                if size % _ENTRY.size:
+                    size -= size % _ENTRY.size
+                    f.truncate(size)
+                if not size:
+                    return None
+                f.seek(size - _ENTRY.size)
+                return _ENTRY.unpack(f.read(_ENTRY.size))
+        except FileNotFoundError:
+            return None
+
+    def count(self, user_id: int) -> int:
+        """Количество сделок пользователя."""
+        try:
+            return os.path.getsize(self._index_path(user_id)) // _ENTRY.size
+        except FileNotFoundError:
+            return 0
+
+    @timed("storage read")
+    def user_trades(self, user_id: int, limit: int = 50,
+                    before: int = None) -> List[Dict]:
+        """
+        Страница сделок пользователя, от новых к старым.
+        :param limit: Наибольшее количество сделок на странице.
+        :param before: Вернуть только сделки с id меньше before.
+        """
+        if limit <= 0:
+            return []
+        try:
+            index = open(self._index_path(user_id), 'rb')
+        except FileNotFoundError:
+            return []
+        with index, open(self.path, 'rb') as ledger:
+            count = os.fstat(index.fileno()).st_size // _ENTRY.size
+            end = count if before is None else self._bisect(index, count, before)
+            start = max(0, end - limit)
+            index.seek(start * _ENTRY.size)
+            entries = list(_ENTRY.iter_unpack(
+                index.read((end - start) * _ENTRY.size)))
+            trades = []
+            for _, offset, length in reversed(entries):
+                ledger.seek(offset)
+                trades.append(json.loads(ledger.read(length)))
+        return trades
+
+    @staticmethod
+    def _bisect(index, count: int, trade_id: int) -> int:
+        """Позиция первой записи индекса с id не меньше trade_id."""
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            index.seek(middle * _ENTRY.size)
+            if _ENTRY.unpack(index.read(_ENTRY.size))[0] < trade_id:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    @timed("storage read")
+    def user_trades_after(self, user_id: int, after: int = 0) -> List[Dict]:
+        """Сделки пользователя с id больше after, от старых к новым."""
+        try:
+            index = open(self._index_path(user_id), 'rb')
+        except FileNotFoundError:
+            return []
+        with index, open(self.path, 'rb') as ledger:
+            count = os.fstat(index.fileno()).st_size // _ENTRY.size
+            start = self._bisect(index, count, after + 1)
+            index.seek(start * _ENTRY.size)
+            trades = []
+            for _, offset, length in _ENTRY.iter_unpack(
+                    index.read((count - start) * _ENTRY.size)):
+                ledger.seek(offset)
+                trades.append(json.loads(ledger.read(length)))
+        return trades
+
+    # --- Снимки P&L ---
+
+    def _snapshot_path(self, user_id: int) -> str:
+        return os.path.join(self.snapshot_dir, f"{user_id}.json")
+
+    @timed("storage read")
+    def load_snapshot(self, user_id: int) -> Dict | None:
+        try:
+            with open(self._snapshot_path(user_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    @timed("storage write")
+    def save_snapshot(self, user_id: int, snapshot: Dict):
+        """Атомарно заменяет снимок; более старый снимок не затирает новый."""
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        current = self.load_snapshot(user_id)
+        if current and current.get("trade_id", 0) >= snapshot.get("trade_id", 0):
+            return
+        path = self._snapshot_path(user_id)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f)
+        os.replace(temp_path, path)
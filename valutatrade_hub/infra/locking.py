@@ -0,0 +1,100 @@
+# valutatrade_hub/infra/locking.py
+import fcntl
+import os
+import threading
+from contextlib import contextmanager
+
+
+class FileLock:
+    """
+    Рекомендательная межпроцессная блокировка (fcntl.flock) на файле-замке.
+
+    Блокировка реентерабельна внутри процесса: вложенный захват тем же
+    объектом ничего не делает, поэтому чтение под разделяемой блокировкой
+    можно вызывать из секции, уже удерживающей исключительную. Повышение
+    разделяемой блокировки до исключительной не поддерживается.
+    Потоки одного процесса сериализуются внутренним RLock.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = None
+        self._depth = 0
+        self._thread_lock = threading.RLock()
+
+    @contextmanager
+    def hold(self, shared: bool = False):
+        """Удерживает блокировку на время блока with."""
+        with self._thread_lock:
+            if self._depth == 0:
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+                except BaseException:
+                    os.close(fd)
+                    raise
+                self._fd = fd
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+                    os.close(self._fd)
+                    self._fd = None
+
+
+class PidFile:
+    """
+    PID-файл, удерживаемый исключительной блокировкой на время жизни процесса.
+    Блокировка снимается ядром даже при аварийном завершении, поэтому
+    «живость» владельца определяется по ней, а не по наличию файла.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = None
+
+    def acquire(self) -> bool:
+        """Захватывает файл без ожидания; False, если он уже занят."""
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is None:
+            return
+        os.remove(self.path)
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+    def owner_pid(self) -> int | None:
+        """
+        PID процесса, удерживающего файл, или None, если он свободен.
+        0 — файл занят, но владелец еще не успел записать PID.
+        """
+        if self._fd is not None:
+            return os.getpid()
+        try:
+            fd = os.open(self.path, os.O_RDONLY)
+        except FileNotFoundError:
+            return None
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            except BlockingIOError:
+                content = os.read(fd, 32).decode().strip()
+                return int(content) if content.isdigit() else 0
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            return None
+        finally:
+            os.close(fd)
@@ -0,0 +1,274 @@
+# valutatrade_hub/infra/metrics.py
+import atexit
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+from .locking import FileLock
+from .settings import settings
+
+# Границы корзин гистограмм задержек, секунды
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n") \
+        .replace('"', '\\"')
+
+
+def _label_key(labels: Dict[str, str]) -> str:
+    """Метки в форме экспозиции Prometheus: action="BUY",result="OK"."""
+    return ",".join(f'{name}="{_escape(value)}"'
+                    for name, value in sorted(labels.items()))
+
+
+class Counter:
+    """Монотонный счетчик с метками."""
+    kind = "counter"
+
+    def __init__(self, registry: 'MetricsRegistry', name: str, help_text: str):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+
+    def inc(self, amount: float = 1.0, **labels):
+        self.registry._record(self, _label_key(labels), amount)
+
+
+class Histogram:
+    """
+    Гистограмма с фиксированными корзинами.
+    Хранятся счетчики отдельных корзин (последняя — +Inf), сумма и
+    количество; накопительные значения le строятся при экспорте.
+    """
+    kind = "histogram"
+
+    def __init__(self, registry: 'MetricsRegistry', name: str, help_text: str,
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        self.registry._record(self, _label_key(labels), value)
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Измеряет длительность блока with."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+
+class MetricsRegistry:
+    """
+    Реестр метрик процесса.
+
+    Сбор включается настройкой metrics_enabled (по умолчанию выключен).
+    Измерения копятся в памяти и при завершении процесса (а в долгоживущих
+    процессах — не чаще раза в metrics_flush_seconds) сливаются под
+    блокировкой файла в общее состояние data/metrics.json. Так метрики
+    коротких запусков CLI суммируются между процессами. После слияния
+    обновляется текстовый файл в формате экспозиции Prometheus
+    (metrics_textfile) для textfile-коллектора node_exporter.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Counter | Histogram] = {}
+        self._pending: Dict[str, Dict[str, list]] = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._atexit_registered = False
+        self._enabled: bool | None = None
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._register(Counter(self, name, help_text))
+
+    def histogram(self, name: str, help_text: str,
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(self, name, help_text, buckets))
+
+    def _register(self, metric):
+        return self._metrics.setdefault(metric.name, metric)
+
+    @property
+    def enabled(self) -> bool:
+        if self._enabled is None:
+            self._enabled = settings.get("metrics_enabled", False)
+        return self._enabled
+
+    @staticmethod
+    def _paths() -> Tuple[str, str]:
+        data_path = settings.get("data_path", "data")
+        return (os.path.join(data_path, settings.get("metrics_file", "metrics.json")),
+                os.path.join(data_path,
+                             settings.get("metrics_textfile", "metrics.prom")))
+
+    def _record(self, metric, label_key: str, value: float):
+        if not self.enabled:
+            return
+        with self._lock:
+            series = self._pending.setdefault(metric.name, {})
+            state = series.get(label_key)
+            if metric.kind == "counter":
+                series[label_key] = [(state or [0.0])[0] + value]
+            else:
+                if state is None:
+                    # [счетчики корзин..., счетчик +Inf, сумма, количество]
+                    state = series[label_key] = \
+                        [0] * (len(metric.buckets) + 1) + [0.0, 0]
+                state[bisect_left(metric.buckets, value)] += 1
+                state[-2] += value
+                state[-1] += 1
+            if not self._atexit_registered:
+                atexit.register(self.flush)
+                self._atexit_registered = True
+        if time.monotonic() - self._last_flush > settings.get("metrics_flush_seconds",
+                                                              10):
+            self.flush()
+
+    def flush(self):
+        """Сливает накопленные измерения в общее состояние и обновляет textfile."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+        state_path, textfile_path = self._paths()
+        os.makedirs(os.path.dirname(state_path) or ".", exist_ok=True)
+        with FileLock(f"{state_path}.lock").hold():
+            state = _load_state(state_path)
+            for name, series in pending.items():
+                metric = self._metrics[name]
+                entry = state.setdefault(name, {"type": metric.kind,
+                                                "help": metric.help,
+                                                "series": {}})
+                if metric.kind == "histogram":
+                    entry["buckets"] = list(metric.buckets)
+                stored = entry["series"]
+                for label_key, values in series.items():
+                    old = stored.get(label_key)
+                    stored[label_key] = values if old is None or \
+                        len(old) != len(values) else \
+                        [a + b for a, b in zip(old, values)]
+            _write_atomic(state_path, json.dumps(state))
+            _write_atomic(textfile_path, render_prometheus(state))
+
+    def load(self) -> Dict:
+        """Общее состояние метрик с учетом еще не слитых измерений процесса."""
+        self.flush()
+        return _load_state(self._paths()[0])
+
+    def reset(self):
+        """Удаляет накопленные метрики всех процессов."""
+        with self._lock:
+            self._pending = {}
+        for path in self._paths():
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _load_state(path: str) -> Dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _write_atomic(path: str, content: str):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(temp_path, path)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _labels(label_key: str, extra: str = "") -> str:
+    joined = ",".join(part for part in (label_key, extra) if part)
+    return f"{{{joined}}}" if joined else ""
+
+
+def _cumulative(values: List[float], bucket_count: int) -> List[int]:
+    """Накопительные счетчики корзин, включая +Inf."""
+    result, total = [], 0
+    for count in values[:bucket_count + 1]:
+        total += count
+        result.append(total)
+    return result
+
+
+def render_prometheus(state: Dict) -> str:
+    """Состояние метрик в текстовом формате экспозиции Prometheus."""
+    lines = []
+    for name in sorted(state):
+        entry = state[name]
+        lines.append(f"# HELP {name} {entry['help']}")
+        lines.append(f"# TYPE {name} {entry['type']}")
+        for label_key, values in sorted(entry["series"].items()):
+            if entry["type"] == "counter":
+                lines.append(f"{name}{_labels(label_key)} {_format_value(values[0])}")
+                continue
+            bounds = entry["buckets"] + [math.inf]
+            cumulative = _cumulative(values, len(entry["buckets"]))
+            for bound, count in zip(bounds, cumulative):
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{name}_bucket{_labels(label_key, le)} {count}")
+            lines.append(f"{name}_sum{_labels(label_key)} {_format_value(values[-2])}")
+            lines.append(f"{name}_count{_labels(label_key)} {values[-1]}")
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def histogram_quantile(quantile: float, buckets: List[float],
+                       values: List[float]) -> float | None:
+    """
+    Оценка квантиля по корзинам (как histogram_quantile в Prometheus):
+    линейная интерполяция внутри корзины, в которую попадает квантиль.
+    """
+    count = values[-1]
+    if not count:
+        return None
+    rank = quantile * count
+    lower, previous = 0.0, 0
+    for bound, cumulative in zip(buckets, _cumulative(values, len(buckets))):
+        if cumulative >= rank:
+            in_bucket = cumulative - previous
+            if not in_bucket:
+                return bound
+            return lower + (bound - lower) * (rank - previous) / in_bucket
+        lower, previous = bound, cumulative
+    # Квантиль в корзине +Inf: оценка ограничена последней конечной границей
+    return buckets[-1]
+
+
+def summary_rows(state: Dict) -> List[Tuple[str, str, int, float, float, float]]:
+    """Строки (метрика, метки, количество, среднее, p50, p99) для гистограмм."""
+    rows = []
+    for name in sorted(state):
+        entry = state[name]
+        if entry["type"] != "histogram":
+            continue
+        for label_key, values in sorted(entry["series"].items()):
+            count = values[-1]
+            rows.append((name, label_key, count,
+                         values[-2] / count if count else 0.0,
+                         histogram_quantile(0.5, entry["buckets"], values),
+                         histogram_quantile(0.99, entry["buckets"], values)))
+    return rows
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,123 @@
+# valutatrade_hub/infra/profiling.py
+import threading
+import time
+from functools import wraps
+from typing import Callable, Dict, List, Tuple
+
+# Фазы в порядке вывода; compute — время, не отнесенное к другим фазам
+PHASES = ("settings", "storage read", "deserialize", "hashing", "compute",
+          "storage write", "logging")
+
+
+class PhaseTimer:
+    """
+    Накопитель собственного времени фаз выполнения команды.
+    Вложенные фазы вычитаются из внешних: чтение файла внутри
+    десериализации засчитывается только как «storage read».
+    Учитываются только фазы потока, запустившего таймер.
+    """
+
+    def __init__(self):
+        self.thread_id = threading.get_ident()
+        self.totals: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self.stack: List['_Phase'] = []
+        self.started = time.perf_counter()
+        self.finished: float | None = None
+
+    def add(self, name: str, seconds: float):
+        self.totals[name] = self.totals.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    @property
+    def total(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def rows(self) -> List[Tuple[str, int, float]]:
+        """(фаза, вызовов, секунд) в порядке PHASES; compute — остаток."""
+        measured = sum(self.totals.values())
+        rows = []
+        for name in PHASES:
+            if name == "compute":
+                rows.append((name, 0, max(0.0, self.total - measured)))
+            else:
+                rows.append((name, self.calls.get(name, 0),
+                             self.totals.get(name, 0.0)))
+        return rows
+
+
+class _Phase:
+    __slots__ = ("timer", "name", "started", "children")
+
+    def __init__(self, timer: PhaseTimer, name: str):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.children = 0.0
+        self.timer.stack.append(self)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = time.perf_counter() - self.started
+        stack = self.timer.stack
+        stack.pop()
+        self.timer.add(self.name, elapsed - self.children)
+        if stack:
+            stack[-1].children += elapsed
+        return False
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+_active: PhaseTimer | None = None
+
+
+def start() -> PhaseTimer:
+    """Включает учет фаз в текущем потоке."""
+    global _active
+    _active = PhaseTimer()
+    return _active
+
+
+def stop() -> PhaseTimer | None:
+    global _active
+    timer, _active = _active, None
+    if timer is not None:
+        timer.finished = time.perf_counter()
+    return timer
+
+
+def phase(name: str):
+    """
+    Контекстный менеджер фазы. Без активного таймера (обычный запуск)
+    возвращает общий пустой менеджер, так что стоимость — одна проверка.
+    """
+    timer = _active
+    if timer is None or threading.get_ident() != timer.thread_id:
+        return _NULL_PHASE
+    return _Phase(timer, name)
+
+
+def timed(name: str) -> Callable:
+    """Декоратор: весь вызов функции относится к фазе name."""
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,71 @@
+# valutatrade_hub/infra/rates_refresh.py
+import logging
+import os
+import subprocess
+import sys
+import time
+
+from .locking import PidFile
+from .settings import settings
+
+# Корень, из которого импортируется пакет valutatrade_hub: дочерний процесс
+# должен найти его, даже если trade запущен не из каталога проекта
+_PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+
+def _data_file(key: str, default: str) -> str:
+    return os.path.join(settings.get("data_path", "data"), settings.get(key, default))
+
+
+def daemon_pid_path() -> str:
+    """PID-файл демона `trade rates-daemon`."""
+    return _data_file("rates_daemon_pid_file", "rates-daemon.pid")
+
+
+def refresh_pid_path() -> str:
+    """PID-файл фонового обновления, запускаемого при чтении устаревшего кэша."""
+    return _data_file("rates_refresh_pid_file", "rates-refresh.pid")
+
+
+def request_background_refresh() -> bool:
+    """
+    Запускает обновление курсов в отдельном процессе, не дожидаясь его.
+
+    Запросы дедуплицируются: обновление не запускается, если работает
+    демон обновления курсов, если другое фоновое обновление еще идет или
+    если предыдущее было запущено менее rates_refresh_cooldown_seconds
+    назад (при недоступном API каждое чтение иначе порождало бы процесс).
+    Сам дочерний процесс тоже захватывает PID-файл без ожидания, так что
+    при гонке двух запросов опрос API выполнит только один из них.
+    :return: True, если процесс обновления был запущен.
+    """
+    if PidFile(daemon_pid_path()).owner_pid() is not None:
+        return False
+    pid_path = refresh_pid_path()
+    if PidFile(pid_path).owner_pid() is not None:
+        return False
+
+    stamp_path = f"{pid_path}.stamp"
+    cooldown = settings.get("rates_refresh_cooldown_seconds", 30)
+    try:
+        if time.time() - os.path.getmtime(stamp_path) < cooldown:
+            return False
+    except FileNotFoundError:
+        pass
+    with open(stamp_path, "a"):
+        os.utime(stamp_path)
+
+    python_path = os.pathsep.join(
+        filter(None, [_PACKAGE_ROOT, os.environ.get("PYTHONPATH")]))
+    try:
+        subprocess.Popen(
+            [sys.executable, "-m", "valutatrade_hub.parser_service.refresh"],
+            env=dict(os.environ, PYTHONPATH=python_path),
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL, start_new_session=True)
+    except OSError as e:
+        logging.error(f"Failed to start background rates refresh: {e}")
+        return False
+    logging.info("Background rates refresh started")
+    return True
@@ -0,0 +1,104 @@
+# valutatrade_hub/infra/rates_snapshot.py
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Tuple
+
+
+def parse_timestamp(value: str | None) -> datetime | None:
+    """Разбирает ISO-метку времени; метки без часового пояса считаются UTC."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+@dataclass(frozen=True, slots=True)
+class RatePair:
+    """Курс одной валютной пары из кэша."""
+    rate: float
+    updated_at: str
+    updated_at_dt: datetime | None
+    source: str | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class RateQuote:
+    """
+    Курс, выданный из кэша.
+    stale — кэш старше rates_ttl_seconds, но еще пригоден для использования.
+    """
+    rate: float
+    updated_at: str
+    stale: bool = False
+
+
+class RatesSnapshot:
+    """
+    Разобранный снимок rates.json: курсы пар и предразобранные метки времени.
+    Номер version растет при каждой перезагрузке файла, что позволяет
+    производным структурам (например, матрицам курсов) понимать,
+    когда их нужно пересчитать.
+    """
+
+    def __init__(self, rates_data: Dict, version: int):
+        self.version = version
+        # Время обновления самого давно обновлявшегося источника
+        self.last_refresh: str | None = rates_data.get("last_refresh")
+        self.last_refresh_dt = parse_timestamp(self.last_refresh)
+        self.sources: Dict[str, str] = rates_data.get("sources") or {}
+        self.pairs: Dict[str, RatePair] = {
+            pair_key: RatePair(rate=info['rate'],
+                               updated_at=info.get('updated_at', 'N/A'),
+                               updated_at_dt=parse_timestamp(info.get('updated_at')),
+                               source=info.get('source'))
+            for pair_key, info in (rates_data.get("pairs") or {}).items()
+        }
+
+    def __bool__(self) -> bool:
+        return bool(self.pairs)
+
+    def age_seconds(self, now: datetime = None,
+                    updated_at: str = None) -> float | None:
+        """
+        Возраст курса в секундах или None, если время обновления неизвестно.
+        :param updated_at: Время обновления использованного курса; без него
+            берется last_refresh, то есть возраст самого старого источника.
+        """
+        updated_at_dt = (self.last_refresh_dt if updated_at is None
+                         else parse_timestamp(updated_at))
+        if updated_at_dt is None:
+            return None
+        now = now or datetime.now(timezone.utc)
+        return (now - updated_at_dt).total_seconds()
+
+    def is_expired(self, ttl_seconds: float, updated_at: str = None) -> bool:
+        """
+        Старше ли курс ttl_seconds.
+        :param updated_at: Время обновления пары, курс которой используется
+            (для производного курса — самого старого из его звеньев).
+        """
+        age = self.age_seconds(updated_at=updated_at)
+        return age is None or age > ttl_seconds
+
+    def get_rate(self, from_currency: str,
+                 to_currency: str) -> Tuple[float, str] | None:
+        """
+        Ищет прямой или обратный курс пары.
+        :return: (курс, время обновления) или None, если пары нет в кэше.
+        :raises ValueError: Если обратный курс равен нулю.
+        """
+        pair = self.pairs.get(f"{from_currency}_{to_currency}")
+        if pair is not None:
+            return pair.rate, pair.updated_at
+
+        pair = self.pairs.get(f"{to_currency}_{from_currency}")
+        if pair is not None:
+            if pair.rate == 0:
+                raise ValueError("Нулевой курс, деление невозможно.")
+            return 1 / pair.rate, pair.updated_at
+        return None
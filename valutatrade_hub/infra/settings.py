@@ -1,8 +1,6 @@
 # valutatrade_hub/infra/settings.py
 from typing import Any
 
-import toml
-
 
 class SettingsLoader:
     """
@@ -12,6 +10,7 @@ class SettingsLoader:
     Реализован через переопределение __new__ для простоты и наглядности.
     Это гарантирует, что при каждом импорте и вызове будет возвращаться
     один и тот же экземпляр класса, избегая повторной загрузки конфига.
+    Файл читается при первом обращении к get(), а не при импорте модуля.
     """
     _instance = None
     _config = None
@@ -19,11 +18,12 @@ class SettingsLoader:
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(SettingsLoader, cls).__new__(cls)
-            cls._instance.reload()
         return cls._instance
 
     def reload(self):
         """Загружает или перезагружает конфигурацию из файла."""
+        import toml
+
         try:
             with (open('pyproject.toml', 'r', encoding='utf-8') as f):
                 pyproject_data = toml.load(f)
@@ -36,6 +36,8 @@ class SettingsLoader:
 
     def get(self, key: str, default: Any = None) -> Any:
         """Получает значение из конфигурации по ключу."""
+        if self._config is None:
+            self.reload()
         return self._config.get(key, default)
 
 
@@ -0,0 +1,285 @@
+# valutatrade_hub/infra/snapshot_codec.py
+import json
+import struct
+from typing import Any, Callable, Dict, List
+
+# json — JSON с отступами (исходный формат), compact — JSON без пробелов,
+# binary — двоичный снимок с фиксированными записями
+ENCODINGS = ("json", "compact", "binary")
+
+MAGIC = b"VTHB"
+FORMAT_VERSION = 1
+
+# Тег схемы в заголовке определяет разбор записей
+SCHEMAS = {"users": 1, "portfolios": 2, "rates": 3}
+
+# magic, версия формата, тег схемы, резерв, число записей, число
+# вложенных записей (кошельков), строка с JSON прочих полей верхнего уровня
+_HEADER = struct.Struct("<4sHBBIII")
+# Индекс строки-заглушки: поле отсутствует
+_NONE = 0xFFFFFFFF
+
+# user_id, username, salt, hashed_password, registration_date,
+# hash_algorithm, hash_params (JSON), прочие поля (JSON)
+_USER = struct.Struct("<qIIIIIII")
+_USER_FIELDS = ("username", "salt", "hashed_password", "registration_date",
+                "hash_algorithm")
+# user_id, version, journal_seq, флаги наличия version/journal_seq,
+# число кошельков, прочие поля (JSON)
+_PORTFOLIO = struct.Struct("<qqqBII")
+_HAS_VERSION, _HAS_JOURNAL_SEQ = 1, 2
+# код валюты, баланс, прочие поля (JSON)
+_WALLET = struct.Struct("<IdI")
+# пара, курс, updated_at, source, прочие поля (JSON)
+_RATE = struct.Struct("<IdIII")
+
+
+class SnapshotDecodeError(ValueError):
+    """Содержимое файла хранилища повреждено или не поддерживается."""
+
+
+class _StringTable:
+    """Таблица интернированных строк: одинаковые строки хранятся один раз."""
+
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.strings: List[str] = []
+
+    def add(self, value: str | None) -> int:
+        if value is None:
+            return _NONE
+        position = self.index.get(value)
+        if position is None:
+            position = self.index[value] = len(self.strings)
+            self.strings.append(value)
+        return position
+
+    def add_json(self, value: Any) -> int:
+        if not value:
+            return _NONE
+        return self.add(json.dumps(value, sort_keys=True, ensure_ascii=False))
+
+    def pack(self) -> bytes:
+        encoded = [value.encode("utf-8") for value in self.strings]
+        return (struct.pack(f"<I{len(encoded)}I", len(encoded),
+                            *map(len, encoded)) + b"".join(encoded))
+
+
+def _unpack_strings(content: bytes, offset: int) -> tuple:
+    """:return: Список строк и смещение первой записи."""
+    (count,) = struct.unpack_from("<I", content, offset)
+    offset += 4
+    lengths = struct.unpack_from(f"<{count}I", content, offset)
+    offset += 4 * count
+    strings = []
+    for length in lengths:
+        strings.append(content[offset:offset + length].decode("utf-8"))
+        offset += length
+    return strings, offset
+
+
+def _record_bytes(content: bytes, offset: int, count: int,
+                  record: struct.Struct) -> bytes:
+    """Байты count записей с offset; обрезанный файл — ошибка."""
+    end = offset + count * record.size
+    if len(content) < end:
+        raise SnapshotDecodeError(f"Двоичный снимок обрезан: ожидалось {end} "
+                                  f"байт, прочитано {len(content)}")
+    return content[offset:end]
+
+
+def _extras(record: Dict, known: tuple) -> Dict:
+    return {key: value for key, value in record.items() if key not in known}
+
+
+def _string_field(record: Dict, key: str, strings: _StringTable,
+                  extra: Dict) -> int:
+    """Строковое поле в таблицу строк; значения других типов — в extra."""
+    value = record.get(key)
+    if key not in record:
+        return _NONE
+    if isinstance(value, str):
+        return strings.add(value)
+    extra[key] = value
+    return _NONE
+
+
+def _encode_users(users: List[Dict], strings: _StringTable) -> tuple:
+    known = ("user_id", "hash_params") + _USER_FIELDS
+    records = []
+    for user in users:
+        extra = _extras(user, known)
+        fields = [_string_field(user, key, strings, extra) for key in _USER_FIELDS]
+        params = strings.add(json.dumps(user["hash_params"], sort_keys=True)) \
+            if "hash_params" in user else _NONE
+        records.append(_USER.pack(user["user_id"], *fields, params,
+                                  strings.add_json(extra)))
+    return len(users), 0, _NONE, b"".join(records)
+
+
+def _encode_portfolios(portfolios: List[Dict], strings: _StringTable) -> tuple:
+    records, wallets = [], []
+    for portfolio in portfolios:
+        extra = _extras(portfolio, ("user_id", "version", "journal_seq", "wallets"))
+        flags = (_HAS_VERSION if "version" in portfolio else 0) | \
+            (_HAS_JOURNAL_SEQ if "journal_seq" in portfolio else 0)
+        portfolio_wallets = portfolio.get("wallets", {})
+        records.append(_PORTFOLIO.pack(
+            portfolio["user_id"], portfolio.get("version", 0),
+            portfolio.get("journal_seq", 0), flags, len(portfolio_wallets),
+            strings.add_json(extra)))
+        for code, wallet in portfolio_wallets.items():
+            wallet_extra = _extras(wallet, ("currency_code", "balance"))
+            if wallet.get("currency_code", code) != code:
+                wallet_extra["currency_code"] = wallet["currency_code"]
+            wallets.append(_WALLET.pack(strings.add(code), wallet["balance"],
+                                        strings.add_json(wallet_extra)))
+    return (len(portfolios), len(wallets), _NONE,
+            b"".join(records) + b"".join(wallets))
+
+
+def _encode_rates(rates: Dict, strings: _StringTable) -> tuple:
+    records = []
+    pairs = rates.get("pairs") or {}
+    for pair, info in pairs.items():
+        extra = _extras(info, ("rate", "updated_at", "source"))
+        records.append(_RATE.pack(
+            strings.add(pair), info["rate"],
+            _string_field(info, "updated_at", strings, extra),
+            _string_field(info, "source", strings, extra),
+            strings.add_json(extra)))
+    meta = _extras(rates, ("pairs",))
+    if "pairs" in rates:
+        meta["pairs"] = {}  # Признак наличия ключа; пары лежат в записях
+    return len(pairs), 0, strings.add_json(meta), b"".join(records)
+
+
+_ENCODERS: Dict[str, Callable] = {"users": _encode_users,
+                                  "portfolios": _encode_portfolios,
+                                  "rates": _encode_rates}
+
+
+def encode(data: Any, kind: str | None, encoding: str) -> bytes:
+    """
+    Сериализует данные хранилища.
+    :param kind: Схема данных: users, portfolios или rates. Для прочих
+        данных двоичная кодировка недоступна и используется compact.
+    :param encoding: json, compact или binary.
+    :raises ValueError: Если кодировка неизвестна.
+    """
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Неизвестная кодировка хранилища '{encoding}'. "
+                         f"Доступны: {', '.join(ENCODINGS)}")
+    if encoding == "binary" and kind in _ENCODERS:
+        strings = _StringTable()
+        count, nested, meta, records = _ENCODERS[kind](data, strings)
+        header = _HEADER.pack(MAGIC, FORMAT_VERSION, SCHEMAS[kind], 0,
+                              count, nested, meta)
+        return header + strings.pack() + records
+    if encoding == "json":
+        return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+    return json.dumps(data, ensure_ascii=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def is_binary(content: bytes) -> bool:
+    return content[:len(MAGIC)] == MAGIC
+
+
+def decode(content: bytes) -> Any:
+    """
+    Разбирает данные в любой из кодировок; формат определяется по
+    сигнатуре MAGIC в начале файла.
+    :raises json.JSONDecodeError: Если поврежден JSON.
+    :raises SnapshotDecodeError: Если поврежден или обрезан двоичный снимок,
+        он записан более новой версией формата или файл не в UTF-8.
+    """
+    if not is_binary(content):
+        try:
+            return json.loads(content)
+        except UnicodeDecodeError as e:
+            raise SnapshotDecodeError(f"Файл хранилища не в UTF-8: {e}") from e
+    try:
+        return _decode_binary(content)
+    except SnapshotDecodeError:
+        raise
+    except (struct.error, IndexError, KeyError, StopIteration, ValueError) as e:
+        raise SnapshotDecodeError(f"Поврежденный двоичный снимок: {e}") from e
+
+
+def _decode_binary(content: bytes) -> Any:
+    _, version, schema, _, count, nested, meta = _HEADER.unpack_from(content)
+    if version > FORMAT_VERSION:
+        raise SnapshotDecodeError(
+            f"Версия двоичного снимка {version} не поддерживается "
+            f"(поддерживается до {FORMAT_VERSION})")
+    strings, offset = _unpack_strings(content, _HEADER.size)
+    parsed_json: Dict[int, Any] = {}
+
+    def load_json(index: int) -> Any:
+        if index not in parsed_json:
+            parsed_json[index] = json.loads(strings[index])
+        return parsed_json[index]
+
+    if schema == SCHEMAS["users"]:
+        users = []
+        for user_id, *fields, params, extra in _USER.iter_unpack(
+                _record_bytes(content, offset, count, _USER)):
+            user = {"user_id": user_id}
+            for key, index in zip(_USER_FIELDS, fields):
+                if index != _NONE:
+                    user[key] = strings[index]
+            if params != _NONE:
+                value = load_json(params)
+                # Разобранный JSON общий для всех записей: словарь копируется
+                user["hash_params"] = dict(value) if isinstance(value, dict) \
+                    else value
+            if extra != _NONE:
+                user.update(load_json(extra))
+            users.append(user)
+        return users
+
+    if schema == SCHEMAS["portfolios"]:
+        wallets_offset = offset + count * _PORTFOLIO.size
+        wallet_records = _WALLET.iter_unpack(
+            _record_bytes(content, wallets_offset, nested, _WALLET))
+        portfolios = []
+        for user_id, version_, journal_seq, flags, wallet_count, extra in \
+                _PORTFOLIO.iter_unpack(
+                    _record_bytes(content, offset, count, _PORTFOLIO)):
+            wallets = {}
+            for _ in range(wallet_count):
+                code_index, balance, wallet_extra = next(wallet_records)
+                code = strings[code_index]
+                wallet = {"currency_code": code, "balance": balance}
+                if wallet_extra != _NONE:
+                    wallet.update(load_json(wallet_extra))
+                wallets[code] = wallet
+            portfolio = {"user_id": user_id, "wallets": wallets}
+            if flags & _HAS_VERSION:
+                portfolio["version"] = version_
+            if flags & _HAS_JOURNAL_SEQ:
+                portfolio["journal_seq"] = journal_seq
+            if extra != _NONE:
+                portfolio.update(load_json(extra))
+            portfolios.append(portfolio)
+        return portfolios
+
+    if schema == SCHEMAS["rates"]:
+        pairs = {}
+        for pair, rate, updated_at, source, extra in _RATE.iter_unpack(
+                _record_bytes(content, offset, count, _RATE)):
+            info = {"rate": rate}
+            if updated_at != _NONE:
+                info["updated_at"] = strings[updated_at]
+            if source != _NONE:
+                info["source"] = strings[source]
+            if extra != _NONE:
+                info.update(load_json(extra))
+            pairs[strings[pair]] = info
+        rates = dict(load_json(meta)) if meta != _NONE else {}
+        if "pairs" in rates:
+            rates["pairs"] = pairs
+        return rates
+
+    raise SnapshotDecodeError(f"Неизвестный тег схемы двоичного снимка: {schema}")
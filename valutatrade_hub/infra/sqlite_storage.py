@@ -0,0 +1,281 @@
+# valutatrade_hub/infra/sqlite_storage.py
+import json
+import os
+import sqlite3
+from typing import TYPE_CHECKING, Dict, List
+
+from ..core.exceptions import ConcurrentModificationError
+from .profiling import timed
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Каждая миграция переводит схему на следующую версию (PRAGMA user_version).
+_MIGRATIONS = [
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        user_id INTEGER PRIMARY KEY,
+        username TEXT NOT NULL UNIQUE,
+        salt TEXT NOT NULL,
+        hashed_password TEXT NOT NULL,
+        registration_date TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS portfolios (
+        user_id INTEGER PRIMARY KEY
+    );
+    CREATE TABLE IF NOT EXISTS wallets (
+        user_id INTEGER NOT NULL,
+        currency_code TEXT NOT NULL,
+        balance REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, currency_code)
+    ) WITHOUT ROWID;
+    """,
+    """
+    ALTER TABLE portfolios ADD COLUMN version INTEGER NOT NULL DEFAULT 0;
+    """,
+    """
+    ALTER TABLE users ADD COLUMN hash_algorithm TEXT NOT NULL DEFAULT 'sha256';
+    ALTER TABLE users ADD COLUMN hash_params TEXT NOT NULL DEFAULT '{}';
+    """,
+]
+
+
+class SqliteStorage:
+    """
+    Хранилище пользователей и портфелей в SQLite.
+    Пользователи индексируются по user_id (PRIMARY KEY) и username (UNIQUE),
+    кошельки — по паре (user_id, currency_code), поэтому чтение и обновление
+    затрагивают только нужные строки.
+    Каждое изменение портфеля увеличивает его версию (portfolios.version);
+    условное обновление версии служит оптимистической блокировкой.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=30,
+                                     check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._migrate()
+
+    def _migrate(self):
+        """Применяет недостающие миграции схемы."""
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        for index, script in enumerate(_MIGRATIONS[version:], start=version + 1):
+            with self._conn:
+                self._conn.executescript(script)
+                self._conn.execute(f"PRAGMA user_version = {index}")
+
+    def close(self):
+        self._conn.close()
+
+    # --- Пользователи ---
+
+    @staticmethod
+    def _user_from_row(row: sqlite3.Row | None) -> Dict | None:
+        if row is None:
+            return None
+        user_data = dict(row)
+        user_data['hash_params'] = json.loads(user_data['hash_params'])
+        return user_data
+
+    @timed("storage read")
+    def get_user(self, user_id: int) -> Dict | None:
+        row = self._conn.execute("SELECT * FROM users WHERE user_id = ?",
+                                 (user_id,)).fetchone()
+        return self._user_from_row(row)
+
+    @timed("storage read")
+    def find_user_by_username(self, username: str) -> Dict | None:
+        row = self._conn.execute("SELECT * FROM users WHERE username = ?",
+                                 (username,)).fetchone()
+        return self._user_from_row(row)
+
+    @timed("storage read")
+    def next_user_id(self) -> int:
+        row = self._conn.execute("SELECT MAX(user_id) FROM users").fetchone()
+        return (row[0] or 0) + 1
+
+    @timed("storage write")
+    def add_user(self, user_data: Dict):
+        try:
+            with self._conn:
+                self._insert_user(user_data)
+        except sqlite3.IntegrityError:
+            if self.find_user_by_username(user_data['username']):
+                raise ValueError(f"Имя пользователя '{user_data['username']}' "
+                                 f"уже занято")
+            # Идентификатор успел занять другой процесс
+            raise ConcurrentModificationError(
+                f"user_id {user_data['user_id']} уже занят")
+
+    @timed("storage write")
+    def update_user(self, user_data: Dict):
+        with self._conn:
+            self._conn.execute(
+                "UPDATE users SET username = ?, salt = ?, hashed_password = ?, "
+                "registration_date = ?, hash_algorithm = ?, hash_params = ? "
+                "WHERE user_id = ?",
+                (user_data['username'], user_data['salt'],
+                 user_data['hashed_password'], user_data['registration_date'],
+                 *self._hash_columns(user_data), user_data['user_id']))
+
+    @timed("storage read")
+    def load_users(self) -> List[Dict]:
+        rows = self._conn.execute("SELECT * FROM users ORDER BY user_id")
+        return [self._user_from_row(row) for row in rows]
+
+    @timed("storage write")
+    def save_users(self, users_data: List[Dict]):
+        with self._conn:
+            self._conn.execute("DELETE FROM users")
+            for user_data in users_data:
+                self._insert_user(user_data)
+
+    @staticmethod
+    def _hash_columns(user_data: Dict) -> tuple:
+        # Записи без алгоритма созданы исходной схемой sha256
+        return (user_data.get('hash_algorithm', 'sha256'),
+                json.dumps(user_data.get('hash_params') or {}))
+
+    def _insert_user(self, user_data: Dict):
+        self._conn.execute(
+            "INSERT INTO users (user_id, username, salt, hashed_password, "
+            "registration_date, hash_algorithm, hash_params) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (user_data['user_id'], user_data['username'], user_data['salt'],
+             user_data['hashed_password'], user_data['registration_date'],
+             *self._hash_columns(user_data)))
+
+    # --- Портфели и кошельки ---
+
+    @timed("storage read")
+    def get_portfolio(self, user_id: int) -> Dict | None:
+        portfolio = self._conn.execute(
+            "SELECT version FROM portfolios WHERE user_id = ?", (user_id,)).fetchone()
+        if not portfolio:
+            return None
+        rows = self._conn.execute(
+            "SELECT currency_code, balance FROM wallets WHERE user_id = ?",
+            (user_id,))
+        return {
+            "user_id": user_id,
+            "version": portfolio['version'],
+            "wallets": {row['currency_code']: {"currency_code": row['currency_code'],
+                                               "balance": row['balance']}
+                        for row in rows}
+        }
+
+    @timed("storage write")
+    def save_portfolio(self, portfolio_data: Dict):
+        with self._conn:
+            self._upsert_portfolio(portfolio_data)
+
+    def _bump_version(self, user_id: int, expected: int = None):
+        """
+        Увеличивает версию портфеля (создавая его при необходимости).
+        :raises ConcurrentModificationError: Если версия отличается от expected.
+        """
+        self._conn.execute("INSERT OR IGNORE INTO portfolios (user_id) VALUES (?)",
+                           (user_id,))
+        if expected is None:
+            self._conn.execute("UPDATE portfolios SET version = version + 1 "
+                               "WHERE user_id = ?", (user_id,))
+            return
+        cursor = self._conn.execute("UPDATE portfolios SET version = version + 1 "
+                                    "WHERE user_id = ? AND version = ?",
+                                    (user_id, expected))
+        if cursor.rowcount == 0:
+            raise ConcurrentModificationError(f"портфель пользователя {user_id}")
+
+    @timed("storage write")
+    def apply_wallet_deltas(self, changes: Dict[int, Dict[str, float]],
+                            expected_versions: Dict[int, int] = None):
+        expected_versions = expected_versions or {}
+        with self._conn:
+            for user_id, deltas in changes.items():
+                self._bump_version(user_id, expected_versions.get(user_id))
+                self._conn.executemany(
+                    "INSERT INTO wallets (user_id, currency_code, balance) "
+                    "VALUES (?, ?, ?) ON CONFLICT (user_id, currency_code) "
+                    "DO UPDATE SET balance = balance + excluded.balance",
+                    [(user_id, code, delta) for code, delta in deltas.items()])
+
+    @timed("storage read")
+    def load_portfolios(self) -> List[Dict]:
+        portfolios = {row['user_id']: {"user_id": row['user_id'],
+                                       "version": row['version'], "wallets": {}}
+                      for row in self._conn.execute(
+                          "SELECT user_id, version FROM portfolios ORDER BY user_id")}
+        for row in self._conn.execute("SELECT * FROM wallets"):
+            portfolio = portfolios.get(row['user_id'])
+            if portfolio is not None:
+                portfolio['wallets'][row['currency_code']] = {
+                    "currency_code": row['currency_code'],
+                    "balance": row['balance']
+                }
+        return list(portfolios.values())
+
+    @timed("storage read")
+    def load_wallet_columns(self) -> Dict[str, 'np.ndarray']:
+        """Все кошельки одним запросом: столбцы NumPy user_id, код, баланс."""
+        import numpy as np
+
+        cursor = self._conn.execute(
+            "SELECT user_id, currency_code, balance FROM wallets")
+        cursor.row_factory = None
+        rows = cursor.fetchall()
+        return {"user_id": np.array([row[0] for row in rows], dtype=np.int64),
+                "currency_code": np.array([row[1] for row in rows], dtype=str),
+                "balance": np.array([row[2] for row in rows], dtype=np.float64)}
+
+    @timed("storage read")
+    def get_usernames(self, user_ids: List[int]) -> Dict[int, str]:
+        placeholders = ", ".join("?" * len(user_ids))
+        cursor = self._conn.execute(
+            f"SELECT user_id, username FROM users WHERE user_id IN ({placeholders})",
+            list(user_ids))
+        cursor.row_factory = None
+        return dict(cursor.fetchall())
+
+    @timed("storage write")
+    def save_portfolios(self, portfolios_data: List[Dict]):
+        with self._conn:
+            self._conn.execute("DELETE FROM wallets")
+            self._conn.execute("DELETE FROM portfolios")
+            for portfolio_data in portfolios_data:
+                self._upsert_portfolio(portfolio_data)
+
+    def _upsert_portfolio(self, portfolio_data: Dict):
+        """Заменяет портфель: кошельки, которых нет в portfolio_data, удаляются."""
+        user_id = portfolio_data['user_id']
+        self._bump_version(user_id)
+        wallets = portfolio_data.get('wallets', {})
+        placeholders = ", ".join("?" * len(wallets))
+        self._conn.execute(
+            f"DELETE FROM wallets WHERE user_id = ? "
+            f"AND currency_code NOT IN ({placeholders})",
+            (user_id, *wallets))
+        self._conn.executemany(
+            "INSERT INTO wallets (user_id, currency_code, balance) "
+            "VALUES (?, ?, ?) ON CONFLICT (user_id, currency_code) "
+            "DO UPDATE SET balance = excluded.balance",
+            [(user_id, code, w_data.get('balance', 0.0))
+             for code, w_data in wallets.items()])
+
+    # --- Миграция ---
+
+    @timed("storage write")
+    def import_data(self, users_data: List[Dict], portfolios_data: List[Dict]):
+        """Полностью заменяет содержимое базы данными из JSON-файлов."""
+        with self._conn:
+            self._conn.execute("DELETE FROM wallets")
+            self._conn.execute("DELETE FROM portfolios")
+            self._conn.execute("DELETE FROM users")
+            for user_data in users_data:
+                self._insert_user(user_data)
+            for portfolio_data in portfolios_data:
+                self._upsert_portfolio(portfolio_data)
@@ -1,13 +1,104 @@
 # valutatrade_hub/logging_config.py
+import atexit
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict
 
 from .infra.settings import settings
 
 
+class ActionEvent:
+    """
+    Событие операции из log_action: типизированные поля
+    (action, user, currency, amount, rate, duration_ms, result, ...).
+    Текстовое представление строится лениво — при записи лога, а в
+    асинхронном режиме в фоновом потоке, а не в потоке операции.
+    """
+    __slots__ = ("fields",)
+
+    def __init__(self, fields: Dict):
+        self.fields = fields
+
+    def __str__(self) -> str:
+        f = self.fields
+        parts = [f"FINISH {f['action']}"]
+        for key, label in (("user", "username"), ("currency", "currency"),
+                           ("amount", "amount")):
+            if f.get(key) is not None:
+                parts.append(f"{label}='{f[key]}'")
+        if f["result"] == "OK":
+            parts.append("result=OK")
+            if "rate" in f:
+                parts.append(f"rate={f['rate']:.2f} "
+                             f"base='{f.get('base_currency', 'N/A')}'")
+        else:
+            parts.append(f"result=ERROR error_type='{f['error_type']}' "
+                         f"error_message='{f['error_message']}'")
+        parts.append(f"duration_ms={f['duration_ms']:.3f}")
+        return " ".join(parts)
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Одна запись — одна строка JSON; поля ActionEvent выводятся как есть."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+        }
+        if isinstance(record.msg, ActionEvent):
+            payload.update(record.msg.fields)
+        else:
+            payload["message"] = record.getMessage()
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class _InProcessQueueHandler(QueueHandler):
+    """
+    QueueHandler без форматирования в вызывающем потоке.
+    Стандартный prepare() форматирует сообщение заранее, чтобы запись
+    можно было передать в другой процесс; очередь здесь внутрипроцессная,
+    поэтому запись ставится в нее как есть, а форматирует ее слушатель.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+_listener: QueueListener | None = None
+
+# Атрибуты записи, которые logging собирает только при включенном флаге
+_THREAD_FIELDS = ("%(thread)", "%(threadName)")
+_PROCESS_FIELDS = ("%(process)",)
+_PROCESS_NAME_FIELDS = ("%(processName)",)
+
+
+def _stop_listener():
+    """Дописывает оставшиеся в очереди записи и останавливает поток записи."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
 def setup_logging():
-    """Настраивает глобальный логгер для приложения."""
+    """
+    Настраивает глобальный логгер для приложения.
+    Формат — текст (log_format) или JSON Lines (log_json). При log_async
+    записи только ставятся в очередь, а в файл их пишет фоновый поток
+    QueueListener; очередь дописывается при завершении процесса.
+    """
+    global _listener
+    logger = logging.getLogger()
+    if logger.handlers:
+        return
+
     log_path = settings.get("log_path", "logs")
     log_file = settings.get("log_file", "actions.log")
     log_format = settings.get("log_format", "%(asctime)s - %(levelname)s - %(message)s")
@@ -16,13 +107,34 @@ def setup_logging():
 
     log_file_path = os.path.join(log_path, log_file)
 
-    logger = logging.getLogger()
     logger.setLevel(logging.INFO)
 
     file_handler = RotatingFileHandler(
         log_file_path, maxBytes=1024 * 1024, backupCount=5, encoding='utf-8'
     )
-    file_handler.setFormatter(logging.Formatter(log_format))
+    log_json = settings.get("log_json", False)
+    if log_json:
+        file_handler.setFormatter(JsonLinesFormatter())
+    else:
+        file_handler.setFormatter(logging.Formatter(log_format))
 
-    if not logger.handlers:
+    # Сведения, которые не выводятся в лог, не собираются при создании
+    # записи (см. раздел Optimization в Logging HOWTO)
+    def unused(fields) -> bool:
+        return log_json or not any(field in log_format for field in fields)
+    if unused(_THREAD_FIELDS):
+        logging.logThreads = False
+    if unused(_PROCESS_FIELDS):
+        logging.logProcesses = False
+    if unused(_PROCESS_NAME_FIELDS):
+        logging.logMultiprocessing = False
+
+    if not settings.get("log_async", False):
         logger.addHandler(file_handler)
+        return
+
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(_InProcessQueueHandler(log_queue))
+    _listener = QueueListener(log_queue, file_handler)
+    _listener.start()
+    atexit.register(_stop_listener)
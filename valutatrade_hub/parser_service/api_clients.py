@@ -3,21 +3,28 @@ import logging
 from abc import ABC, abstractmethod
 from typing import Dict
 
-import requests
 from requests.exceptions import RequestException
 
 from ..core.exceptions import ApiRequestError
 from .config import parser_config
+from .transport import HttpTransport, get_default_transport
 
 
 class BaseApiClient(ABC):
     """Абстрактный базовый класс для API-клиентов."""
 
+    def __init__(self, timeout: float = None, transport: HttpTransport = None):
+        self.timeout = timeout or parser_config.REQUEST_TIMEOUT
+        self.transport = transport or get_default_transport()
+        self._last_rates: Dict[str, float] | None = None
+
     @abstractmethod
-    def fetch_rates(self) -> Dict[str, float]:
+    def fetch_rates(self, deadline: float = None) -> Dict[str, float]:
         """
         Получает курсы валют и возвращает их в стандартизированном формате.
         Формат: {"<FROM>_<TO>": rate}
+        :param deadline: Момент time.monotonic(), к которому запрос (вместе
+            с повторами) должен завершиться.
         """
         pass
 
@@ -25,7 +32,11 @@ class BaseApiClient(ABC):
 class CoinGeckoClient(BaseApiClient):
     """Клиент для API CoinGecko."""
 
-    def fetch_rates(self) -> Dict[str, float]:
+    def __init__(self, url: str = None, **kwargs):
+        super().__init__(**kwargs)
+        self.url = url or parser_config.COINGECKO_URL
+
+    def fetch_rates(self, deadline: float = None) -> Dict[str, float]:
         logging.info("Fetching rates from CoinGecko...")
         ids = ",".join(parser_config.CRYPTO_ID_MAP.values())
         params = {
@@ -34,13 +45,13 @@ class CoinGeckoClient(BaseApiClient):
         }
 
         try:
-            response = requests.get(
-                parser_config.COINGECKO_URL,
-                params=params,
-                timeout=parser_config.REQUEST_TIMEOUT
-            )
-            response.raise_for_status()
-            data = response.json()
+            response = self.transport.get_json(self.url, params=params,
+                                               timeout=self.timeout,
+                                               deadline=deadline)
+            if response.not_modified and self._last_rates is not None:
+                logging.info("CoinGecko: rates not modified since last fetch.")
+                return dict(self._last_rates)
+            data = response.data
 
             standardized_rates = {}
             reverse_map = {v: k for k, v in parser_config.CRYPTO_ID_MAP.items()}
@@ -54,28 +65,41 @@ class CoinGeckoClient(BaseApiClient):
 
             logging.info(f"CoinGecko: "
                          f"Successfully fetched {len(standardized_rates)} rates.")
-            return standardized_rates
+            self._last_rates = standardized_rates
+            return dict(standardized_rates)
 
         except RequestException as e:
             raise ApiRequestError(f"CoinGecko request failed: {e}")
-        except (KeyError, ValueError) as e:
+        except (KeyError, ValueError, AttributeError) as e:
             raise ApiRequestError(f"CoinGecko data parsing failed: {e}")
 
 
 class ExchangeRateApiClient(BaseApiClient):
     """Клиент для API ExchangeRate-API."""
 
-    def fetch_rates(self) -> Dict[str, float]:
+    def __init__(self, url: str = None, api_key: str = None, **kwargs):
+        super().__init__(**kwargs)
+        self.url = url or parser_config.EXCHANGERATE_API_URL
+        self.api_key = api_key or parser_config.EXCHANGERATE_API_KEY
+
+    def fetch_rates(self, deadline: float = None) -> Dict[str, float]:
         logging.info("Fetching rates from ExchangeRate-API...")
-        url = (
-            f"{parser_config.EXCHANGERATE_API_URL}/"
-            f"{parser_config.EXCHANGERATE_API_KEY}/latest/{parser_config.BASE_CURRENCY}"
-        )
+        # Ключ проверяется здесь, а не при импорте конфигурации: без него
+        # недоступен только этот источник, остальные команды работают
+        if not self.api_key:
+            raise ApiRequestError(
+                "API-ключ для ExchangeRate-API не найден. "
+                "Убедитесь, что он задан в переменной окружения "
+                "EXCHANGERATE_API_KEY или в файле .env")
+        url = f"{self.url}/{self.api_key}/latest/{parser_config.BASE_CURRENCY}"
 
         try:
-            response = requests.get(url, timeout=parser_config.REQUEST_TIMEOUT)
-            response.raise_for_status()
-            data = response.json()
+            response = self.transport.get_json(url, timeout=self.timeout,
+                                               deadline=deadline)
+            if response.not_modified and self._last_rates is not None:
+                logging.info("ExchangeRate-API: rates not modified since last fetch.")
+                return dict(self._last_rates)
+            data = response.data
 
             if data.get("result") != "success":
                 error_type = data.get("error-type", "unknown_error")
@@ -94,7 +118,8 @@ class ExchangeRateApiClient(BaseApiClient):
 
             logging.info(f"ExchangeRate-API: "
                          f"Successfully fetched {len(standardized_rates)} rates.")
-            return standardized_rates
+            self._last_rates = standardized_rates
+            return dict(standardized_rates)
 
         except RequestException as e:
             raise ApiRequestError(f"ExchangeRate-API request failed: {e}")
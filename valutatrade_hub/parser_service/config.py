@@ -22,16 +22,18 @@ class ParserConfig:
     CRYPTO_ID_MAP = {"BTC": "bitcoin", "ETH": "ethereum", "SOL": "solana"}
 
     RATES_FILE_PATH: str = "data/rates.json"
+    HISTORY_DIR: str = "data/history"
+    HISTORY_SEGMENT_MAX_BYTES: int = 8 * 1024 * 1024
+    # Прежний формат истории; импортируется в сегменты при первой записи
     HISTORY_FILE_PATH: str = "data/exchange_rates.json"
 
     REQUEST_TIMEOUT: int = 10
+    HTTP_POOL_SIZE: int = 10
+    HTTP_MAX_RETRIES: int = 3
+    HTTP_BACKOFF_BASE: float = 0.5
+    HTTP_BACKOFF_MAX: float = 8.0
+    # Общий срок параллельного опроса всех источников в run_update
+    UPDATE_DEADLINE: float = 15
 
 
 parser_config = ParserConfig()
-
-if not parser_config.EXCHANGERATE_API_KEY:
-    raise ValueError(
-        "API-ключ для ExchangeRate-API не найден. "
-        "Убедитесь, что он задан в переменной окружения "
-        "EXCHANGERATE_API_KEY или в файле .env"
-    )
@@ -0,0 +1,243 @@
+# valutatrade_hub/parser_service/fake_provider.py
+"""
+Локальный поставщик курсов для работы без сети: нагрузочных тестов,
+бенчмарков и CI.
+
+- RandomWalkSource / RecordedSource — источники «кадров» курсов
+  {"<FROM>_USD": курс}: синтетическое случайное блуждание или
+  записанные ранее ответы.
+- ReplayClient — BaseApiClient, выдающий кадры источника напрямую,
+  с заданной задержкой и долей ошибок.
+- FakeRatesServer — HTTP-сервер в текущем процессе, отвечающий в
+  форматах CoinGecko и ExchangeRate-API; настоящие клиенты и
+  HttpTransport проверяются через него целиком.
+"""
+import json
+import logging
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from urllib.parse import parse_qs, urlsplit
+
+from ..core.exceptions import ApiRequestError
+from ..infra.snapshot_codec import decode
+from .api_clients import BaseApiClient
+from .config import parser_config
+
+# Начальные курсы к USD для случайного блуждания
+DEFAULT_START_PRICES = {
+    "BTC": 93847.0, "ETH": 3065.42, "SOL": 136.83,
+    "EUR": 1.1621, "GBP": 1.3165, "RUB": 0.012374,
+}
+
+
+def _pair_key(code: str) -> str:
+    return f"{code}_{parser_config.BASE_CURRENCY}"
+
+
+class RandomWalkSource:
+    """
+    Синтетические курсы: геометрическое случайное блуждание.
+    Каждый вызов next_frame() — один шаг: курс умножается на
+    exp(volatility * N(0, 1)). При одинаковом seed последовательность
+    кадров воспроизводима.
+    """
+
+    def __init__(self, start_prices: Dict[str, float] = None,
+                 volatility: float = 0.002, seed: int = None):
+        self.prices = dict(start_prices or DEFAULT_START_PRICES)
+        self.volatility = volatility
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def next_frame(self) -> Dict[str, float]:
+        with self._lock:
+            for code, price in self.prices.items():
+                self.prices[code] = price * math.exp(
+                    self.volatility * self._random.gauss(0.0, 1.0))
+            return {_pair_key(code): price for code, price in self.prices.items()}
+
+
+class RecordedSource:
+    """
+    Записанные кадры курсов, выдаваемые по кругу.
+    Файл — JSON-объект {"frames": [{"BTC_USD": 93847.0, ...}, ...]}
+    или rates.json в любой кодировке storage_encoding (тогда кадр один —
+    его пары).
+    """
+
+    def __init__(self, frames: List[Dict[str, float]]):
+        if not frames:
+            raise ValueError("Файл записи курсов не содержит ни одного кадра.")
+        self.frames = frames
+        self._position = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: str) -> 'RecordedSource':
+        with open(path, 'rb') as f:
+            data = decode(f.read())
+        if "frames" in data:
+            frames = [{pair: float(rate) for pair, rate in frame.items()}
+                      for frame in data["frames"]]
+        else:
+            frames = [{pair: float(info["rate"])
+                       for pair, info in (data.get("pairs") or {}).items()}]
+        return cls(frames)
+
+    def next_frame(self) -> Dict[str, float]:
+        with self._lock:
+            frame = self.frames[self._position]
+            self._position = (self._position + 1) % len(self.frames)
+            return dict(frame)
+
+
+def _simulate_network(latency: float, error_rate: float, rng: random.Random):
+    """Задержка ответа; с вероятностью error_rate — сбой (True)."""
+    if latency > 0:
+        time.sleep(latency)
+    return error_rate > 0 and rng.random() < error_rate
+
+
+class ReplayClient(BaseApiClient):
+    """
+    Клиент без сети: возвращает очередной кадр источника курсов.
+    :param latency: Имитируемая задержка ответа, секунды.
+    :param error_rate: Доля вызовов, завершающихся ApiRequestError.
+    """
+
+    def __init__(self, source, latency: float = 0.0, error_rate: float = 0.0,
+                 seed: int = None, **kwargs):
+        super().__init__(**kwargs)
+        self.source = source
+        self.latency = latency
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+
+    def fetch_rates(self, deadline: float = None) -> Dict[str, float]:
+        if _simulate_network(self.latency, self.error_rate, self._random):
+            raise ApiRequestError("Replay: имитированный сбой источника")
+        rates = self.source.next_frame()
+        logging.info(f"Replay: Successfully fetched {len(rates)} rates.")
+        return rates
+
+
+class _FakeApiHandler(BaseHTTPRequestHandler):
+    """Отвечает на запросы клиентов CoinGecko и ExchangeRate-API."""
+
+    def do_GET(self):
+        server: FakeRatesServer = self.server
+        if _simulate_network(server.latency, server.error_rate, server.rng):
+            self._send(503, {"error": "simulated outage"})
+            return
+        url = urlsplit(self.path)
+        if url.path == "/api/v3/simple/price":
+            self._send(200, server.coingecko_payload(parse_qs(url.query)))
+        elif url.path.startswith("/v6/") and "/latest/" in url.path:
+            self._send(200, server.exchangerate_payload())
+        else:
+            self._send(404, {"error": "not found"})
+
+    def _send(self, status: int, payload: Dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Журнал запросов http.server (stderr) при нагрузке только мешает
+        pass
+
+
+class FakeRatesServer(ThreadingHTTPServer):
+    """
+    HTTP-заглушка внешних API на 127.0.0.1 (порт выбирается системой).
+    Каждый запрос получает новый кадр источника. Работает в фоновом
+    потоке; используется как контекстный менеджер:
+
+        with FakeRatesServer(RandomWalkSource(seed=1)) as server:
+            CoinGeckoClient(url=server.coingecko_url).fetch_rates()
+    """
+    daemon_threads = True
+
+    def __init__(self, source, latency: float = 0.0, error_rate: float = 0.0,
+                 seed: int = None, port: int = 0):
+        super().__init__(("127.0.0.1", port), _FakeApiHandler)
+        self.source = source
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    @property
+    def coingecko_url(self) -> str:
+        return f"{self.base_url}/api/v3/simple/price"
+
+    @property
+    def exchangerate_url(self) -> str:
+        return f"{self.base_url}/v6"
+
+    def coingecko_payload(self, query: Dict[str, List[str]]) -> Dict:
+        frame = self.source.next_frame()
+        vs_currency = parser_config.BASE_CURRENCY.lower()
+        payload = {}
+        for code, crypto_id in parser_config.CRYPTO_ID_MAP.items():
+            rate = frame.get(_pair_key(code))
+            if rate is not None:
+                payload[crypto_id] = {vs_currency: rate}
+        requested = query.get("ids")
+        if requested:
+            ids = set(requested[0].split(","))
+            payload = {k: v for k, v in payload.items() if k in ids}
+        return payload
+
+    def exchangerate_payload(self) -> Dict:
+        # ExchangeRate-API отдает, сколько единиц валюты дают за 1 USD
+        frame = self.source.next_frame()
+        rates = {parser_config.BASE_CURRENCY: 1.0}
+        for code in parser_config.FIAT_CURRENCIES:
+            rate = frame.get(_pair_key(code))
+            if rate:
+                rates[code] = 1 / rate
+        return {"result": "success", "base_code": parser_config.BASE_CURRENCY,
+                "conversion_rates": rates}
+
+    def start(self) -> 'FakeRatesServer':
+        self._thread = threading.Thread(target=self.serve_forever,
+                                        name="fake-rates-server", daemon=True)
+        self._thread.start()
+        logging.info(f"Fake rates server listening on {self.base_url}")
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.server_close()
+
+    def __enter__(self) -> 'FakeRatesServer':
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def create_source(replay_file: str = None, start_prices: Dict[str, float] = None,
+                  volatility: float = 0.002, seed: int = None):
+    """
+    Записанные кадры, если задан файл, иначе случайное блуждание.
+    :param start_prices: Начальные курсы блуждания {код: курс к USD}.
+    """
+    if replay_file:
+        return RecordedSource.from_file(replay_file)
+    return RandomWalkSource(start_prices, volatility=volatility, seed=seed)
@@ -0,0 +1,151 @@
+# valutatrade_hub/parser_service/history.py
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List
+
+_SEGMENT_RE = re.compile(r"^rates-(\d{4}-\d{2}-\d{2})-(\d{3})\.jsonl$")
+
+
+@dataclass
+class SegmentInfo:
+    """Сайдкар-индекс сегмента: диапазон времени, пары и размер."""
+    path: str
+    day: str
+    number: int
+    start: str | None = None
+    end: str | None = None
+    count: int = 0
+    size: int = 0
+    pairs: List[str] = field(default_factory=list)
+
+    @property
+    def index_path(self) -> str:
+        return self.path[:-len(".jsonl")] + ".idx.json"
+
+    def to_dict(self) -> Dict:
+        return {"start": self.start, "end": self.end, "count": self.count,
+                "size": self.size, "pairs": self.pairs}
+
+
+class SegmentedHistory:
+    """
+    История курсов в виде append-only сегментов JSON Lines.
+
+    Сегменты называются rates-<YYYY-MM-DD>-<NNN>.jsonl и ротируются при смене
+    суток (по метке времени записи) или при превышении max_segment_bytes.
+    Рядом с каждым сегментом лежит маленький индекс .idx.json с диапазоном
+    времени, количеством записей и списком пар. Добавление записей стоит
+    O(новых записей): закрытые сегменты больше никогда не переписываются.
+    """
+
+    def __init__(self, directory: str, max_segment_bytes: int = 8 * 1024 * 1024):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _segment_path(self, day: str, number: int) -> str:
+        return os.path.join(self.directory, f"rates-{day}-{number:03d}.jsonl")
+
+    def segment_files(self) -> List[str]:
+        """Пути сегментов в хронологическом порядке."""
+        return sorted(os.path.join(self.directory, name)
+                      for name in os.listdir(self.directory)
+                      if _SEGMENT_RE.match(name))
+
+    def _load_info(self, path: str) -> SegmentInfo:
+        day, number = _SEGMENT_RE.match(os.path.basename(path)).groups()
+        info = SegmentInfo(path=path, day=day, number=int(number))
+        try:
+            with open(info.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return self._rebuild_info(info)
+        info.start, info.end = data.get("start"), data.get("end")
+        info.count, info.size = data.get("count", 0), data.get("size", 0)
+        info.pairs = data.get("pairs", [])
+        if info.size != os.path.getsize(path):
+            # Индекс отстал от сегмента (сбой между записями) — пересобираем
+            return self._rebuild_info(info)
+        return info
+
+    def _rebuild_info(self, info: SegmentInfo) -> SegmentInfo:
+        info.start = info.end = None
+        info.count, info.pairs = 0, []
+        pairs = set()
+        for record in self._read_segment(info.path):
+            self._account(info, pairs, record)
+        info.pairs = sorted(pairs)
+        info.size = os.path.getsize(info.path)
+        self._save_info(info)
+        return info
+
+    @staticmethod
+    def _account(info: SegmentInfo, pairs: set, record: Dict):
+        ts = record["timestamp"]
+        info.start = ts if info.start is None else min(info.start, ts)
+        info.end = ts if info.end is None else max(info.end, ts)
+        info.count += 1
+        pairs.add(f"{record['from_currency']}_{record['to_currency']}")
+
+    @staticmethod
+    def _save_info(info: SegmentInfo):
+        temp_path = f"{info.index_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(info.to_dict(), f)
+        os.replace(temp_path, info.index_path)
+
+    def segments(self) -> List[SegmentInfo]:
+        """Индексы всех сегментов в хронологическом порядке."""
+        return [self._load_info(path) for path in self.segment_files()]
+
+    def _active_segment(self, day: str) -> SegmentInfo | None:
+        """Последний сегмент указанных суток, если он есть."""
+        prefix = f"rates-{day}-"
+        names = sorted(name for name in os.listdir(self.directory)
+                       if name.startswith(prefix) and _SEGMENT_RE.match(name))
+        if not names:
+            return None
+        return self._load_info(os.path.join(self.directory, names[-1]))
+
+    def append(self, records: List[Dict]):
+        """Дописывает записи в активные сегменты соответствующих суток."""
+        by_day: Dict[str, List[Dict]] = {}
+        for record in records:
+            by_day.setdefault(record["timestamp"][:10], []).append(record)
+
+        for day, day_records in sorted(by_day.items()):
+            payload = "".join(json.dumps(r, ensure_ascii=False) + "\n"
+                              for r in day_records).encode("utf-8")
+            info = self._active_segment(day)
+            if info is None or (info.size and
+                                info.size + len(payload) > self.max_segment_bytes):
+                number = 0 if info is None else info.number + 1
+                info = SegmentInfo(path=self._segment_path(day, number),
+                                   day=day, number=number)
+
+            with open(info.path, 'ab') as f:
+                f.write(payload)
+
+            pairs = set(info.pairs)
+            for record in day_records:
+                self._account(info, pairs, record)
+            info.pairs = sorted(pairs)
+            info.size += len(payload)
+            self._save_info(info)
+
+    @staticmethod
+    def _read_segment(path: str) -> Iterator[Dict]:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # Недописанная строка после аварийного завершения
+                    continue
+
+    def iter_records(self, segments: List[SegmentInfo] = None) -> Iterator[Dict]:
+        """Итерирует записи указанных (по умолчанию всех) сегментов."""
+        for info in segments if segments is not None else self.segments():
+            yield from self._read_segment(info.path)
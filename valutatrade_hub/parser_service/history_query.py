@@ -0,0 +1,217 @@
+# valutatrade_hub/parser_service/history_query.py
+import json
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .config import parser_config
+from .history import SegmentedHistory, SegmentInfo
+
+_INTERVAL_RE = re.compile(r"^(\d+)([smhd])$")
+_INTERVAL_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+_US = 1_000_000
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def parse_interval(value: str) -> int:
+    """Переводит интервал вида 30s, 15m, 1h, 1d в секунды."""
+    match = _INTERVAL_RE.match(value.strip().lower())
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"Некорректный интервал '{value}'. "
+                         f"Используйте формат 30s, 15m, 1h или 1d.")
+    return int(match.group(1)) * _INTERVAL_UNITS[match.group(2)]
+
+
+def _to_us(dt: datetime) -> int:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return (dt - _EPOCH) // timedelta(microseconds=1)
+
+
+def _iso_to_us(value: str) -> int:
+    return _to_us(datetime.fromisoformat(value))
+
+
+def _from_us(value: int) -> datetime:
+    return datetime.fromtimestamp(value / _US, tz=timezone.utc)
+
+
+def _parse_timestamps(values: List[str]) -> np.ndarray:
+    """Векторно разбирает ISO-метки UTC в микросекунды от эпохи."""
+    if all(v.endswith("+00:00") for v in values):
+        stripped = np.array([v[:-6] for v in values])
+        return stripped.astype("datetime64[us]").astype(np.int64)
+    return np.array([_iso_to_us(v) for v in values],
+                    dtype=np.int64)
+
+
+@dataclass
+class Bar:
+    """Агрегат курсов за один интервал."""
+    start: datetime
+    open: float
+    high: float
+    low: float
+    close: float
+    mean: float
+    count: int
+
+
+class PairSeries:
+    """Отсортированный по времени ряд курсов одной пары."""
+
+    def __init__(self, timestamps: np.ndarray, rates: np.ndarray):
+        order = np.argsort(timestamps, kind="stable")
+        self.timestamps = timestamps[order]
+        self.rates = rates[order]
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def slice(self, start_us: int = None, end_us: int = None) -> 'PairSeries':
+        """Записи в полуинтервале [start, end) через бинарный поиск."""
+        lo = 0 if start_us is None else np.searchsorted(self.timestamps, start_us,
+                                                        side="left")
+        hi = len(self) if end_us is None else np.searchsorted(self.timestamps,
+                                                              end_us, side="left")
+        series = PairSeries.__new__(PairSeries)
+        series.timestamps = self.timestamps[lo:hi]
+        series.rates = self.rates[lo:hi]
+        return series
+
+
+class RateHistoryQuery:
+    """
+    Чтение истории курсов: диапазоны, курс на момент времени и OHLC-бары.
+
+    Для каждой пары строится отсортированный индекс меток времени (NumPy),
+    поиск по нему — бинарный, агрегация — векторная. Сегменты отбираются
+    по сайдкар-индексам, так что читаются только файлы, содержащие пару
+    и пересекающиеся с запрошенным диапазоном.
+    """
+
+    def __init__(self, history: SegmentedHistory):
+        self.history = history
+        self._cache: Dict[Tuple[str, str], Tuple[PairSeries, int]] = {}
+
+    def _segments_for(self, pair: str, start_us: int | None,
+                      end_us: int | None) -> List[SegmentInfo]:
+        selected = []
+        for info in self.history.segments():
+            if pair not in info.pairs or info.start is None:
+                continue
+            if end_us is not None and _iso_to_us(info.start) >= end_us:
+                continue
+            if start_us is not None and _iso_to_us(info.end) < start_us:
+                continue
+            selected.append(info)
+        return selected
+
+    def _load_segment(self, info: SegmentInfo, pair: str) -> PairSeries:
+        """Ряд пары из одного сегмента; закрытые сегменты кэшируются."""
+        key = (info.path, pair)
+        cached = self._cache.get(key)
+        if cached is not None and cached[1] == info.size:
+            return cached[0]
+
+        from_code, _, to_code = pair.partition("_")
+        # Сегмент только с этой парой разбирается без отсева строк
+        single_pair = info.pairs == [pair]
+        timestamps, rates = [], []
+        with open(info.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                # Дешевый отсев строк, где нет кодов валют пары, до разбора
+                # JSON; окончательно пара проверяется по полям записи
+                if not single_pair and (from_code not in line
+                                        or to_code not in line):
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get("from_currency") != from_code \
+                        or record.get("to_currency") != to_code:
+                    continue
+                timestamps.append(record["timestamp"])
+                rates.append(record["rate"])
+
+        series = PairSeries(
+            _parse_timestamps(timestamps) if timestamps
+            else np.empty(0, dtype=np.int64),
+            np.array(rates, dtype=np.float64))
+        self._cache[key] = (series, info.size)
+        return series
+
+    def series(self, pair: str, start: datetime = None,
+               end: datetime = None) -> PairSeries:
+        """Курсы пары в полуинтервале [start, end)."""
+        pair = pair.upper()
+        start_us = _to_us(start) if start else None
+        end_us = _to_us(end) if end else None
+        parts = [self._load_segment(info, pair)
+                 for info in self._segments_for(pair, start_us, end_us)]
+        if not parts:
+            return PairSeries(np.empty(0, dtype=np.int64), np.empty(0))
+        series = PairSeries(np.concatenate([p.timestamps for p in parts]),
+                            np.concatenate([p.rates for p in parts]))
+        return series.slice(start_us, end_us)
+
+    def range(self, pair: str, start: datetime = None,
+              end: datetime = None) -> List[Tuple[datetime, float]]:
+        """Список (время, курс) пары за период."""
+        series = self.series(pair, start, end)
+        return [(_from_us(int(ts)), float(rate))
+                for ts, rate in zip(series.timestamps, series.rates)]
+
+    def latest_at(self, pair: str, at: datetime) -> Tuple[datetime, float] | None:
+        """Последний известный курс пары не позже момента at."""
+        pair = pair.upper()
+        at_us = _to_us(at)
+        best = None
+        # Идем от новых сегментов к старым и останавливаемся, как только
+        # сегмент целиком старше уже найденного кандидата.
+        for info in reversed(self._segments_for(pair, None, at_us + 1)):
+            if best is not None and _iso_to_us(info.end) < best[0]:
+                break
+            segment = self._load_segment(info, pair)
+            position = np.searchsorted(segment.timestamps, at_us, side="right") - 1
+            if position >= 0 and (best is None
+                                  or segment.timestamps[position] > best[0]):
+                best = (int(segment.timestamps[position]),
+                        float(segment.rates[position]))
+        if best is None:
+            return None
+        return _from_us(best[0]), best[1]
+
+    def bars(self, pair: str, interval_seconds: int, start: datetime = None,
+             end: datetime = None) -> List[Bar]:
+        """OHLC и среднее по интервалам, выровненным по эпохе."""
+        series = self.series(pair, start, end)
+        if not len(series):
+            return []
+        interval_us = interval_seconds * _US
+        buckets = series.timestamps // interval_us
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(series)]
+
+        rates = series.rates
+        opens = rates[starts]
+        closes = rates[ends - 1]
+        highs = np.maximum.reduceat(rates, starts)
+        lows = np.minimum.reduceat(rates, starts)
+        counts = ends - starts
+        means = np.add.reduceat(rates, starts) / counts
+
+        return [Bar(start=_from_us(int(buckets[s]) * interval_us),
+                    open=float(o), high=float(h), low=float(lo), close=float(c),
+                    mean=float(m), count=int(n))
+                for s, o, h, lo, c, m, n in zip(starts, opens, highs, lows,
+                                                closes, means, counts)]
+
+
+def get_default_history_query() -> RateHistoryQuery:
+    """Фабричная функция для чтения истории из каталога по умолчанию."""
+    return RateHistoryQuery(SegmentedHistory(parser_config.HISTORY_DIR))
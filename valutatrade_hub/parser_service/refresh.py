@@ -0,0 +1,31 @@
+# valutatrade_hub/parser_service/refresh.py
+"""
+Однократное фоновое обновление курсов.
+Запускается из request_background_refresh, когда чтение попадает
+на устаревший кэш: python -m valutatrade_hub.parser_service.refresh
+"""
+import logging
+
+from valutatrade_hub.infra.locking import PidFile
+from valutatrade_hub.infra.rates_refresh import refresh_pid_path
+from valutatrade_hub.logging_config import setup_logging
+
+from .updater import get_default_updater
+
+
+def main():
+    setup_logging()
+    pid_file = PidFile(refresh_pid_path())
+    if not pid_file.acquire():
+        logging.info("Background rates refresh already running, skipping")
+        return
+    try:
+        get_default_updater().run_update()
+    except Exception as e:
+        logging.exception(f"Background rates refresh failed: {e}")
+    finally:
+        pid_file.release()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# valutatrade_hub/parser_service/scheduler.py
+import logging
+import random
+import signal
+import threading
+import time
+from typing import Dict, List
+
+from valutatrade_hub.infra.settings import settings
+
+from .api_clients import BaseApiClient
+from .updater import RatesUpdater
+
+
+class SourceSchedule:
+    """Расписание опроса одного источника курсов."""
+
+    def __init__(self, client: BaseApiClient, interval: float, jitter: float):
+        self.client = client
+        self.interval = interval
+        self.jitter = jitter
+        self.next_run = 0.0  # monotonic; 0 — опросить сразу при старте
+        self.failures = 0
+
+    def schedule_next(self, now: float, succeeded: bool, retry_base: float):
+        """
+        Назначает следующий опрос.
+        После успеха — через interval со случайным сдвигом ±jitter, чтобы
+        несколько демонов (или источников) не опрашивали API синхронно.
+        После ошибки — экспоненциально растущая пауза от retry_base,
+        но не дольше обычного интервала.
+        """
+        if succeeded:
+            self.failures = 0
+            delay = self.interval
+        else:
+            self.failures += 1
+            delay = min(self.interval, retry_base * 2 ** (self.failures - 1))
+        spread = delay * self.jitter
+        self.next_run = now + max(1.0, delay + random.uniform(-spread, spread))
+
+
+class RatesScheduler:
+    """
+    Периодически обновляет курсы через RatesUpdater.
+
+    У каждого источника свой интервал (rates_refresh_intervals) и разброс
+    (rates_refresh_jitter). Интервал не превышает
+    rates_ttl_seconds - rates_refresh_lead_seconds, так что кэш
+    обновляется до того, как курсы устареют и сделки начнут отклоняться.
+    Источники, срок которых наступил одновременно, опрашиваются одним
+    вызовом run_update (параллельно).
+    """
+
+    def __init__(self, updater: RatesUpdater):
+        self.updater = updater
+        self._stop = threading.Event()
+        ttl = settings.get("rates_ttl_seconds", 300)
+        lead = settings.get("rates_refresh_lead_seconds", 60)
+        intervals = settings.get("rates_refresh_intervals", {})
+        jitter = settings.get("rates_refresh_jitter", 0.1)
+        self.retry_base = settings.get("rates_refresh_retry_seconds", 15)
+        # Верхняя граница учитывает и разброс: опрос не должен опоздать к TTL
+        max_interval = max(1.0, (ttl - lead) / (1 + jitter))
+        self.schedules: List[SourceSchedule] = []
+        for client in updater.clients:
+            interval = self._configured_interval(client, intervals, max_interval)
+            if interval > max_interval:
+                logging.warning(f"Refresh interval {interval}s for "
+                                f"{client.__class__.__name__} exceeds rates TTL; "
+                                f"using {max_interval:.0f}s")
+                interval = max_interval
+            self.schedules.append(SourceSchedule(client, interval, jitter))
+
+    @staticmethod
+    def _configured_interval(client: BaseApiClient, intervals: Dict[str, float],
+                             default: float) -> float:
+        name = client.__class__.__name__.lower()
+        for prefix, interval in intervals.items():
+            if name.startswith(prefix.lower()):
+                return float(interval)
+        return default
+
+    def stop(self):
+        """Просит цикл завершиться после текущего обновления."""
+        self._stop.set()
+
+    def run_due(self) -> Dict[str, dict]:
+        """Опрашивает источники, срок которых наступил; возвращает отчет."""
+        now = time.monotonic()
+        due = [s for s in self.schedules if s.next_run <= now]
+        if not due:
+            return {}
+        try:
+            report = self.updater.run_update(clients=[s.client for s in due])
+        except Exception as e:
+            # Сбой сохранения не должен останавливать демон; источники
+            # уйдут на повтор, как при ошибке запроса
+            logging.exception(f"Scheduled rates update failed: {e}")
+            report = {}
+        finished = time.monotonic()
+        for schedule in due:
+            result = report.get(self.updater.source_name(schedule.client), {})
+            schedule.schedule_next(finished, result.get("status") == "ok",
+                                   self.retry_base)
+        return report
+
+    def run_forever(self):
+        """Цикл обновления до вызова stop()."""
+        logging.info("Rates scheduler started: " + ", ".join(
+            f"{s.client.__class__.__name__} every {s.interval:.0f}s"
+            for s in self.schedules))
+        while not self._stop.is_set():
+            self.run_due()
+            wait = min(s.next_run for s in self.schedules) - time.monotonic()
+            self._stop.wait(max(wait, 0.1))
+        logging.info("Rates scheduler stopped")
+
+
+def run_daemon(scheduler: RatesScheduler):
+    """Запускает цикл планировщика, останавливая его по SIGINT/SIGTERM."""
+
+    def stop(signum, frame):
+        scheduler.stop()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    scheduler.run_forever()
@@ -6,22 +6,47 @@ import tempfile
 from datetime import datetime, timezone
 from typing import Dict, List
 
+from ..infra.locking import FileLock
+from ..infra.rates_snapshot import parse_timestamp
+from ..infra.snapshot_codec import SnapshotDecodeError, decode, encode
+from .history import SegmentedHistory
+
+
+def _source_refresh_times(pairs: Dict[str, dict]) -> Dict[str, str]:
+    """Время обновления каждого источника — самая свежая из его пар."""
+    refreshed: Dict[str, str] = {}
+    for info in pairs.values():
+        updated_at = parse_timestamp(info.get("updated_at"))
+        if updated_at is None:
+            continue
+        source = info.get("source") or "unknown"
+        current = refreshed.get(source)
+        if current is None or updated_at > parse_timestamp(current):
+            refreshed[source] = info["updated_at"]
+    return refreshed
+
 
 class RatesStorage:
     """Управляет сохранением курсов в файлы кэша и истории."""
 
-    def __init__(self, cache_path: str, history_path: str):
+    def __init__(self, cache_path: str, history_dir: str,
+                 legacy_history_path: str = None,
+                 max_segment_bytes: int = 8 * 1024 * 1024,
+                 encoding: str = "json"):
+        """:param encoding: Кодировка rates.json (см. storage_encoding)."""
         self.cache_path = cache_path
-        self.history_path = history_path
+        self.encoding = encoding
+        self.legacy_history_path = legacy_history_path
+        self._cache_lock = FileLock(f"{cache_path}.lock")
         os.makedirs(os.path.dirname(cache_path), exist_ok=True)
-        os.makedirs(os.path.dirname(history_path), exist_ok=True)
+        self.history = SegmentedHistory(history_dir, max_segment_bytes)
 
     def _atomic_write(self, file_path: str, data: dict):
         """Атомарная запись в файл через временный файл."""
         temp_fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(file_path))
         try:
-            with os.fdopen(temp_fd, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            with os.fdopen(temp_fd, 'wb') as f:
+                f.write(encode(data, "rates", self.encoding))
             os.replace(temp_path, file_path)
             logging.info(f"Successfully saved data to {file_path}")
         except Exception as e:
@@ -29,24 +54,52 @@ class RatesStorage:
             logging.error(f"Failed to write to {file_path}: {e}")
             raise
 
+    def load_rates_cache(self) -> Dict:
+        try:
+            with open(self.cache_path, 'rb') as f:
+                return decode(f.read())
+        except (FileNotFoundError, json.JSONDecodeError, SnapshotDecodeError):
+            return {}
+
     def save_rates_cache(self, rates_data: Dict[str, dict]):
-        """Сохраняет актуальные курсы в rates.json."""
-        cache_content = {
-            "pairs": rates_data,
-            "last_refresh": datetime.now(timezone.utc).isoformat()
-        }
-        self._atomic_write(self.cache_path, cache_content)
+        """
+        Обновляет курсы в rates.json.
+        Новые пары сливаются с уже сохраненными, а не заменяют их: источники
+        обновляются независимо, и курсы одного не должны стирать курсы другого.
+        Поэтому свежесть учитывается по источникам: sources хранит время
+        последнего обновления каждого из них, а last_refresh — время самого
+        давно обновлявшегося, чтобы курсы отказавшего источника устаревали.
+        Чтение и запись выполняются под блокировкой файла.
+        """
+        with self._cache_lock.hold():
+            pairs = self.load_rates_cache().get("pairs") or {}
+            pairs.update(rates_data)
+            sources = _source_refresh_times(pairs)
+            cache_content = {
+                "pairs": pairs,
+                "sources": sources,
+                "last_refresh": (min(sources.values(), key=parse_timestamp)
+                                 if sources
+                                 else datetime.now(timezone.utc).isoformat())
+            }
+            self._atomic_write(self.cache_path, cache_content)
 
-    def append_to_history(self, new_records: List[dict]):
-        """Добавляет новые записи в history.json."""
+    def _import_legacy_history(self):
+        """Переносит старый exchange_rates.json в сегменты (однократно)."""
+        path = self.legacy_history_path
+        if not path or not os.path.exists(path):
+            return
         try:
-            if os.path.exists(self.history_path):
-                with open(self.history_path, 'r', encoding='utf-8') as f:
-                    history = json.load(f)
-            else:
-                history = []
-        except (json.JSONDecodeError, FileNotFoundError):
-            history = []
-
-        history.extend(new_records)
-        self._atomic_write(self.history_path, history)
+            with open(path, 'r', encoding='utf-8') as f:
+                legacy_records = json.load(f)
+        except json.JSONDecodeError:
+            legacy_records = []
+        if legacy_records:
+            self.history.append(legacy_records)
+        os.replace(path, f"{path}.imported")
+        logging.info(f"Imported {len(legacy_records)} history records from {path}")
+
+    def append_to_history(self, new_records: List[dict]):
+        """Дописывает новые записи в активный сегмент истории."""
+        self._import_legacy_history()
+        self.history.append(new_records)
@@ -0,0 +1,140 @@
+# valutatrade_hub/parser_service/transport.py
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from requests.exceptions import Timeout
+
+from .config import parser_config
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+@dataclass
+class JsonResponse:
+    """Результат GET-запроса: разобранное тело и признак «не изменилось»."""
+    data: Any
+    not_modified: bool = False
+
+
+class HttpTransport:
+    """
+    Общий HTTP-транспорт для API-клиентов.
+
+    - Пул keep-alive соединений (одна requests.Session на процесс).
+    - Повторы при обрывах соединения, таймаутах и ответах 429/5xx
+      с ограниченной экспоненциальной задержкой и случайным джиттером.
+    - Условные запросы: ETag/Last-Modified последнего ответа отправляются
+      в If-None-Match/If-Modified-Since, а на 304 возвращается уже
+      разобранное тело без повторного парсинга.
+    """
+
+    def __init__(self, pool_size: int = None, max_retries: int = None,
+                 backoff_base: float = None, backoff_max: float = None):
+        self.max_retries = parser_config.HTTP_MAX_RETRIES \
+            if max_retries is None else max_retries
+        self.backoff_base = backoff_base or parser_config.HTTP_BACKOFF_BASE
+        self.backoff_max = backoff_max or parser_config.HTTP_BACKOFF_MAX
+        pool_size = pool_size or parser_config.HTTP_POOL_SIZE
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                              max_retries=0)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+        # Ключ запроса → (ETag, Last-Modified, разобранное тело)
+        self._validators: Dict[Tuple, Tuple[str, str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def close(self):
+        self._session.close()
+
+    def _backoff(self, attempt: int, retry_after: str = None) -> float:
+        """Задержка перед повтором: full jitter, ограниченный backoff_max."""
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.backoff_max)
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def get_json(self, url: str, params: Dict = None, timeout: float = None,
+                 deadline: float = None) -> JsonResponse:
+        """
+        Выполняет GET-запрос и возвращает разобранный JSON.
+        :param deadline: Момент time.monotonic(), после которого новые попытки
+            не начинаются; таймаут каждой попытки не выходит за этот срок.
+        :raises requests.exceptions.RequestException: Если запрос не удался
+            после всех повторов или к сроку deadline.
+        """
+        key = (url, tuple(sorted((params or {}).items())))
+        with self._lock:
+            cached = self._validators.get(key)
+
+        headers = {}
+        if cached:
+            etag, last_modified, _ = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        attempt = 0
+        while True:
+            attempt_timeout = timeout
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise Timeout(f"GET {urlsplit(url).netloc}: deadline exceeded")
+                attempt_timeout = min(timeout or remaining, remaining)
+            try:
+                response = self._session.get(url, params=params, headers=headers,
+                                             timeout=attempt_timeout)
+            except (RequestsConnectionError, Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                logging.warning(f"GET {urlsplit(url).netloc} failed "
+                                f"({type(e).__name__}), retry in {delay:.2f}s")
+            else:
+                if response.status_code == 304 and cached:
+                    return JsonResponse(data=cached[2], not_modified=True)
+                if response.status_code not in RETRY_STATUSES \
+                        or attempt >= self.max_retries:
+                    break
+                delay = self._backoff(attempt, response.headers.get("Retry-After"))
+                logging.warning(f"GET {urlsplit(url).netloc} returned "
+                                f"{response.status_code}, retry in {delay:.2f}s")
+            attempt += 1
+            if deadline is not None:
+                # Пауза до повтора не должна выходить за срок
+                delay = min(delay, max(0.0, deadline - time.monotonic()))
+            time.sleep(delay)
+
+        response.raise_for_status()
+        data = response.json()
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            with self._lock:
+                self._validators[key] = (etag, last_modified, data)
+        return JsonResponse(data=data)
+
+
+_default_transport: HttpTransport | None = None
+_default_lock = threading.Lock()
+
+
+def get_default_transport() -> HttpTransport:
+    """Общий для всех клиентов процесса экземпляр транспорта."""
+    global _default_transport
+    with _default_lock:
+        if _default_transport is None:
+            _default_transport = HttpTransport()
+        return _default_transport
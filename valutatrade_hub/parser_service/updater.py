@@ -1,45 +1,95 @@
 # valutatrade_hub/parser_service/updater.py
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 from datetime import datetime, timezone
-from typing import List
+from typing import Dict, List, Tuple
+
+from valutatrade_hub.infra.metrics import metrics
+from valutatrade_hub.infra.settings import settings
 
-from ..core.exceptions import ApiRequestError
 from .api_clients import BaseApiClient, CoinGeckoClient, ExchangeRateApiClient
 from .config import parser_config
 from .storage import RatesStorage
 
+FETCH_SECONDS = metrics.histogram(
+    "valutatrade_rates_fetch_seconds",
+    "Длительность fetch_rates одного источника курсов")
+
 
 class RatesUpdater:
     """Координирует процесс обновления курсов от всех клиентов."""
 
-    def __init__(self, clients: List[BaseApiClient], storage: RatesStorage):
+    def __init__(self, clients: List[BaseApiClient], storage: RatesStorage,
+                 deadline: float = None):
         self.clients = clients
         self.storage = storage
+        self.deadline = deadline or parser_config.UPDATE_DEADLINE
+
+    @staticmethod
+    def source_name(client: BaseApiClient) -> str:
+        return client.__class__.__name__.replace("Client", "")
 
-    def run_update(self, source_filter: str = None):
+    def select_clients(self, source_filter: str) -> List[BaseApiClient]:
+        """Клиенты, имя класса которых начинается с source_filter."""
+        source_filter = source_filter.lower()
+        return [c for c in self.clients
+                if c.__class__.__name__.lower().startswith(source_filter)]
+
+    @classmethod
+    def _fetch(cls, client: BaseApiClient,
+               deadline: float) -> Tuple[Dict[str, float], float]:
+        started = time.monotonic()
+        result = "error"
+        try:
+            rates = client.fetch_rates(deadline=deadline)
+            result = "ok"
+        finally:
+            FETCH_SECONDS.observe(time.monotonic() - started,
+                                  source=cls.source_name(client), result=result)
+        return rates, time.monotonic() - started
+
+    def run_update(self, source_filter: str = None,
+                   clients: List[BaseApiClient] = None) -> Dict[str, dict]:
         """
         Запускает процесс обновления курсов.
+        Клиенты опрашиваются параллельно; результаты объединяются по мере
+        поступления, а источники, не уложившиеся в общий срок deadline,
+        считаются неудачными.
         :param source_filter: Если указан, обновляет только от этого источника.
+        :param clients: Явный список опрашиваемых клиентов (вместо фильтра).
+        :return: Отчет по источникам: {имя: {"status", "rates", "duration"|"error"}}.
         """
         logging.info("Starting rates update...")
         all_fetched_rates = {}
         history_records = []
+        report = {}
 
-        clients_to_run = self.clients
+        clients_to_run = clients if clients is not None else self.clients
         if source_filter:
-            source_filter = source_filter.lower()
-            clients_to_run = [
-                c for c in self.clients
-                if c.__class__.__name__.lower().startswith(source_filter)
-            ]
+            clients_to_run = self.select_clients(source_filter)
             if not clients_to_run:
                 logging.warning(f"No clients found for source filter: {source_filter}")
-                return
+                return report
+
+        executor = ThreadPoolExecutor(max_workers=len(clients_to_run),
+                                      thread_name_prefix="rates-fetch")
+        deadline = time.monotonic() + self.deadline
+        futures = {executor.submit(self._fetch, client, deadline):
+                   self.source_name(client) for client in clients_to_run}
+        try:
+            for future in as_completed(futures, timeout=self.deadline):
+                source_name = futures[future]
+                try:
+                    rates, duration = future.result()
+                except Exception as e:
+                    # Ошибка одного источника не должна прерывать остальные
+                    logging.error(f"Failed to fetch from {source_name}: {e}")
+                    report[source_name] = {"status": "error", "rates": 0,
+                                           "error": str(e)}
+                    continue
 
-        for client in clients_to_run:
-            source_name = client.__class__.__name__.replace("Client", "")
-            try:
-                rates = client.fetch_rates()
                 # Формируем данные для кэша и истории
                 now_ts = datetime.now(timezone.utc).isoformat()
                 for pair_key, rate in rates.items():
@@ -59,9 +109,22 @@ class RatesUpdater:
                         "timestamp": now_ts,
                         "source": source_name
                     })
-
-            except ApiRequestError as e:
-                logging.error(f"Failed to fetch from {source_name}: {e}")
+                report[source_name] = {"status": "ok", "rates": len(rates),
+                                       "duration": duration}
+        except FuturesTimeoutError:
+            for future, source_name in futures.items():
+                if not future.done():
+                    logging.error(f"Failed to fetch from {source_name}: "
+                                  f"deadline of {self.deadline}s exceeded")
+                    report[source_name] = {"status": "timeout", "rates": 0,
+                                           "error": f"превышен общий срок "
+                                                    f"{self.deadline} с"}
+        finally:
+            # Не ждем опоздавшие запросы: их результаты уже не нужны. Потоки
+            # пула все равно присоединяются при выходе из интерпретатора, но
+            # HTTP-запросы ограничены сроком deadline, поэтому выход не
+            # задерживается дольше него
+            executor.shutdown(wait=False, cancel_futures=True)
 
         if all_fetched_rates:
             self.storage.save_rates_cache(all_fetched_rates)
@@ -70,13 +133,57 @@ class RatesUpdater:
                          f"Total rates processed: {len(all_fetched_rates)}.")
         else:
             logging.warning("Update finished, but no new rates were fetched.")
+        return report
+
+
+def _offline_clients(provider: str, storage: RatesStorage) -> List[BaseApiClient]:
+    """
+    Клиенты локального поставщика курсов (см. fake_provider).
+    Случайное блуждание продолжается от курсов текущего кэша.
+    """
+    from .fake_provider import FakeRatesServer, ReplayClient, create_source
+
+    cached = storage.load_rates_cache().get("pairs") or {}
+    suffix = f"_{parser_config.BASE_CURRENCY}"
+    source = create_source(
+        replay_file=settings.get("rates_replay_file"),
+        start_prices={pair[:-len(suffix)]: info["rate"]
+                      for pair, info in cached.items()
+                      if pair.endswith(suffix)} or None,
+        volatility=settings.get("rates_replay_volatility", 0.002),
+        seed=settings.get("rates_replay_seed"))
+    latency = settings.get("rates_replay_latency", 0.0)
+    error_rate = settings.get("rates_replay_error_rate", 0.0)
+
+    if provider == "replay":
+        return [ReplayClient(source, latency=latency, error_rate=error_rate)]
+    # Заглушка живет в фоновом потоке до конца процесса
+    server = FakeRatesServer(source, latency=latency, error_rate=error_rate).start()
+    return [CoinGeckoClient(url=server.coingecko_url),
+            ExchangeRateApiClient(url=server.exchangerate_url, api_key="offline")]
 
 
 def get_default_updater() -> RatesUpdater:
-    """Фабричная функция для создания RatesUpdater с настройками по умолчанию."""
-    clients = [CoinGeckoClient(), ExchangeRateApiClient()]
+    """
+    Фабричная функция для создания RatesUpdater с настройками по умолчанию.
+    Поставщик курсов выбирается настройкой rates_provider:
+    live — внешние API, replay — ReplayClient без сети,
+    stub — настоящие клиенты, обращающиеся к локальной HTTP-заглушке.
+    :raises ValueError: Если поставщик неизвестен.
+    """
     storage = RatesStorage(
         cache_path=parser_config.RATES_FILE_PATH,
-        history_path=parser_config.HISTORY_FILE_PATH
+        history_dir=parser_config.HISTORY_DIR,
+        legacy_history_path=parser_config.HISTORY_FILE_PATH,
+        max_segment_bytes=parser_config.HISTORY_SEGMENT_MAX_BYTES,
+        encoding=settings.get("storage_encoding", "json")
     )
+    provider = settings.get("rates_provider", "live")
+    if provider == "live":
+        clients = [CoinGeckoClient(), ExchangeRateApiClient()]
+    elif provider in ("replay", "stub"):
+        clients = _offline_clients(provider, storage)
+    else:
+        raise ValueError(f"Неизвестный поставщик курсов '{provider}'. "
+                         f"Доступны: live, replay, stub")
     return RatesUpdater(clients, storage)